@@ -0,0 +1,196 @@
+"""Shared, pooled HTTP client for AI provider calls.
+
+Bare `requests.post` opens a fresh TCP+TLS connection to Groq/Google for
+every chat message. `ProviderClient` keeps one `requests.Session` per
+process whose urllib3 pools hold keep-alive connections per host, so only
+the first call to a provider pays the handshake.
+
+The `ai_client` singleton follows the same pattern as the other extensions:
+create it at import time, configure it in the app factory via `init_app`.
+
+Configuration (app.config, defaults read from the environment):
+- AI_POOL_CONNECTIONS: number of provider hosts to keep pools for (default 4)
+- AI_POOL_MAXSIZE: keep-alive connections kept per host (default 10)
+- AI_POOL_BLOCK: 'true' to cap concurrent connections per host at
+  AI_POOL_MAXSIZE instead of opening throwaway extra connections
+- AI_MAX_CONCURRENCY: provider calls allowed in flight per process (default 100)
+- AI_QUEUE_TIMEOUT: seconds a request waits for a free call slot before
+  failing fast with ProviderBusyError (default 5)
+- AI_CONNECT_TIMEOUT / AI_READ_TIMEOUT: default per-call timeouts in
+  seconds (default 3 / 15); a short connect timeout makes an unreachable
+  provider fail in seconds rather than waiting out the read timeout
+
+Provider calls are I/O bound, so in production the app is served by
+gunicorn's gevent worker (see gunicorn.conf.py): each request is a greenlet and a
+call waiting on Groq/Google costs a few KB instead of a worker thread. The
+concurrency slots keep that from turning into an unbounded pile-up.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ProviderBusyError(Exception):
+    """No provider call slot became free within AI_QUEUE_TIMEOUT."""
+
+
+class ProviderClient:
+    """Thread-safe wrapper around a pooled `requests.Session`.
+
+    urllib3 connection pools are thread-safe; the only per-session mutable
+    state requests shares between threads is the cookie jar, which is
+    disabled because providers authenticate with headers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._adapter = None
+        self.pool_connections = 4
+        self.pool_maxsize = 10
+        self.pool_block = False
+        self.max_concurrency = 100
+        self.queue_timeout = 5.0
+        self.timeout = (3.0, 15.0)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._rejected = 0
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('AI_POOL_CONNECTIONS', int(os.getenv('AI_POOL_CONNECTIONS', '4')))
+        app.config.setdefault('AI_POOL_MAXSIZE', int(os.getenv('AI_POOL_MAXSIZE', '10')))
+        app.config.setdefault('AI_POOL_BLOCK', os.getenv('AI_POOL_BLOCK', 'false').lower() == 'true')
+        app.config.setdefault('AI_MAX_CONCURRENCY', int(os.getenv('AI_MAX_CONCURRENCY', '100')))
+        app.config.setdefault('AI_QUEUE_TIMEOUT', float(os.getenv('AI_QUEUE_TIMEOUT', '5')))
+        app.config.setdefault('AI_CONNECT_TIMEOUT', float(os.getenv('AI_CONNECT_TIMEOUT', '3')))
+        app.config.setdefault('AI_READ_TIMEOUT', float(os.getenv('AI_READ_TIMEOUT', '15')))
+
+        with self._lock:
+            self.pool_connections = app.config['AI_POOL_CONNECTIONS']
+            self.pool_maxsize = app.config['AI_POOL_MAXSIZE']
+            self.pool_block = app.config['AI_POOL_BLOCK']
+            self.max_concurrency = app.config['AI_MAX_CONCURRENCY']
+            self.queue_timeout = app.config['AI_QUEUE_TIMEOUT']
+            self.timeout = (app.config['AI_CONNECT_TIMEOUT'], app.config['AI_READ_TIMEOUT'])
+            self._slots = threading.BoundedSemaphore(self.max_concurrency)
+            self._close_locked()
+
+        app.extensions['ai_client'] = self
+
+    @property
+    def session(self) -> requests.Session:
+        """The process-wide session, created on first use."""
+        session = self._session
+        if session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session, self._adapter = self._build_session()
+                session = self._session
+        return session
+
+    def _build_session(self):
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session, adapter
+
+    def _close_locked(self) -> None:
+        if self._session is not None:
+            self._session.close()
+        self._session = None
+        self._adapter = None
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the AI_MAX_CONCURRENCY provider call slots.
+
+        Wrap the whole provider exchange (including reading a streamed
+        body). Raises ProviderBusyError if no slot frees up within
+        AI_QUEUE_TIMEOUT, so overload fails fast instead of queueing forever.
+        """
+        slots = self._slots
+        with self._lock:
+            self._waiting += 1
+        acquired = slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self._waiting -= 1
+            if acquired:
+                self._in_flight += 1
+            else:
+                self._rejected += 1
+        if not acquired:
+            raise ProviderBusyError(
+                f'All {self.max_concurrency} AI call slots busy for {self.queue_timeout}s'
+            )
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            slots.release()
+
+    def concurrency_stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'queue_timeout': self.queue_timeout,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'rejected': self._rejected,
+            }
+
+    def stats(self) -> dict:
+        """Connection reuse per provider host.
+
+        `requests` counts HTTP requests sent and `connections` counts new
+        TCP connections opened; every request beyond the connection count
+        reused a keep-alive connection. Counters reset if a host's pool is
+        evicted (more than AI_POOL_CONNECTIONS hosts in use).
+        """
+        adapter = self._adapter
+        hosts = {}
+        if adapter is not None:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                try:
+                    pool = pools[key]
+                except KeyError:
+                    continue
+                hosts[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                    'requests': pool.num_requests,
+                    'connections': pool.num_connections,
+                    'idle': pool.pool.qsize() if pool.pool is not None else 0,
+                }
+
+        total_requests = sum(h['requests'] for h in hosts.values())
+        total_connections = sum(h['connections'] for h in hosts.values())
+        reused = max(total_requests - total_connections, 0)
+        return {
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'pool_block': self.pool_block,
+            'requests': total_requests,
+            'connections_opened': total_connections,
+            'connections_reused': reused,
+            'reuse_ratio': round(reused / total_requests, 3) if total_requests else None,
+            'hosts': hosts,
+        }
+
+
+# Process-wide singleton (configured in app factory)
+ai_client = ProviderClient()
@@ -13,13 +13,29 @@ Why this structure:
 """
 
 import os
+import time
+import click
 from datetime import timedelta
 from flask import Flask, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-from models import db, ma
+from models import db, ma, upgrade_schema
 from auth_routes import auth_bp, bcrypt, jwt
+from hashing import password_hasher
+from login_limit import login_limiter
 from chat_routes import chat_bp
+from ai_client import ai_client
+from rate_limit import rate_limiter
+from circuit_breaker import circuit_breakers
+from response_cache import response_cache
+from sentiment import sentiment_analyzer
+from mood import backfill_sentiment
+from provisioning import PROVISION_BATCH, detect_format, provision_users, read_user_records
+from jobs import job_queue
+from identity import identity_cache
+from revocation import revocation_list
+import context
+import providers
 
 # Load environment variables from .env
 load_dotenv()
@@ -40,8 +56,19 @@ def create_app(config_override: dict | None = None) -> Flask:
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'please-change-me')
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', app.config['SECRET_KEY'])
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///aira.db')
-    # JWT token expires in 3 days (good balance between security and UX)
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=int(os.getenv('JWT_EXP_DAYS', '3')))
+    # Short-lived access tokens; the session is renewed through refresh
+    # tokens (POST /auth/refresh) for up to JWT_EXP_DAYS without logging in
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.getenv('JWT_ACCESS_MINUTES', '15')))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.getenv('JWT_EXP_DAYS', '7')))
+
+    # How POST /chat persists a turn: 'batched' writes both messages in one
+    # commit after the AI reply; 'durable' saves the user message first.
+    app.config['CHAT_WRITE_MODE'] = os.getenv('CHAT_WRITE_MODE', 'batched').lower()
+    # Messages deleted per transaction when clearing a history
+    app.config['CHAT_DELETE_BATCH'] = int(os.getenv('CHAT_DELETE_BATCH', '500'))
+    # POST /chat/import caps, after decompression: the whole body and one line
+    app.config['CHAT_IMPORT_MAX_BYTES'] = int(os.getenv('CHAT_IMPORT_MAX_BYTES', str(50 * 1024 * 1024)))
+    app.config['CHAT_IMPORT_MAX_LINE'] = int(os.getenv('CHAT_IMPORT_MAX_LINE', str(256 * 1024)))
 
     # Allow overrides (useful for tests)
     if config_override:
@@ -51,8 +78,22 @@ def create_app(config_override: dict | None = None) -> Flask:
     CORS(app, resources={r"/*": {"origins": "*"}})
     db.init_app(app)
     ma.init_app(app)
+    # Before bcrypt, which reads the BCRYPT_LOG_ROUNDS default it sets
+    password_hasher.init_app(app)
     bcrypt.init_app(app)
+    login_limiter.init_app(app)
     jwt.init_app(app)
+    identity_cache.init_app(app, jwt)
+    revocation_list.init_app(app, jwt)
+    ai_client.init_app(app)
+    rate_limiter.init_app(app)
+    circuit_breakers.init_app(app)
+    providers.init_app(app)
+    response_cache.init_app(app)
+    context.init_app(app)
+    # Parse the sentiment lexicon now rather than on the first chat
+    sentiment_analyzer.init_app(app)
+    job_queue.init_app(app)
 
     # JWT error handlers for debugging
     @jwt.invalid_token_loader
@@ -74,6 +115,60 @@ def create_app(config_override: dict | None = None) -> Flask:
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(chat_bp, url_prefix='')  # chat routes live at /chat*
 
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Create missing tables and indexes (safe to run repeatedly)."""
+        upgrade_schema()
+        print('Database schema is up to date')
+
+    @app.cli.command('backfill-sentiment')
+    @click.option('--batch-size', default=1000, show_default=True, help='Messages scored per transaction.')
+    @click.option('--enqueue', is_flag=True, help='Queue the backfill for the job workers instead.')
+    def backfill_sentiment_command(batch_size, enqueue):
+        """Score stored user messages without a sentiment and build mood rollups."""
+        if enqueue:
+            job_id = job_queue.enqueue('backfill_sentiment', batch_size=batch_size)
+            print(f'Sentiment backfill queued (job {job_id})')
+            return
+        done = backfill_sentiment(batch_size, progress=lambda n: print(f'Scored {n} messages'))
+        print(f'Sentiment backfill complete ({done} messages)')
+
+    @app.cli.command('provision-users')
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'json']), default=None,
+                  help='Input format (default: from the file extension; csv for stdin).')
+    @click.option('--batch-size', default=PROVISION_BATCH, show_default=True, help='Users created per transaction.')
+    def provision_users_command(source, fmt, batch_size):
+        """Create users in bulk from a CSV/JSON file (name, email, password); '-' reads stdin.
+
+        Existing emails are skipped, so an interrupted run can simply be repeated.
+        """
+        fmt = fmt or detect_format(source.name)
+        started = time.perf_counter()
+
+        def report(counts):
+            rate = counts['created'] / max(time.perf_counter() - started, 1e-9)
+            print(f"Created {counts['created']} users ({rate:.0f}/s), "
+                  f"skipped {counts['existing']} existing, {counts['duplicate']} duplicate, {counts['invalid']} invalid")
+
+        counts = provision_users(read_user_records(source, fmt), batch_size, progress=report)
+        for number, error in counts['errors']:
+            print(f'  record {number}: {error}')
+        print(f"Provisioning complete: {counts['created']} created, {counts['existing']} existing, "
+              f"{counts['duplicate']} duplicate, {counts['invalid']} invalid")
+
+    @app.cli.command('run-jobs')
+    @click.option('--workers', type=int, default=None, help='Worker threads (default JOB_WORKERS).')
+    def run_jobs_command(workers):
+        """Run background jobs from the database queue until interrupted."""
+        job_queue.start(workers or max(app.config['JOB_WORKERS'], 1))
+        print(f'Job workers running ({job_queue.stats()["workers"]}); Ctrl+C to stop')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            job_queue.stop()
+
     # Basic health endpoint
     @app.route('/', methods=['GET'])
     def health():
@@ -85,9 +180,12 @@ def create_app(config_override: dict | None = None) -> Flask:
 if __name__ == '__main__':
     app = create_app()
 
-    # Create DB tables if they don't exist; safe for simple dev workflows.
+    # Create missing tables/indexes; safe for simple dev workflows.
+    # In production the Procfile `release` step runs `flask --app app upgrade-db`.
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
+    # Pick up jobs left queued by a previous run or another process
+    job_queue.start()
 
     # Railway uses PORT environment variable
     host = os.getenv('FLASK_HOST', '0.0.0.0')
@@ -3,17 +3,22 @@
 Provides endpoints:
 - POST /auth/register
 - POST /auth/login
+- POST /auth/refresh  (refresh token) -> new access/refresh token pair
+- POST /auth/logout   (refresh token) -> revoke the session
 
 This module also exports the `auth_bp` Blueprint and the bcrypt/jwt
-instances so the application factory can initialize them.
+instances so the application factory can initialize them. Password hashes
+are computed off the request thread by `hashing.password_hasher`.
 """
-from datetime import timedelta
-import os
-from flask import Blueprint, request, jsonify
+import math
+from flask import Blueprint, current_app, request, jsonify
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token
+from flask_jwt_extended import JWTManager, current_user, get_jwt, jwt_required
 
 from models import db, User
+from hashing import HasherBusy, password_hasher
+from login_limit import login_limiter
+from revocation import revocation_list
 
 # Extension singletons (initialized in app factory)
 bcrypt = Bcrypt()
@@ -44,7 +49,7 @@ def register():
             return jsonify({'error': 'A user with that email already exists'}), 409
 
         # Hash password and create user
-        pw_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        pw_hash = password_hasher.hash(password)
 
         user = User(name=name, email=email, password_hash=pw_hash)
         db.session.add(user)
@@ -52,6 +57,9 @@ def register():
 
         return jsonify({'user': user.to_dict()}), 201
 
+    except HasherBusy:
+        db.session.rollback()
+        return _busy()
     except Exception as exc:
         db.session.rollback()
         return jsonify({'error': 'Failed to create user', 'details': str(exc)}), 500
@@ -59,10 +67,14 @@ def register():
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
-    """Authenticate user and return JWT access token.
+    """Authenticate user and start a session.
 
     Expected JSON body: { email, password }
-    Returns: { access_token, user }
+    Returns: { access_token, refresh_token, user }
+
+    Too many failed attempts from one IP or for one email get a
+    429 with Retry-After before the user lookup and password check (see
+    `login_limit.py`).
     """
     try:
         data = request.get_json() or {}
@@ -72,15 +84,68 @@ def login():
         if not email or not password:
             return jsonify({'error': 'email and password are required'}), 400
 
+        ip = login_limiter.client_ip(request)
+        wait = login_limiter.retry_after(ip, email)
+        if wait is not None:
+            retry_after = max(math.ceil(wait), 1)
+            return jsonify({'error': 'Too many login attempts, please try again later',
+                            'retry_after': retry_after}), 429, {'Retry-After': str(retry_after)}
+
         user = User.query.filter_by(email=email).first()
-        if not user or not bcrypt.check_password_hash(user.password_hash, password):
+        if not user or not password_hasher.check(user.password_hash, password):
+            login_limiter.record_failure(ip, email)
             return jsonify({'error': 'Invalid credentials'}), 401
+        login_limiter.record_success(email)
+        if not user.is_active:
+            return jsonify({'error': 'Account is disabled'}), 403
+        if password_hasher.needs_rehash(user.password_hash):
+            _rehash(user, password)
 
-        # Create JWT token; convert user id to string for JWT identity
-        expires = int(os.getenv('JWT_EXP_DAYS', '7'))
-        access_token = create_access_token(identity=str(user.id), expires_delta=timedelta(days=expires))
-
-        return jsonify({'access_token': access_token, 'user': user.to_dict()}), 200
+        # Short-lived access token plus a refresh token for the session
+        return jsonify({**revocation_list.issue(user.id), 'user': user.to_dict()}), 200
 
+    except HasherBusy:
+        return _busy()
     except Exception as exc:
         return jsonify({'error': 'Login failed', 'details': str(exc)}), 500
+
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Exchange a refresh token (Authorization: Bearer) for a new token pair.
+
+    The presented refresh token is rotated out: reusing it later revokes
+    the whole session (see `revocation.py`). No password check or
+    database write is involved.
+    Returns: { access_token, refresh_token }
+    """
+    claims = get_jwt()
+    revocation_list.rotate(claims)
+    return jsonify(revocation_list.issue(current_user.id, claims.get('fam'))), 200
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    """Revoke the session of the presented refresh token and its access tokens."""
+    revocation_list.revoke_family(get_jwt())
+    return jsonify({'status': 'logged out'}), 200
+
+
+def _rehash(user: User, password: str) -> None:
+    """Re-hash a verified password at the current BCRYPT_LOG_ROUNDS.
+
+    Best effort: the login succeeds even if this fails, and is retried on
+    the next login.
+    """
+    try:
+        user.password_hash = password_hasher.hash(password)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Password rehash failed for user %s', user.id)
+
+
+def _busy():
+    return jsonify({'error': 'Server busy, please retry shortly'}), 503, {'Retry-After': '1'}
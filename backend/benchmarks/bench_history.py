@@ -0,0 +1,137 @@
+"""
+Benchmark chat history reads as the chats table grows.
+
+Fills a scratch database with synthetic messages spread over many users and,
+after each growth step, times the queries behind GET /chat/<user_id> for
+one heavy user: the latest page, a deep `before` page and a per-user COUNT.
+With the composite (user_id, timestamp, id) index the page timings should
+stay flat while the table grows by orders of magnitude; run with
+--drop-index to see the linear baseline for comparison.
+
+Run from the backend directory:
+    python benchmarks/bench_history.py --sizes 100000 1000000 10000000
+    python benchmarks/bench_history.py --database-url postgresql://... --sizes 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from app import create_app  # noqa: E402
+from models import db, upgrade_schema, User, Chat  # noqa: E402
+
+INSERT_BATCH = 10_000
+PAGE_SIZE = 50
+
+
+def seed(target_rows: int, users: int, heavy_share: float, start: datetime) -> None:
+    """Insert rows until the chats table holds `target_rows`."""
+    current = db.session.query(Chat.id).count()
+    rng = random.Random(current)
+    while current < target_rows:
+        batch = min(INSERT_BATCH, target_rows - current)
+        rows = []
+        for offset in range(batch):
+            user_id = 1 if rng.random() < heavy_share else rng.randint(2, users)
+            rows.append({
+                'user_id': user_id,
+                'message': 'benchmark message',
+                'sender': 'user' if offset % 2 else 'aira',
+                'timestamp': start + timedelta(seconds=current + offset),
+            })
+        db.session.execute(insert(Chat), rows)
+        db.session.commit()
+        current += batch
+
+
+def timed(fn, repeat: int = 5) -> float:
+    """Best-of-N wall time in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - began) * 1000)
+    return best
+
+
+def latest_page():
+    return (Chat.query.filter_by(user_id=1)
+            .order_by(Chat.timestamp.desc(), Chat.id.desc())
+            .limit(PAGE_SIZE).all())
+
+
+def deep_page(anchor: Chat):
+    return (Chat.query.filter_by(user_id=1)
+            .filter((Chat.timestamp < anchor.timestamp)
+                    | ((Chat.timestamp == anchor.timestamp) & (Chat.id < anchor.id)))
+            .order_by(Chat.timestamp.desc(), Chat.id.desc())
+            .limit(PAGE_SIZE).all())
+
+
+def user_count():
+    return Chat.query.filter_by(user_id=1).count()
+
+
+def explain(dialect: str) -> str:
+    sql = ('SELECT id FROM chats WHERE user_id = 1 '
+           'ORDER BY timestamp DESC, id DESC LIMIT 50')
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    rows = db.session.execute(text(prefix + sql)).fetchall()
+    return '\n'.join('    ' + ' | '.join(str(col) for col in row) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--users', type=int, default=1_000)
+    parser.add_argument('--heavy-share', type=float, default=0.01,
+                        help='fraction of rows belonging to the heavy user (id 1)')
+    parser.add_argument('--drop-index', action='store_true', help='benchmark without the composite index')
+    args = parser.parse_args()
+
+    url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url})
+
+    with app.app_context():
+        upgrade_schema()
+        if args.drop_index:
+            db.session.execute(text('DROP INDEX IF EXISTS ix_chats_user_id_timestamp_id'))
+            db.session.commit()
+        if not db.session.get(User, 1):
+            db.session.execute(insert(User), [
+                {'id': uid, 'name': f'bench{uid}', 'email': f'bench{uid}@aira.test', 'password_hash': '-'}
+                for uid in range(1, args.users + 1)
+            ])
+            db.session.commit()
+
+        dialect = db.engine.dialect.name
+        print(f'Database: {dialect}  index: {"dropped" if args.drop_index else "present"}')
+        print(f'{"rows":>12} {"user rows":>10} {"latest ms":>10} {"deep ms":>10} {"count ms":>10}')
+
+        start = datetime(2024, 1, 1)
+        for size in sorted(args.sizes):
+            seed(size, args.users, args.heavy_share, start)
+            heavy_rows = user_count()
+            anchor = (Chat.query.filter_by(user_id=1)
+                      .order_by(Chat.timestamp.asc(), Chat.id.asc())
+                      .offset(heavy_rows // 10).first())
+            latest = timed(latest_page)
+            deep = timed(lambda: deep_page(anchor)) if anchor else 0.0
+            count = timed(user_count)
+            db.session.expunge_all()
+            print(f'{size:>12,} {heavy_rows:>10,} {latest:>10.2f} {deep:>10.2f} {count:>10.2f}')
+
+        print('\nPlan for the latest-page query:')
+        print(explain(dialect))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark POST /auth/login throughput with bcrypt on and off the request threads.
+
+Seeds a scratch database with users sharing one password hash, then fires
+concurrent logins from --threads client threads (the burst at the start of
+a class period) for each --workers setting: 0 hashes on the request
+threads as before, N uses the `password_hasher` process pool. Prints
+logins per second overall and per core, latency percentiles and how many
+requests were turned away with 503 by the bounded hash queue.
+
+Run from the backend directory:
+    python benchmarks/bench_login.py
+    python benchmarks/bench_login.py --rounds 12 --threads 32 --requests 400 --workers 0 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from hashing import password_hasher  # noqa: E402
+from models import db, upgrade_schema, User  # noqa: E402
+
+PASSWORD = 'benchmark-password'
+
+
+def percentile(values: list, share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)] if ordered else 0.0
+
+
+def run(workers: int, args) -> None:
+    url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': url,
+        'BCRYPT_LOG_ROUNDS': args.rounds,
+        'PASSWORD_HASH_WORKERS': workers,
+        'PASSWORD_HASH_MAX_PENDING': args.max_pending or 8 * max(workers, 1),
+    })
+    with app.app_context():
+        upgrade_schema()
+        pw_hash = password_hasher.hash(PASSWORD)
+        db.session.execute(insert(User), [
+            {'name': f'bench{n}', 'email': f'bench{n}@aira.test', 'password_hash': pw_hash}
+            for n in range(args.users)
+        ])
+        db.session.commit()
+
+    # Warm up (starts the hashing processes)
+    app.test_client().post('/auth/login', json={'email': 'bench0@aira.test', 'password': PASSWORD})
+
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+
+    def client():
+        http = app.test_client()
+        for n in counter:
+            began = time.perf_counter()
+            response = http.post('/auth/login', json={
+                'email': f'bench{n % args.users}@aira.test', 'password': PASSWORD,
+            })
+            elapsed = (time.perf_counter() - began) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    threads = [threading.Thread(target=client) for _ in range(args.threads)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+    password_hasher.shutdown()
+
+    ok = statuses.get(200, 0)
+    cores = os.cpu_count() or 1
+    print(f'{workers:>8} {ok / wall:>10.1f} {ok / wall / cores:>10.1f} '
+          f'{percentile(latencies, 0.5):>9.0f} {percentile(latencies, 0.95):>9.0f} '
+          f'{statuses.get(503, 0):>6} {sum(statuses.values()) - ok - statuses.get(503, 0):>6}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=12, help='BCRYPT_LOG_ROUNDS')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, os.cpu_count() or 1],
+                        help='PASSWORD_HASH_WORKERS settings to compare')
+    parser.add_argument('--max-pending', type=int, default=None, help='PASSWORD_HASH_MAX_PENDING')
+    args = parser.parse_args()
+
+    print(f'bcrypt cost {args.rounds}, {args.threads} clients, {args.requests} logins, {os.cpu_count()} cores')
+    print(f'{"workers":>8} {"logins/s":>10} {"per core":>10} {"p50 ms":>9} {"p95 ms":>9} {"503":>6} {"other":>6}')
+    for workers in args.workers:
+        run(workers, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,250 +2,108 @@
 
 Routes implemented (JSON responses only):
 - POST /chat            -> send message to Aira (AI), save both user and aira messages
+- POST /chat/stream     -> same as /chat, streaming the reply as Server-Sent Events
 - POST /chat/create     -> create a chat record (protected)
-- GET  /chat/<user_id>  -> read user's chat history (protected)
+- GET  /chat/<user_id>  -> read user's chat history, keyset-paginated or NDJSON (protected)
+- GET  /chat/search     -> full-text search of the user's messages (protected)
+- GET  /chat/export     -> the user's whole history as NDJSON, optionally gzipped (protected)
+- POST /chat/import     -> bulk-insert chats from an NDJSON body, optionally gzipped (protected)
+- GET  /chat/mood/<user_id> -> daily/weekly sentiment counts (protected)
 - PUT  /chat/update/<chat_id> -> update chat message (protected)
 - DELETE /chat/delete/<chat_id> -> delete a chat record (protected)
 - DELETE /chat/clear/<user_id> -> delete all user's chats (protected)
+- GET  /metrics/ai      -> AI client metrics (pool reuse, concurrency, rate limits, breakers, cache)
+- GET  /metrics/jobs    -> background job queue depth and outcomes
+- GET  /health/ai       -> AI provider circuit state (503 while open)
 
-All protected routes use JWT Bearer tokens.
+All protected routes use JWT Bearer tokens, checked by `identity_required`
+(see `identity.py`).
 
 AI Provider Support:
 - Groq (recommended): Fast inference with generous free tier (14,400 RPD)
 - Google Gemini: Fallback option with lower free tier limits
 """
-import os
+import base64
+import json
+import queue
+import threading
 import time
-import requests
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
-
-from models import db, User, Chat, chat_schema, chats_schema
+import zlib
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import current_user
+from sqlalchemy import and_, func, insert, or_
+
+from models import db, User, Chat, ConversationSummary, MoodRollup, chat_schema, chats_schema
+from ai_client import ai_client
+from providers import SYSTEM_PROMPT, get_provider, get_provider_chain
+from response_cache import response_cache
+from context import build_context, reset_summary
+from jobs import job_queue
+from identity import identity_required
+from sentiment import detect_sentiment, sentiment_analyzer
+from mood import PERIODS, apply_rollups, mood_trend, record_mood
+from search import index_chats, index_rows, search_chats, unindex_chats
+from chat_transfer import BodyTooLarge, gzip_stream, iter_lines, parse_chat_record
+from rate_limit import rate_limiter, RateLimitedError
+from circuit_breaker import circuit_breakers
 
 chat_bp = Blueprint('chat', __name__)
 
+# History pagination
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+HISTORY_STREAM_BATCH = 500
+MOOD_DEFAULT_LIMIT = 30
+MOOD_MAX_LIMIT = 366
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+IMPORT_BATCH = 1000
+IMPORT_MAX_ERRORS = 20
+NDJSON_MIMETYPE = 'application/x-ndjson'
+GZIP_MIMETYPE = 'application/gzip'
+# Threads running durable pre-writes alongside the AI call (short DB writes)
+STAGE_POOL_SIZE = 16
 
-def detect_sentiment(text: str) -> str:
-    """Simple sentiment detection.
+AI_UNAVAILABLE_REPLY = "Aira is having trouble reaching the AI service right now. Please try again in a moment."
+PARSE_FAILURE_REPLY = 'Sorry — I could not parse the AI response.'
 
-    Import TextBlob lazily to avoid heavy imports at module load time
-    (TextBlob brings NLTK and other large deps). If TextBlob is not
-    available or fails, return 'neutral' as a safe default.
-    """
-    try:
-        # Lazy import to avoid expensive startup cost
-        from textblob import TextBlob
-
-        polarity = TextBlob(text).sentiment.polarity
-        if polarity > 0.1:
-            return 'positive'
-        if polarity < -0.1:
-            return 'negative'
-        return 'neutral'
-    except Exception:
-        return 'neutral'
 
+def get_gemini_response(user_message: str, history: list | None = None) -> dict:
+    """Call the configured AI providers to generate a reply.
 
-def get_gemini_response(user_message: str) -> dict:
-    """Call the AI API to generate a reply.
+    Providers (Groq, Google Gemini or a generic endpoint) are resolved once
+    at startup from the GEMINI_* and AI_FALLBACK_PROVIDERS settings; see
+    `providers.py`. They are tried in order, optionally hedged.
 
-    Supports multiple AI providers through configurable environment variables:
-    - GEMINI_API_KEY: Your API key (Groq starts with 'gsk_', Google starts with 'AIza')
-    - GEMINI_PROVIDER: 'groq' or 'google' (auto-detected from API key format)
-    - GEMINI_MODEL: Model name (default: 'llama-3.3-70b-versatile' for Groq)
-    - GEMINI_API_URL: Optional override for API endpoint (auto-detected)
-    
     Groq Configuration (Recommended):
         GEMINI_API_KEY=gsk_your_key_here
         GEMINI_PROVIDER=groq
         GEMINI_MODEL=llama-3.3-70b-versatile
-        
+
+    `history` is the conversation context from `context.build_context`.
+    With AI_CACHE_ENABLED, replies to short context-free prompts are served
+    from `response_cache` when the same normalized prompt was answered
+    before; prompts sent with history always go to the provider.
+
     Returns a dict with 'reply' key containing the AI response.
     """
-    api_url = os.getenv('GEMINI_API_URL')
-    api_key = os.getenv('GEMINI_API_KEY')
-    provider = os.getenv('GEMINI_PROVIDER', '').lower()
-    model = os.getenv('GEMINI_MODEL', 'llama-3.3-70b-versatile')
-    api_version = os.getenv('GEMINI_API_VERSION', 'v1beta')
-
-    # Auto-detect provider from API key if not explicitly set
-    if not provider and api_key:
-        if isinstance(api_key, str):
-            if api_key.startswith('gsk_'):
-                provider = 'groq'
-            elif api_key.startswith('AIza'):
-                provider = 'google'
-
-    # Infer API URL based on provider
-    if not api_url and api_key:
-        if provider == 'groq':
-            api_url = 'https://api.groq.com/openai/v1/chat/completions'
-        elif provider == 'google' or (isinstance(api_key, str) and api_key.startswith('AIza')):
-            api_url = f'https://generativelanguage.googleapis.com/{api_version}/models/{model}:generateContent'
-
-    # If neither URL nor key are available, fall back to local echo (dev mode)
-    if not api_url and not api_key:
+    chain = get_provider_chain()
+    if not chain:
         return {'reply': f"I heard: {user_message}", 'meta': {'source': 'local-echo'}}
 
-    # System prompt to define Aira's personality and behavior
-    system_instruction = """You are Aira, a compassionate and empathetic mental health support AI designed specifically for Gen-Z students. Your purpose is to:
-
-1. Listen actively and provide emotional support
-2. Help users process their feelings and thoughts
-3. Offer coping strategies and mental wellness tips
-4. Be warm, understanding, and non-judgmental
-5. Use casual, friendly language that resonates with Gen-Z
-6. Recognize when someone needs professional help and suggest it appropriately
-
-When asked "who are you" or similar questions, introduce yourself as: "I'm Aira, your mental health companion. I'm here to listen, support, and help you navigate your feelings and challenges. Think of me as a friendly ear whenever you need someone to talk to."
-
-Always be supportive, never dismissive, and maintain a safe, confidential space for conversations."""
-
-    # Build headers and payload depending on the provider/endpoint
-    if provider == 'groq' or (api_url and 'groq.com' in api_url):
-        # Groq uses OpenAI-compatible format
-        headers = {
-            'Authorization': f'Bearer {api_key}',
-            'Content-Type': 'application/json',
-        }
-        payload = {
-            'model': model,
-            'messages': [
-                {'role': 'system', 'content': system_instruction},
-                {'role': 'user', 'content': user_message}
-            ],
-            'temperature': float(os.getenv('GEMINI_TEMPERATURE', '0.7')),
-            'max_tokens': int(os.getenv('GEMINI_MAX_TOKENS', '512')),
-        }
-    elif api_url and 'generativelanguage.googleapis.com' in api_url:
-        # Google Generative Language expects X-goog-api-key and `contents` payload
-        headers = {
-            'X-goog-api-key': api_key,
-            'Content-Type': 'application/json',
-        }
-        
-        # System prompt to define Aira's personality and behavior
-        system_instruction = """You are Aira, a compassionate and empathetic mental health support AI designed specifically for Gen-Z students. Your purpose is to:
-
-1. Listen actively and provide emotional support
-2. Help users process their feelings and thoughts
-3. Offer coping strategies and mental wellness tips
-4. Be warm, understanding, and non-judgmental
-5. Use casual, friendly language that resonates with Gen-Z
-6. Recognize when someone needs professional help and suggest it appropriately
-
-When asked "who are you" or similar questions, introduce yourself as: "I'm Aira, your mental health companion. I'm here to listen, support, and help you navigate your feelings and challenges. Think of me as a friendly ear whenever you need someone to talk to."
-
-Always be supportive, never dismissive, and maintain a safe, confidential space for conversations."""
-
-        payload = {
-            'system_instruction': {
-                'parts': [{'text': system_instruction}]
-            },
-            'contents': [
-                {'parts': [{'text': user_message}]}
-            ]
-        }
-    else:
-        # Generic provider (Bearer token expected)
-        headers = {
-            'Authorization': f'Bearer {api_key}' if api_key else None,
-            'Content-Type': 'application/json',
-        }
-        # Clean None
-        headers = {k: v for k, v in headers.items() if v}
-        payload = {
-            'input': user_message,
-            'temperature': float(os.getenv('GEMINI_TEMPERATURE', '0.7')),
-            'max_output_tokens': int(os.getenv('GEMINI_MAX_TOKENS', '512')),
-        }
-
-    def _stringify_id_fields(obj):
-        """Recursively convert numeric id-like fields to strings.
-
-        This helps when the API expects string identifiers (common in
-        some Google endpoints where 'subject' or 'id' must be strings).
-        """
-        if isinstance(obj, dict):
-            new = {}
-            for k, v in obj.items():
-                if (k == 'id' or k == 'subject' or k.endswith('_id')) and isinstance(v, (int,)):
-                    new[k] = str(v)
-                else:
-                    new[k] = _stringify_id_fields(v)
-            return new
-        if isinstance(obj, list):
-            return [_stringify_id_fields(x) for x in obj]
-        return obj
-
-    payload = _stringify_id_fields(payload)
+    cache_key = None if history else _reply_cache_key(chain, user_message)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return {'reply': cached, 'meta': {'source': 'cache'}}
 
+    served = {}
     try:
-        # Log the call (do not log API key)
-        try:
-            current_app.logger.info('Calling AI API (%s) at %s', provider or 'auto', api_url)
-        except Exception:
-            pass
-
-        # Retry logic for rate limiting (429 errors)
-        max_retries = 3
-        retry_delay = 2  # seconds
-        
-        for attempt in range(max_retries):
-            try:
-                resp = requests.post(api_url, headers=headers, json=payload, timeout=15)
-                resp.raise_for_status()
-                data = resp.json()
-                break  # Success! Exit retry loop
-                
-            except requests.exceptions.HTTPError as http_err:
-                # Check if it's a 429 rate limit error
-                if resp.status_code == 429 and attempt < max_retries - 1:
-                    # Calculate exponential backoff: 2s, 4s, 8s
-                    wait_time = retry_delay * (2 ** attempt)
-                    try:
-                        current_app.logger.warning(
-                            f'Rate limit hit (429). Retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})'
-                        )
-                    except Exception:
-                        pass
-                    time.sleep(wait_time)
-                    continue  # Retry
-                else:
-                    # Not a 429 or max retries reached
-                    raise http_err
-        else:
-            # This only executes if we never broke out of the loop (all retries failed)
-            raise Exception('Max retries reached for AI API')
-
-        # Try common keys; adapt as needed for different AI providers
-        reply = None
-        
-        # Groq/OpenAI format: choices[0].message.content
-        if isinstance(data.get('choices'), list) and len(data['choices']) > 0:
-            message = data['choices'][0].get('message', {})
-            reply = message.get('content')
-        
-        # Fallback to common keys
-        if not reply:
-            reply = data.get('reply') or data.get('output') or data.get('text')
-        
-        # Google Gemini format: candidates[0].content.parts[0].text
-        if not reply:
-            if isinstance(data.get('candidates'), list) and len(data['candidates']) > 0:
-                content = data['candidates'][0].get('content')
-                if content:
-                    # Extract text from parts array
-                    if isinstance(content, dict) and 'parts' in content:
-                        parts = content.get('parts', [])
-                        if parts and isinstance(parts, list) and len(parts) > 0:
-                            reply = parts[0].get('text', '')
-                    else:
-                        reply = content
-                else:
-                    reply = data['candidates'][0]
-
-        return {'reply': reply or 'Sorry — I could not parse the AI response.', 'meta': data}
+        reply = ''.join(_generate_reply(chain, user_message, stream=False, served=served, history=history))
+        _cache_reply(cache_key, reply, chain, served)
+        return {'reply': reply, 'meta': served}
 
     except Exception as exc:
         # Log exception server-side for easier debugging (no secrets)
@@ -255,11 +113,284 @@ Always be supportive, never dismissive, and maintain a safe, confidential space
             pass
         # Do not crash the entire request if AI fails; return friendly message
         return {
-            'reply': "Aira is having trouble reaching the AI service right now. Please try again in a moment.",
+            'reply': AI_UNAVAILABLE_REPLY,
             'error': str(exc),
         }
 
 
+def stream_gemini_response(user_message: str, history: list | None = None):
+    """Yield reply text chunks from the AI providers as they are generated.
+
+    Groq (OpenAI-compatible) is called with `stream: true` and Google with
+    `streamGenerateContent?alt=sse`; both answer with Server-Sent Events.
+    Generic endpoints and local echo have no streaming API and yield the
+    complete reply as a single chunk. Errors propagate once every provider
+    has failed, or if the serving provider fails mid-reply.
+    """
+    chain = get_provider_chain()
+    if not chain:
+        yield f"I heard: {user_message}"
+        return
+
+    cache_key = None if history else _reply_cache_key(chain, user_message)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    served = {}
+    for text in _generate_reply(chain, user_message, stream=True, served=served, history=history):
+        parts.append(text)
+        yield text
+    _cache_reply(cache_key, ''.join(parts), chain, served)
+
+
+def _reply_cache_key(chain: list, user_message: str) -> str | None:
+    """Response cache key for a context-free prompt (None when caching is off).
+
+    Keyed on the primary provider/model, the one a lookup expects to answer.
+    """
+    primary = chain[0]
+    return response_cache.key(user_message, f'{primary.name}/{primary.model}', SYSTEM_PROMPT)
+
+
+def _cache_reply(cache_key: str | None, reply: str, chain: list, served: dict) -> None:
+    """Cache a reply from the primary provider.
+
+    Empty replies, the parse-failure fallback and replies served by a
+    fallback provider (a different model than the key names) are not.
+    """
+    if reply and reply != PARSE_FAILURE_REPLY and served.get('provider') == chain[0].name:
+        response_cache.set(cache_key, reply)
+
+
+def _generate_reply(chain: list, user_message: str, stream: bool, served: dict | None = None,
+                    history: list | None = None):
+    """Yield reply text from the first provider in `chain` that answers.
+
+    Providers are tried in order until one produces text. Once one has,
+    its errors propagate; replies from two providers are never mixed.
+    With AI_HEDGE_AFTER_MS set, see `_hedged_reply`. The serving provider's
+    name is stored in `served['provider']`.
+    """
+    served = served if served is not None else {}
+    hedge_after_ms = current_app.config.get('AI_HEDGE_AFTER_MS') or 0
+    if hedge_after_ms > 0 and len(chain) > 1:
+        yield from _hedged_reply(chain, user_message, stream, hedge_after_ms / 1000, served, history)
+        return
+
+    last_exc = None
+    for provider in chain:
+        started = False
+        try:
+            for text in _provider_chunks(provider, user_message, stream, history):
+                if not started:
+                    started = True
+                    served['provider'] = provider.name
+                yield text
+            served.setdefault('provider', provider.name)
+            return
+        except Exception as exc:
+            if started:
+                raise
+            current_app.logger.warning('AI provider %s failed (%s); trying next', provider.name, exc)
+            last_exc = exc
+    raise last_exc
+
+
+def _hedged_reply(chain: list, user_message: str, stream: bool, hedge_after: float, served: dict,
+                  history: list | None):
+    """Race providers: hedge with the next one if the first is slow.
+
+    The first provider starts immediately. If it has produced no text after
+    `hedge_after` seconds, the next provider is started as well, and
+    whichever produces text first wins; the other is cancelled (a streamed
+    response is closed at its next chunk, a plain request finishes in the
+    background and is discarded). A provider that fails before anyone wins
+    is replaced by the next one in the chain.
+    """
+    app = current_app._get_current_object()
+    events = queue.Queue()
+    cancels = []
+
+    def launch(index: int) -> None:
+        cancel = threading.Event()
+        cancels.append(cancel)
+        _race_executor().submit(_race_worker, app, chain[index], user_message, history, stream, events, cancel, index)
+
+    launch(0)
+    next_index = 1
+    active = 1
+    hedged = False
+    hedge_at = time.monotonic() + hedge_after
+    winner = None
+    last_exc = None
+
+    try:
+        while True:
+            timeout = None
+            if winner is None and not hedged and next_index < len(chain):
+                timeout = max(hedge_at - time.monotonic(), 0.0)
+            try:
+                index, kind, value = events.get(timeout=timeout)
+            except queue.Empty:
+                current_app.logger.info('Hedging AI request to %s', chain[next_index].name)
+                launch(next_index)
+                next_index += 1
+                active += 1
+                hedged = True
+                continue
+
+            if winner is not None and index != winner:
+                continue
+            if kind == 'error':
+                active -= 1
+                last_exc = value
+                if index == winner:
+                    raise value
+                current_app.logger.warning('AI provider %s failed (%s)', chain[index].name, value)
+                if next_index < len(chain):
+                    launch(next_index)
+                    next_index += 1
+                    active += 1
+                    hedged = True
+                elif active == 0:
+                    raise last_exc
+                continue
+
+            if winner is None:
+                winner = index
+                served['provider'] = chain[index].name
+                for other, cancel in enumerate(cancels):
+                    if other != index:
+                        cancel.set()
+            if kind == 'done':
+                return
+            yield value
+    finally:
+        for cancel in cancels:
+            cancel.set()
+
+
+def _race_worker(app, provider, user_message: str, history: list | None, stream: bool, events: queue.Queue,
+                 cancel: threading.Event, index: int) -> None:
+    """Feed one provider's reply into `events` until done, failed or cancelled."""
+    with app.app_context():
+        chunks = _provider_chunks(provider, user_message, stream, history)
+        try:
+            for text in chunks:
+                if cancel.is_set():
+                    return
+                events.put((index, 'text', text))
+            events.put((index, 'done', None))
+        except Exception as exc:
+            events.put((index, 'error', exc))
+        finally:
+            chunks.close()
+
+
+_race_pool = None
+_race_pool_lock = threading.Lock()
+
+
+def _race_executor() -> ThreadPoolExecutor:
+    global _race_pool
+    if _race_pool is None:
+        with _race_pool_lock:
+            if _race_pool is None:
+                _race_pool = ThreadPoolExecutor(
+                    max_workers=current_app.config['AI_MAX_CONCURRENCY'], thread_name_prefix='ai-hedge'
+                )
+    return _race_pool
+
+
+def _provider_chunks(provider, user_message: str, stream: bool, history: list | None = None):
+    """Reply text from one provider: streamed chunks, or the whole reply at once."""
+    if stream:
+        stream_request = provider.stream_request(user_message, history)
+        if stream_request is not None:
+            yield from _stream_provider(provider, *stream_request)
+            return
+
+    current_app.logger.info('Calling AI API (%s) at %s', provider.name, provider.api_url)
+    data = _call_provider(provider, provider.build_payload(user_message, history))
+    yield provider.parse_reply(data) or PARSE_FAILURE_REPLY
+
+
+def _call_provider(provider, payload: dict) -> dict:
+    """POST one completion request and return the decoded JSON body.
+
+    Fails fast with CircuitOpenError while the provider's breaker is open.
+    429s pause the shared bucket for this provider/model; the retry then
+    queues in acquire() until the provider admits requests again.
+    """
+    breaker = circuit_breakers.breaker(provider.name, provider.model)
+    breaker.check()
+    bucket = rate_limiter.bucket(provider.name, provider.model)
+    max_attempts = 3
+
+    try:
+        for attempt in range(max_attempts):
+            if not bucket.acquire():
+                raise RateLimitedError('AI provider rate limit: request not admitted in time')
+            with ai_client.slot():
+                resp = ai_client.post(provider.api_url, headers=provider.headers, json=payload)
+            bucket.observe(resp.status_code, resp.headers)
+            if resp.status_code == 429 and attempt < max_attempts - 1:
+                current_app.logger.warning(
+                    f'Rate limit hit (429). Queueing retry (attempt {attempt + 1}/{max_attempts})'
+                )
+                continue
+            resp.raise_for_status()
+            data = resp.json()
+            break
+    except Exception as exc:
+        breaker.record_exception(exc)
+        raise
+
+    breaker.record_success()
+    return data
+
+
+def _stream_provider(provider, api_url: str, payload: dict):
+    """Yield text deltas from one provider's Server-Sent Events stream."""
+    breaker = circuit_breakers.breaker(provider.name, provider.model)
+    breaker.check()
+    bucket = rate_limiter.bucket(provider.name, provider.model)
+
+    try:
+        if not bucket.acquire():
+            raise RateLimitedError('AI provider rate limit: request not admitted in time')
+        with ai_client.slot():
+            resp = ai_client.post(api_url, headers=provider.headers, json=payload, stream=True)
+            bucket.observe(resp.status_code, resp.headers)
+            try:
+                resp.raise_for_status()
+                # SSE is UTF-8 by spec; requests would otherwise assume ISO-8859-1
+                resp.encoding = 'utf-8'
+                # chunk_size=None hands over data as soon as it arrives
+                for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+                    text = provider.parse_stream_chunk(json.loads(data))
+                    if text:
+                        yield text
+            finally:
+                resp.close()
+    except GeneratorExit:
+        # Client went away mid-stream; says nothing about provider health
+        breaker.release()
+        raise
+    except Exception as exc:
+        breaker.record_exception(exc)
+        raise
+    breaker.record_success()
+
+
 @chat_bp.route('/debug/ai', methods=['GET'])
 @chat_bp.route('/debug/gemini', methods=['GET'])  # Legacy route for backward compatibility
 def debug_ai():
@@ -273,48 +404,12 @@ def debug_ai():
     This endpoint is intentionally unprotected to make local debugging easier;
     consider adding authentication in production environments.
     """
-    api_url = os.getenv('GEMINI_API_URL')
-    api_key = os.getenv('GEMINI_API_KEY')
-    provider = os.getenv('GEMINI_PROVIDER', '').lower()
-    model = os.getenv('GEMINI_MODEL', 'llama-3.3-70b-versatile')
-    api_version = os.getenv('GEMINI_API_VERSION', 'v1beta')
-
-    # Auto-detect provider from API key
-    if not provider and api_key:
-        if isinstance(api_key, str):
-            if api_key.startswith('gsk_'):
-                provider = 'groq'
-            elif api_key.startswith('AIza'):
-                provider = 'google'
-
-    # Infer API URL based on provider
-    if not api_url and api_key:
-        if provider == 'groq':
-            api_url = 'https://api.groq.com/openai/v1/chat/completions'
-        elif provider == 'google' or (isinstance(api_key, str) and api_key.startswith('AIza')):
-            api_url = f'https://generativelanguage.googleapis.com/{api_version}/models/{model}:generateContent'
-
-    if not api_url or not api_key:
+    provider = get_provider()
+    if provider is None or not provider.api_url or not provider.api_key:
         return jsonify({'ok': False, 'reason': 'GEMINI_API_URL or GEMINI_API_KEY not set'}), 400
 
-    # Build test payload based on provider
-    if provider == 'groq' or (api_url and 'groq.com' in api_url):
-        headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-        test_payload = {
-            'model': model,
-            'messages': [{'role': 'user', 'content': 'ping'}],
-            'temperature': 0.0,
-            'max_tokens': 16
-        }
-    elif 'generativelanguage.googleapis.com' in api_url:
-        headers = {'X-goog-api-key': api_key, 'Content-Type': 'application/json'}
-        test_payload = {'contents': [{'parts': [{'text': 'ping'}]}]}
-    else:
-        headers = {'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'}
-        test_payload = {'input': 'ping', 'temperature': 0.0, 'max_output_tokens': 16}
-
     try:
-        resp = requests.post(api_url, headers=headers, json=test_payload, timeout=10)
+        resp = ai_client.post(provider.api_url, headers=provider.headers, json=provider.ping_payload(), timeout=10)
         status = resp.status_code
         try:
             body = resp.json()
@@ -322,10 +417,11 @@ def debug_ai():
             body = {'text': resp.text[:200]}
         return jsonify({
             'ok': True, 
-            'provider': provider or 'auto-detected',
-            'model': model,
+            'provider': provider.name,
+            'model': provider.model,
             'status_code': status, 
-            'body_preview': body
+            'body_preview': body,
+            'http_pool': ai_client.stats(),
         }), 200
     except Exception as exc:
         try:
@@ -335,8 +431,169 @@ def debug_ai():
         return jsonify({'ok': False, 'error': str(exc)}), 502
 
 
+def _adjust_message_count(user_id: int, delta: int) -> None:
+    """Add `delta` to the user's message counter inside the current transaction.
+
+    Issued as `SET message_count = message_count + delta` so concurrent
+    writers never lose an update; commit together with the Chat change.
+    """
+    User.query.filter_by(id=user_id).update(
+        {User.message_count: User.message_count + delta}, synchronize_session=False
+    )
+
+
+def _begin_turn(user_pk: int, message: str, received_at: datetime) -> int | None:
+    """Prepare to persist a chat turn ahead of (or alongside) the AI call.
+
+    Returns the id of the pending user message in CHAT_WRITE_MODE=durable,
+    otherwise None. Either way no transaction is left open afterwards.
+    """
+    if current_app.config.get('CHAT_WRITE_MODE') == 'durable':
+        # Make the user's message durable before the slow AI call; it is
+        # flagged pending until the reply lands, so a crash mid-call leaves
+        # a visible marker instead of a silently lost message.
+        user_chat = Chat(user_id=user_pk, message=message, sender='user', timestamp=received_at, pending=True)
+        db.session.add(user_chat)
+        _adjust_message_count(user_pk, 1)
+        db.session.flush()
+        index_chats([user_chat])
+        db.session.commit()
+        return user_chat.id
+
+    # End the read transaction opened by the user lookup so no DB
+    # transaction (or SQLite lock) is held across the AI call.
+    db.session.commit()
+    return None
+
+
+def _finish_turn(user_pk: int, message: str, received_at: datetime, sentiment: str, reply: str,
+                 pending_id: int | None) -> int:
+    """Write the whole turn in a single transaction; returns the new message count."""
+    new_chats = []
+    if pending_id is None:
+        new_chats.append(Chat(user_id=user_pk, message=message, sender='user', timestamp=received_at,
+                              sentiment=sentiment))
+    else:
+        Chat.query.filter_by(id=pending_id).update(
+            {Chat.pending: False, Chat.sentiment: sentiment}, synchronize_session=False
+        )
+    new_chats.append(Chat(user_id=user_pk, message=reply, sender='aira'))
+    db.session.add_all(new_chats)
+    db.session.flush()
+    index_chats(new_chats)
+    _adjust_message_count(user_pk, len(new_chats))
+    record_mood(user_pk, received_at, sentiment)
+    history_count = db.session.query(User.message_count).filter_by(id=user_pk).scalar()
+    db.session.commit()
+    return history_count
+
+
+_stage_pool = None
+_stage_pool_lock = threading.Lock()
+
+
+def _stage_executor() -> ThreadPoolExecutor:
+    global _stage_pool
+    if _stage_pool is None:
+        with _stage_pool_lock:
+            if _stage_pool is None:
+                _stage_pool = ThreadPoolExecutor(max_workers=STAGE_POOL_SIZE, thread_name_prefix='chat-stage')
+    return _stage_pool
+
+
+def _timed(fn, *args) -> tuple:
+    """(fn(*args), elapsed milliseconds)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def _submit_stage(fn, *args) -> Future:
+    """Run `fn(*args)` on the stage pool in its own app context (and DB session).
+
+    The future resolves to `(result, elapsed_ms)`, as `_timed` returns.
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return _timed(fn, *args)
+
+    return _stage_executor().submit(run)
+
+
+def _server_timing(timings: dict) -> str:
+    """Server-Timing header value, e.g. 'ai;dur=412.3, sentiment;dur=0.1'."""
+    return ', '.join(f'{name};dur={ms:.1f}' for name, ms in timings.items())
+
+
+def _refresh_summary(user_pk: int, history_count: int | None = None) -> None:
+    """Queue folding turns that left the context window into the summary.
+
+    Skipped while the user's `history_count` messages all still fit in the
+    window (nothing to fold), and coalesced with an update already waiting
+    for this user. Runs after the turn (or edit) is committed; a failure
+    here never fails it.
+    """
+    turns = current_app.config.get('AI_CONTEXT_TURNS', 0)
+    if turns <= 0 or (history_count is not None and history_count <= turns * 2):
+        return
+    try:
+        job_queue.enqueue_once('update_summary', user_id=user_pk)
+    except Exception:
+        current_app.logger.exception('Queueing the conversation summary update failed')
+        db.session.rollback()
+
+
+@chat_bp.route('/metrics/ai', methods=['GET'])
+def ai_metrics():
+    """Runtime metrics for the AI provider client (no provider call is made).
+
+    - http_pool: keep-alive pool sizing and connection reuse per host
+    - concurrency: provider call slots in flight, waiting and rejected
+    - rate_limits: token bucket state per provider/model
+    - circuit_breakers: breaker state per provider/model
+    - response_cache: cached replies and hit rate (AI_CACHE_ENABLED)
+    """
+    return jsonify({
+        'http_pool': ai_client.stats(),
+        'concurrency': ai_client.concurrency_stats(),
+        'rate_limits': rate_limiter.stats(),
+        'circuit_breakers': circuit_breakers.stats(),
+        'response_cache': response_cache.stats(),
+    }), 200
+
+
+@chat_bp.route('/metrics/jobs', methods=['GET'])
+def job_metrics():
+    """Background job queue depth by status and this process's job outcomes."""
+    return jsonify(job_queue.stats()), 200
+
+
+@chat_bp.route('/health/ai', methods=['GET'])
+def ai_health():
+    """Health of the configured AI providers as seen by their circuit breakers.
+
+    Returns 200 while at least one provider's circuit is closed or probing
+    (half-open) and 503 when every circuit is open, so load balancers and
+    uptime checks can alert on it.
+    """
+    chain = get_provider_chain()
+    if not chain:
+        return jsonify({'status': 'ok', 'providers': [{'provider': 'local-echo'}]}), 200
+
+    providers = []
+    for provider in chain:
+        circuit = circuit_breakers.breaker(provider.name, provider.model).stats()
+        providers.append({'provider': provider.name, 'model': provider.model, 'circuit': circuit})
+    healthy = any(p['circuit']['state'] != 'open' for p in providers)
+    degraded = any(p['circuit']['state'] == 'open' for p in providers)
+    status = 'ok' if not degraded else ('degraded' if healthy else 'down')
+    return jsonify({'status': status, 'providers': providers}), 200 if healthy else 503
+
+
 @chat_bp.route('/chat', methods=['POST'])
-@jwt_required()
+@identity_required
 def chat():
     """Main chat endpoint: takes user message, calls AI, stores both messages.
 
@@ -345,6 +602,19 @@ def chat():
     
     The AI response is generated by Groq (or configured AI provider) and both
     the user's message and Aira's reply are stored in the database.
+
+    No DB transaction is open while the AI call runs. With the default
+    CHAT_WRITE_MODE=batched both messages are inserted in one commit after
+    the reply arrives; CHAT_WRITE_MODE=durable commits the user's message
+    first (pending=True) and clears the flag in the same commit as the reply.
+
+    The provider also receives the recent turns and the rolling summary of
+    older ones (see `context.py`), within AI_CONTEXT_TOKEN_BUDGET.
+
+    The AI call runs on the request thread, so AI_MAX_CONCURRENCY and
+    AI_QUEUE_TIMEOUT bound it directly; in durable mode the pre-write runs
+    alongside it on the stage pool. Per-stage durations are returned in a
+    Server-Timing header (context, sentiment, prewrite, ai, persist, total).
     """
     try:
         data = request.get_json() or {}
@@ -352,34 +622,33 @@ def chat():
         if not message:
             return jsonify({'error': 'message is required'}), 400
 
-        user_id = get_jwt_identity()
-        try:
-            user_id = int(user_id)
-        except Exception:
-            pass
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        user_pk = current_user.id
+        received_at = datetime.utcnow()
+        started = time.perf_counter()
+        timings = {}
 
-        # Optional sentiment analysis
-        sentiment = detect_sentiment(message)
-
-        # Save user's message
-        user_chat = Chat(user_id=user.id, message=message, sender='user')
-        db.session.add(user_chat)
+        history, timings['context'] = _timed(build_context, user_pk, message)
+        # End the read transaction: no DB transaction (or SQLite lock) is
+        # held while the AI call runs
         db.session.commit()
 
-        # Call AI provider (Groq/Gemini)
-        ai_resp = get_gemini_response(message)
+        # The durable pre-write overlaps the AI call instead of delaying it
+        begin_future = None
+        if current_app.config.get('CHAT_WRITE_MODE') == 'durable':
+            begin_future = _submit_stage(_begin_turn, user_pk, message, received_at)
+        sentiment, timings['sentiment'] = _timed(detect_sentiment, message)
+        ai_resp, timings['ai'] = _timed(get_gemini_response, message, history)
+        pending_id = None
+        if begin_future is not None:
+            pending_id, timings['prewrite'] = begin_future.result()
         aira_reply = ai_resp.get('reply') if isinstance(ai_resp, dict) else str(ai_resp)
 
-        # Save Aira's reply
-        aira_chat = Chat(user_id=user.id, message=aira_reply, sender='aira')
-        db.session.add(aira_chat)
-        db.session.commit()
-
-        # Count chat history for this user
-        history_count = Chat.query.filter_by(user_id=user.id).count()
+        history_count, timings['persist'] = _timed(
+            _finish_turn, user_pk, message, received_at, sentiment, aira_reply, pending_id
+        )
+        timings['total'] = (time.perf_counter() - started) * 1000
+        _refresh_summary(user_pk, history_count)
+        current_app.logger.info('Chat turn timings: %s', _server_timing(timings))
 
         # Return simplified response for frontend
         response_data = {
@@ -387,7 +656,7 @@ def chat():
             'sentiment': sentiment,
             'history_length': history_count,
         }
-        return jsonify(response_data), 200
+        return jsonify(response_data), 200, {'Server-Timing': _server_timing(timings)}
 
     except Exception as exc:
         # Log error server-side for debugging
@@ -399,8 +668,90 @@ def chat():
         return jsonify({'error': 'Chat processing failed', 'details': str(exc)}), 500
 
 
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+@chat_bp.route('/chat/stream', methods=['POST'])
+@identity_required
+def chat_stream():
+    """Streaming variant of POST /chat using Server-Sent Events.
+
+    Request body: { message: str }
+    Emits, in order:
+    - event `meta`:  { sentiment }
+    - event `token`: { text } for each chunk as the provider generates it
+    - event `done`:  { response, sentiment, history_length, ttft_ms, total_ms }
+    - event `error`: { error } instead of `done` if the turn could not be saved
+
+    The assembled reply is persisted exactly like POST /chat once the
+    provider finishes. Point GEMINI_API_URL at `fake_provider.py` to try it
+    locally without an API key.
+    """
+    data = request.get_json() or {}
+    message = (data.get('message') or '').strip()
+    if not message:
+        return jsonify({'error': 'message is required'}), 400
+
+    user_pk = current_user.id
+    received_at = datetime.utcnow()
+    sentiment = detect_sentiment(message)
+    try:
+        history = build_context(user_pk, message)
+        pending_id = _begin_turn(user_pk, message, received_at)
+    except Exception as exc:
+        db.session.rollback()
+        return jsonify({'error': 'Chat processing failed', 'details': str(exc)}), 500
+
+    def generate():
+        started = time.perf_counter()
+        first_token_at = None
+        parts = []
+        yield _sse('meta', {'sentiment': sentiment})
+
+        try:
+            for text in stream_gemini_response(message, history):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(text)
+                yield _sse('token', {'text': text})
+        except Exception:
+            current_app.logger.exception('AI streaming call failed')
+            if not parts:
+                parts.append(AI_UNAVAILABLE_REPLY)
+                yield _sse('token', {'text': AI_UNAVAILABLE_REPLY})
+
+        reply = ''.join(parts) or PARSE_FAILURE_REPLY
+        try:
+            history_count = _finish_turn(user_pk, message, received_at, sentiment, reply, pending_id)
+        except Exception as exc:
+            current_app.logger.error(f'Chat stream persistence error: {exc}')
+            db.session.rollback()
+            yield _sse('error', {'error': 'Chat processing failed'})
+            return
+
+        ttft_ms = round((first_token_at - started) * 1000, 1) if first_token_at else None
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        current_app.logger.info('Chat stream finished: ttft=%sms total=%sms', ttft_ms, total_ms)
+        yield _sse('done', {
+            'response': reply,
+            'sentiment': sentiment,
+            'history_length': history_count,
+            'ttft_ms': ttft_ms,
+            'total_ms': total_ms,
+        })
+        _refresh_summary(user_pk, history_count)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
 @chat_bp.route('/chat/create', methods=['POST'])
-@jwt_required()
+@identity_required
 def create_chat():
     """Create an arbitrary chat record for the authenticated user.
 
@@ -414,9 +765,15 @@ def create_chat():
         if not message or sender not in ('user', 'aira'):
             return jsonify({'error': 'message and valid sender (user|aira) are required'}), 400
 
-        user_id = get_jwt_identity()
-        chat = Chat(user_id=user_id, message=message, sender=sender)
+        user_id = current_user.id
+        chat = Chat(user_id=user_id, message=message, sender=sender, timestamp=datetime.utcnow())
+        if sender == 'user':
+            chat.sentiment = detect_sentiment(message)
+            record_mood(user_id, chat.timestamp, chat.sentiment)
         db.session.add(chat)
+        _adjust_message_count(user_id, 1)
+        db.session.flush()
+        index_chats([chat])
         db.session.commit()
 
         return jsonify({'chat': chat.to_dict()}), 201
@@ -426,32 +783,300 @@ def create_chat():
         return jsonify({'error': 'Failed to create chat', 'details': str(exc)}), 500
 
 
+def _encode_cursor(chat: Chat) -> str:
+    """Encode a chat's (timestamp, id) keyset position as an opaque cursor."""
+    raw = f'{chat.timestamp.isoformat()}|{chat.id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor from `_encode_cursor`. Raises ValueError if malformed."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+    timestamp, chat_id = raw.rsplit('|', 1)
+    return datetime.fromisoformat(timestamp), int(chat_id)
+
+
+def _keyset_filter(key: tuple, direction: str):
+    """Row-value comparison on (timestamp, id) written portably for SQLite/Postgres."""
+    timestamp, chat_id = key
+    if direction == 'before':
+        return or_(Chat.timestamp < timestamp, and_(Chat.timestamp == timestamp, Chat.id < chat_id))
+    return or_(Chat.timestamp > timestamp, and_(Chat.timestamp == timestamp, Chat.id > chat_id))
+
+
+def _stream_ndjson(query, compress: str | None = None) -> Response:
+    """Stream query results as NDJSON, optionally gzip-compressed.
+
+    `compress` is 'encoding' for gzip as Content-Encoding (HTTP clients
+    decode it transparently) or 'file' for a gzip file (application/gzip,
+    saved compressed). `yield_per` makes SQLAlchemy use a server-side
+    cursor and fetch rows in batches, so memory stays flat regardless of
+    how many rows match.
+    """
+    rows = query.yield_per(HISTORY_STREAM_BATCH)
+
+    def generate():
+        for chat in rows:
+            yield json.dumps(chat.to_dict()) + '\n'
+
+    if compress == 'file':
+        return Response(stream_with_context(gzip_stream(generate())), mimetype=GZIP_MIMETYPE)
+    if compress == 'encoding':
+        return Response(
+            stream_with_context(gzip_stream(generate())),
+            mimetype=NDJSON_MIMETYPE,
+            headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'},
+        )
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
 @chat_bp.route('/chat/<int:user_id>', methods=['GET'])
-@jwt_required()
+@identity_required
 def get_history(user_id: int):
-    """Get chat history for a user. Only allowed if the JWT identity matches user_id."""
-    requester = get_jwt_identity()
+    """Get chat history for a user. Only allowed if the JWT identity matches user_id.
+
+    Pages are keyset-paginated on (timestamp, id) so each request touches at
+    most `limit` rows no matter how long the history is.
+
+    Query params:
+    - limit: page size (default 50, max 200)
+    - before: cursor; return messages older than it (default: latest page)
+    - after: cursor; return messages newer than it
+    - format=ndjson (or Accept: application/x-ndjson): stream every message
+      in the requested range as newline-delimited JSON, one row at a time
+
+    Returns: { history, length, has_more, cursors: { before, after } }
+    with messages in ascending order. Pass `cursors.before` back as `before`
+    to page further into the past, or `cursors.after` as `after` to poll for
+    newer messages.
+    """
+    before = request.args.get('before')
+    after = request.args.get('after')
+    if before and after:
+        return jsonify({'error': 'before and after cannot be combined'}), 400
+
     try:
-        requester = int(requester)
-    except Exception:
-        pass
-    if requester != user_id:
-        return jsonify({'error': 'Forbidden'}), 403
+        limit = int(request.args.get('limit', HISTORY_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, HISTORY_MAX_LIMIT))
 
-    chats = Chat.query.filter_by(user_id=user_id).order_by(Chat.timestamp.asc()).all()
-    return jsonify({'history': [c.to_dict() for c in chats], 'length': len(chats)}), 200
+    try:
+        before_key = _decode_cursor(before) if before else None
+        after_key = _decode_cursor(after) if after else None
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    query = Chat.query.filter_by(user_id=user_id)
+    if before_key:
+        query = query.filter(_keyset_filter(before_key, 'before'))
+    if after_key:
+        query = query.filter(_keyset_filter(after_key, 'after'))
+
+    wants_ndjson = (
+        request.args.get('format') == 'ndjson'
+        or request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+    )
+    if wants_ndjson:
+        return _stream_ndjson(query.order_by(Chat.timestamp.asc(), Chat.id.asc()))
+
+    if after_key:
+        rows = query.order_by(Chat.timestamp.asc(), Chat.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        # Newest-first so the limit keeps the latest messages, then flip back
+        rows = query.order_by(Chat.timestamp.desc(), Chat.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+
+    return jsonify({
+        'history': [c.to_dict() for c in rows],
+        'length': len(rows),
+        'has_more': has_more,
+        'cursors': {
+            'before': _encode_cursor(rows[0]) if rows else before,
+            'after': _encode_cursor(rows[-1]) if rows else after,
+        },
+    }), 200
+
+
+@chat_bp.route('/chat/export', methods=['GET'])
+@identity_required
+def export_chats():
+    """Export the authenticated user's whole history as streamed NDJSON.
+
+    One chat per line, oldest first, in the format POST /chat/import
+    accepts. `?compress=gzip` downloads a gzip file (aira-chats.ndjson.gz,
+    application/gzip); otherwise the NDJSON is sent with
+    `Content-Encoding: gzip` when Accept-Encoding allows it (q > 0), which
+    clients decode, so the file is aira-chats.ndjson either way.
+    """
+    user_id = current_user.id
+
+    if request.args.get('compress') == 'gzip':
+        compress, filename = 'file', 'aira-chats.ndjson.gz'
+    elif request.accept_encodings['gzip'] > 0:
+        compress, filename = 'encoding', 'aira-chats.ndjson'
+    else:
+        compress, filename = None, 'aira-chats.ndjson'
+    query = Chat.query.filter_by(user_id=user_id).order_by(Chat.timestamp.asc(), Chat.id.asc())
+    response = _stream_ndjson(query, compress=compress)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@chat_bp.route('/chat/import', methods=['POST'])
+@identity_required
+def import_chats():
+    """Bulk-import chats for the authenticated user from an NDJSON body.
+
+    Body: one chat per line (see `chat_transfer.py`), read as a stream;
+    send `Content-Encoding: gzip` for a compressed body. Records are
+    inserted IMPORT_BATCH at a time with one executemany INSERT and one
+    commit per batch, which also updates the message counter, mood
+    rollups and search index, and drops the conversation summary when the
+    imported messages predate what it already covers (it is then rebuilt).
+    Invalid lines are skipped.
+
+    A body over CHAT_IMPORT_MAX_BYTES once decompressed, or a line over
+    CHAT_IMPORT_MAX_LINE, stops the import with 413; batches committed
+    before that are kept (`imported` in the response).
+
+    Returns: { imported, skipped, errors: [{line, error}], history_length }
+    (at most IMPORT_MAX_ERRORS errors are listed).
+    """
+    user_pk = current_user.id
+    gzipped = request.headers.get('Content-Encoding', '').lower() == 'gzip'
+    lines = iter_lines(request.stream, gzipped, max_line=current_app.config['CHAT_IMPORT_MAX_LINE'],
+                       max_bytes=current_app.config['CHAT_IMPORT_MAX_BYTES'])
+
+    imported = skipped = 0
+    errors = []
+    batch = []
+    try:
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                batch.append(parse_chat_record(line))
+            except ValueError as exc:
+                skipped += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({'line': number, 'error': str(exc)})
+                continue
+            if len(batch) >= IMPORT_BATCH:
+                imported += _insert_chat_batch(user_pk, batch)
+                batch = []
+        if batch:
+            imported += _insert_chat_batch(user_pk, batch)
+    except BodyTooLarge as exc:
+        db.session.rollback()
+        return jsonify({'error': 'Import too large', 'details': str(exc), 'imported': imported}), 413
+    except (zlib.error, UnicodeDecodeError) as exc:
+        db.session.rollback()
+        return jsonify({'error': 'Could not decode request body', 'details': str(exc), 'imported': imported}), 400
+    except Exception as exc:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import chats', 'details': str(exc), 'imported': imported}), 500
+
+    history_count = db.session.query(User.message_count).filter_by(id=user_pk).scalar()
+    if imported:
+        _refresh_summary(user_pk, history_count)
+    return jsonify({
+        'imported': imported,
+        'skipped': skipped,
+        'errors': errors,
+        'history_length': history_count,
+    }), 200
+
+
+def _insert_chat_batch(user_pk: int, rows: list) -> int:
+    """Insert parsed chat records in one transaction; returns the row count."""
+    unscored = [row for row in rows if row['sender'] == 'user' and row['sentiment'] is None]
+    for row, label in zip(unscored, sentiment_analyzer.label_many(row['message'] for row in unscored)):
+        row['sentiment'] = label
+    for row in rows:
+        row['user_id'] = user_pk
+
+    ids = db.session.scalars(insert(Chat).returning(Chat.id, sort_by_parameter_order=True), rows).all()
+    # Rows older than the summary watermark would never be folded in
+    reset_summary(user_pk, *min((row['timestamp'], chat_id) for chat_id, row in zip(ids, rows)))
+    index_rows([{'id': chat_id, 'message': row['message'], 'user_id': user_pk} for chat_id, row in zip(ids, rows)])
+    _adjust_message_count(user_pk, len(rows))
+    apply_rollups(Counter((user_pk, row['timestamp'], row['sentiment']) for row in rows if row['sentiment']))
+    db.session.commit()
+    return len(rows)
+
+
+@chat_bp.route('/chat/search', methods=['GET'])
+@identity_required
+def search_history():
+    """Full-text search over the authenticated user's messages.
+
+    Query params:
+    - q: search terms; every term must match, the last one as a prefix
+    - limit: page size (default 20, max 100)
+    - offset: results to skip (use `next_offset` from the previous page)
+
+    Returns: { results: [chat + {snippet, rank}], has_more, next_offset },
+    best matches first. Snippets are HTML-escaped with matches in <mark>.
+    See `search.py` for the SQLite FTS5 / Postgres / LIKE backends.
+    """
+    user_id = current_user.id
+
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    offset = max(offset, 0)
+
+    results, has_more = search_chats(user_id, query, limit, offset)
+    return jsonify({
+        'results': results,
+        'has_more': has_more,
+        'next_offset': offset + len(results) if has_more else None,
+    }), 200
+
+
+@chat_bp.route('/chat/mood/<int:user_id>', methods=['GET'])
+@identity_required
+def get_mood(user_id: int):
+    """Mood trend: sentiment counts of the user's messages per day or week.
+
+    Query params:
+    - period: 'day' (default) or 'week'
+    - limit: number of most recent periods (default 30, max 366)
+
+    Returns: { period, moods: [{period_start, positive, neutral, negative,
+    total}, ...] } oldest first; periods without messages are omitted.
+    Served from the `mood_rollups` table, never by scanning chats.
+    """
+    period = request.args.get('period', 'day')
+    if period not in PERIODS:
+        return jsonify({'error': f"period must be one of: {', '.join(PERIODS)}"}), 400
+    try:
+        limit = int(request.args.get('limit', MOOD_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, MOOD_MAX_LIMIT))
+
+    return jsonify({'period': period, 'moods': mood_trend(user_id, period, limit)}), 200
 
 
 @chat_bp.route('/chat/update/<int:chat_id>', methods=['PUT'])
-@jwt_required()
+@identity_required
 def update_chat(chat_id: int):
     """Update a chat message. Only the owner may update their chat entries."""
     try:
-        user_id = get_jwt_identity()
-        try:
-            user_id = int(user_id)
-        except Exception:
-            pass
+        user_id = current_user.id
         chat = Chat.query.get(chat_id)
         if not chat:
             return jsonify({'error': 'Chat not found'}), 404
@@ -464,7 +1089,17 @@ def update_chat(chat_id: int):
             return jsonify({'error': 'message is required'}), 400
 
         chat.message = message
+        if chat.sentiment is not None:
+            sentiment = detect_sentiment(message)
+            if sentiment != chat.sentiment:
+                record_mood(chat.user_id, chat.timestamp, chat.sentiment, -1)
+                record_mood(chat.user_id, chat.timestamp, sentiment)
+                chat.sentiment = sentiment
+        index_chats([chat])
+        summary_reset = reset_summary(chat.user_id, chat.timestamp, chat.id)
         db.session.commit()
+        if summary_reset:
+            _refresh_summary(chat.user_id)
         return jsonify({'chat': chat.to_dict()}), 200
 
     except Exception as exc:
@@ -473,14 +1108,10 @@ def update_chat(chat_id: int):
 
 
 @chat_bp.route('/chat/delete/<int:chat_id>', methods=['DELETE'])
-@jwt_required()
+@identity_required
 def delete_chat(chat_id: int):
     try:
-        user_id = get_jwt_identity()
-        try:
-            user_id = int(user_id)
-        except Exception:
-            pass
+        user_id = current_user.id
         chat = Chat.query.get(chat_id)
         if not chat:
             return jsonify({'error': 'Chat not found'}), 404
@@ -488,7 +1119,13 @@ def delete_chat(chat_id: int):
             return jsonify({'error': 'Forbidden'}), 403
 
         db.session.delete(chat)
+        _adjust_message_count(chat.user_id, -1)
+        record_mood(chat.user_id, chat.timestamp, chat.sentiment, -1)
+        unindex_chats([chat.id])
+        summary_reset = reset_summary(chat.user_id, chat.timestamp, chat.id)
         db.session.commit()
+        if summary_reset:
+            _refresh_summary(chat.user_id)
         return jsonify({'status': 'deleted'}), 200
 
     except Exception as exc:
@@ -497,19 +1134,58 @@ def delete_chat(chat_id: int):
 
 
 @chat_bp.route('/chat/clear/<int:user_id>', methods=['DELETE'])
-@jwt_required()
+@identity_required
 def clear_chats(user_id: int):
-    requester = get_jwt_identity()
-    try:
-        requester = int(requester)
-    except Exception:
-        pass
-    if requester != user_id:
-        return jsonify({'error': 'Forbidden'}), 403
+    """Delete all of the user's chats, in short batched transactions.
+
+    Messages sent after the request started are kept.
+    """
     try:
-        deleted = Chat.query.filter_by(user_id=user_id).delete()
-        db.session.commit()
-        return jsonify({'status': 'cleared', 'deleted': deleted}), 200
+        deleted, batches = _delete_user_chats(user_id, current_app.config['CHAT_DELETE_BATCH'])
+        return jsonify({'status': 'cleared', 'deleted': deleted, 'batches': batches}), 200
     except Exception as exc:
         db.session.rollback()
         return jsonify({'error': 'Failed to clear chats', 'details': str(exc)}), 500
+
+
+def _delete_user_chats(user_id: int, batch_size: int) -> tuple:
+    """Delete the user's chats up to the current newest one, `batch_size` per commit.
+
+    A single DELETE over a long history holds the write lock (all of SQLite)
+    for its whole duration; committing every batch lets other users' chat
+    writes interleave. Each batch also unindexes the rows from search,
+    decrements the mood rollups and message counter, so the user's data is
+    consistent after every commit and an interrupted clear can just be
+    rerun. Returns (deleted, batches).
+    """
+    # The summary goes first, so an interrupted clear never leaves it behind
+    ConversationSummary.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+    max_id = db.session.query(func.max(Chat.id)).filter(Chat.user_id == user_id).scalar()
+    deleted = batches = 0
+    while max_id is not None:
+        rows = (
+            db.session.query(Chat.id, Chat.timestamp, Chat.sentiment)
+            .filter(Chat.user_id == user_id, Chat.id <= max_id)
+            .order_by(Chat.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        unindex_chats(ids)
+        Chat.query.filter(Chat.id.in_(ids)).delete(synchronize_session=False)
+        removed = Counter()
+        removed.subtract((user_id, row.timestamp, row.sentiment) for row in rows if row.sentiment)
+        apply_rollups(removed)
+        _adjust_message_count(user_id, -len(ids))
+        db.session.commit()
+        deleted += len(ids)
+        batches += 1
+
+    # Again, in case a summary job folded rows while the batches ran
+    ConversationSummary.query.filter_by(user_id=user_id).delete()
+    MoodRollup.query.filter_by(user_id=user_id, positive=0, neutral=0, negative=0).delete()
+    db.session.commit()
+    return deleted, batches
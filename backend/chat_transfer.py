@@ -0,0 +1,112 @@
+"""NDJSON streams for bulk chat import/export.
+
+Helpers used by POST /chat/import and GET /chat/export: reading an
+NDJSON request body line by line (optionally gzip-compressed) without
+buffering it, gzip-compressing a response stream chunk by chunk, and
+validating imported records. The routes in chat_routes.py do the
+database work.
+
+Record format (one JSON object per line, as exported):
+    {"message": "...", "sender": "user"|"aira",
+     "timestamp": "2025-01-31T12:00:00", "sentiment": "positive"}
+Only `message` and `sender` are required; `id`, `user_id` and `pending`
+are ignored on import, so an export can be imported into another account.
+"""
+import json
+import zlib
+from datetime import datetime, timezone
+
+READ_CHUNK = 64 * 1024
+MAX_LINE_BYTES = 256 * 1024
+SENDERS = ('user', 'aira')
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+
+class BodyTooLarge(Exception):
+    """An import body exceeded its decompressed size or line length cap."""
+
+
+def iter_lines(stream, gzipped: bool = False, max_line: int = MAX_LINE_BYTES, max_bytes: int | None = None):
+    """Yield decoded lines from a binary stream, decompressing gzip on the fly.
+
+    At most READ_CHUNK bytes are decompressed at a time, so memory stays
+    bounded by `max_line` plus one chunk however well the body compresses.
+    Raises BodyTooLarge for a line longer than `max_line` bytes or more
+    than `max_bytes` bytes of (decompressed) body.
+    """
+    pending = b''
+    total = 0
+    for data in _read_chunks(stream, gzipped):
+        total += len(data)
+        if max_bytes is not None and total > max_bytes:
+            raise BodyTooLarge(f'body larger than {max_bytes} bytes')
+        pending += data
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if len(line) > max_line:
+                raise BodyTooLarge(f'line longer than {max_line} bytes')
+            yield line.decode('utf-8')
+        if len(pending) > max_line:
+            raise BodyTooLarge(f'line longer than {max_line} bytes')
+    if pending:
+        yield pending.decode('utf-8')
+
+
+def _read_chunks(stream, gzipped: bool):
+    """The stream's bytes in pieces of at most READ_CHUNK, gunzipped if `gzipped`."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        if decompressor is None:
+            yield chunk
+            continue
+        yield decompressor.decompress(chunk, READ_CHUNK)
+        while decompressor.unconsumed_tail:
+            yield decompressor.decompress(decompressor.unconsumed_tail, READ_CHUNK)
+    if decompressor is not None:
+        yield decompressor.flush()
+
+
+def gzip_stream(chunks):
+    """Gzip-compress an iterable of str chunks as a stream of bytes."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def parse_chat_record(line: str) -> dict:
+    """Validate one NDJSON line into Chat column values; raises ValueError."""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f'invalid JSON: {exc.msg}') from None
+    if not isinstance(record, dict):
+        raise ValueError('record must be a JSON object')
+
+    message = record.get('message')
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError('message is required')
+    sender = record.get('sender')
+    if sender not in SENDERS:
+        raise ValueError('sender must be user or aira')
+
+    timestamp = record.get('timestamp')
+    if timestamp is None:
+        timestamp = datetime.utcnow()
+    else:
+        try:
+            timestamp = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError('timestamp must be ISO 8601') from None
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+    sentiment = record.get('sentiment')
+    if sender != 'user' or sentiment not in SENTIMENTS:
+        sentiment = None
+    return {'message': message, 'sender': sender, 'timestamp': timestamp, 'sentiment': sentiment}
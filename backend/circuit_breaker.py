@@ -0,0 +1,175 @@
+"""Circuit breakers for AI provider calls.
+
+When a provider is down every chat request would otherwise wait out the
+connect/read timeout before giving up, tying up a worker each time. A
+`CircuitBreaker` counts consecutive provider failures (connection errors,
+timeouts, HTTP 5xx) and, after AI_BREAKER_FAILURES of them, opens: calls
+fail immediately with `CircuitOpenError` for AI_BREAKER_RESET_SECONDS.
+Then it half-opens and lets AI_BREAKER_PROBES calls through; a successful
+probe closes it again, a failed one re-opens it.
+
+Errors that say nothing about provider health (4xx, local rate limiting or
+concurrency rejections) neither trip nor reset the breaker.
+
+The `circuit_breakers` singleton holds one breaker per provider/model and
+is configured in the app factory via `init_app`.
+"""
+import os
+import threading
+import time
+
+import requests
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit is open; the call was not attempted."""
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """True for errors that indicate the provider itself is unhealthy."""
+    if isinstance(exc, (requests.exceptions.ConnectionError,
+                        requests.exceptions.Timeout,
+                        requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open breaker for one provider."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, half_open_probes: int):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(half_open_probes, 1)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._rejected = 0
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def allow(self) -> bool:
+        """Reserve permission for one call; False means fail fast."""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def check(self) -> None:
+        """`allow()` that raises CircuitOpenError instead of returning False."""
+        if not self.allow():
+            raise CircuitOpenError('AI provider circuit is open; failing fast')
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes_in_flight = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open(time.monotonic())
+                return
+            self._failures += 1
+            if self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._open(time.monotonic())
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Classify `exc`: provider failures count, anything else just frees a probe."""
+        if is_provider_failure(exc):
+            self.record_failure()
+        else:
+            self.release()
+
+    def release(self) -> None:
+        """End a call without a verdict on provider health (frees a probe slot)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._trips += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'retry_in': round(max(self._opened_at + self.reset_timeout - now, 0.0), 2)
+                if self._state == OPEN else 0.0,
+                'trips': self._trips,
+                'rejected': self._rejected,
+            }
+
+
+class CircuitBreakers:
+    """Registry of breakers keyed by (provider, model)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self.failure_threshold = 5
+        self.reset_timeout = 30.0
+        self.half_open_probes = 1
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('AI_BREAKER_FAILURES', int(os.getenv('AI_BREAKER_FAILURES', '5')))
+        app.config.setdefault('AI_BREAKER_RESET_SECONDS', float(os.getenv('AI_BREAKER_RESET_SECONDS', '30')))
+        app.config.setdefault('AI_BREAKER_PROBES', int(os.getenv('AI_BREAKER_PROBES', '1')))
+
+        with self._lock:
+            self.failure_threshold = app.config['AI_BREAKER_FAILURES']
+            self.reset_timeout = app.config['AI_BREAKER_RESET_SECONDS']
+            self.half_open_probes = app.config['AI_BREAKER_PROBES']
+            self._breakers = {}
+
+        app.extensions['circuit_breakers'] = self
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout, self.half_open_probes)
+                    self._breakers[key] = breaker
+        return breaker
+
+    def stats(self) -> dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {f'{provider}/{model}': breaker.stats() for (provider, model), breaker in breakers.items()}
+
+
+# Process-wide singleton (configured in app factory)
+circuit_breakers = CircuitBreakers()
@@ -0,0 +1,227 @@
+"""Conversation context for AI calls.
+
+Each chat turn sends the provider a bounded view of the conversation
+instead of the single latest message:
+
+- the last AI_CONTEXT_TURNS turns (user message + Aira reply), read newest
+  first through the (user_id, timestamp, id) index
+- a rolling per-user `ConversationSummary` of everything older, prepended
+  as a system message
+
+The summary is extractive and incremental: after each turn, messages that
+have slid out of the recent window are folded in (the most informative
+sentence of each user message becomes one line) and the oldest lines are
+dropped once it exceeds AI_SUMMARY_MAX_CHARS. The summary is only
+rebuilt from the full history when a message already folded into it is
+edited or deleted (`reset_summary`), so removed text is never sent again.
+
+Everything is trimmed to AI_CONTEXT_TOKEN_BUDGET, estimated at four
+characters per token; the newest turns win over older ones and over the
+summary, so prompt size stays bounded however long the conversation gets.
+
+Configuration (app.config, defaults read from the environment):
+- AI_CONTEXT_TURNS: recent turns sent with each message (default 6; 0
+  sends only the latest message, as before)
+- AI_CONTEXT_TOKEN_BUDGET: approximate tokens for summary, history and the
+  new message together (default 1500)
+- AI_SUMMARY_MAX_CHARS: rolling summary size cap (default 1500)
+"""
+import math
+import os
+import re
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from models import db, Chat, ConversationSummary
+from jobs import job_queue
+
+CHARS_PER_TOKEN = 4
+SUMMARY_FOLD_BATCH = 200
+SUMMARY_POINT_CHARS = 160
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r'\w+')
+_WHITESPACE = re.compile(r'\s+')
+
+ROLES = {'user': 'user', 'aira': 'assistant'}
+
+
+def init_app(app) -> None:
+    app.config.setdefault('AI_CONTEXT_TURNS', int(os.getenv('AI_CONTEXT_TURNS', '6')))
+    app.config.setdefault('AI_CONTEXT_TOKEN_BUDGET', int(os.getenv('AI_CONTEXT_TOKEN_BUDGET', '1500')))
+    app.config.setdefault('AI_SUMMARY_MAX_CHARS', int(os.getenv('AI_SUMMARY_MAX_CHARS', '1500')))
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def build_context(user_id: int, message: str) -> list:
+    """Messages to send ahead of `message`, as [{'role', 'content'}] oldest first.
+
+    Starts with a 'system' entry holding the rolling summary when there is
+    one and it fits the budget. Returns [] when context is disabled or the
+    user has no history.
+    """
+    turns = current_app.config.get('AI_CONTEXT_TURNS', 0)
+    if turns <= 0:
+        return []
+
+    budget = current_app.config['AI_CONTEXT_TOKEN_BUDGET'] - estimate_tokens(message)
+    recent = (
+        Chat.query.filter_by(user_id=user_id, pending=False)
+        .order_by(Chat.timestamp.desc(), Chat.id.desc())
+        .limit(turns * 2)
+        .all()
+    )
+
+    history = []
+    for chat in recent:
+        cost = estimate_tokens(chat.message)
+        if cost > budget:
+            break
+        budget -= cost
+        history.append({'role': ROLES.get(chat.sender, 'user'), 'content': chat.message})
+    history.reverse()
+
+    summary = db.session.get(ConversationSummary, user_id)
+    if summary is not None and summary.summary:
+        text = _fit_summary(summary.summary, budget)
+        if text:
+            history.insert(0, {'role': 'system', 'content': f'Summary of the earlier conversation:\n{text}'})
+    return history
+
+
+def _fit_summary(summary: str, budget: int) -> str:
+    """Newest summary lines that fit in `budget` tokens."""
+    kept = []
+    for line in reversed(summary.splitlines()):
+        cost = estimate_tokens(line) + 1
+        if cost > budget:
+            break
+        budget -= cost
+        kept.append(line)
+    return '\n'.join(reversed(kept))
+
+
+@job_queue.task('update_summary')
+def update_summary(user_id: int) -> int:
+    """Fold messages that left the recent window into the user's summary.
+
+    Only messages after the summary's (last_chat_timestamp, last_chat_id)
+    watermark are read, in the same (timestamp, id) order the window uses,
+    so the cost per call is bounded by what changed since the last one (the
+    whole history after `reset_summary`). Ids alone would not do: imported
+    chats get new ids with old timestamps. Folds SUMMARY_FOLD_BATCH messages per
+    commit and returns the number of messages folded.
+    """
+    turns = current_app.config.get('AI_CONTEXT_TURNS', 0)
+    if turns <= 0:
+        return 0
+
+    # Oldest message still inside the window; everything before it is summarized
+    boundary = (
+        db.session.query(Chat.timestamp, Chat.id)
+        .filter_by(user_id=user_id, pending=False)
+        .order_by(Chat.timestamp.desc(), Chat.id.desc())
+        .offset(turns * 2 - 1)
+        .limit(1)
+        .first()
+    )
+    if boundary is None:
+        return 0
+
+    folded = 0
+    while True:
+        count = _fold_batch(user_id, boundary)
+        folded += count
+        if count < SUMMARY_FOLD_BATCH:
+            return folded
+
+
+def _fold_batch(user_id: int, boundary) -> int:
+    row = db.session.get(ConversationSummary, user_id)
+    query = Chat.query.filter(
+        Chat.user_id == user_id,
+        Chat.pending.is_(False),
+        or_(Chat.timestamp < boundary.timestamp,
+            and_(Chat.timestamp == boundary.timestamp, Chat.id < boundary.id)),
+    )
+    if row is not None and row.last_chat_timestamp is not None:
+        query = query.filter(or_(
+            Chat.timestamp > row.last_chat_timestamp,
+            and_(Chat.timestamp == row.last_chat_timestamp, Chat.id > row.last_chat_id),
+        ))
+    outside = (
+        query.order_by(Chat.timestamp, Chat.id)
+        .limit(SUMMARY_FOLD_BATCH)
+        .all()
+    )
+    if not outside:
+        return 0
+
+    if row is None:
+        row = ConversationSummary(user_id=user_id, summary='', last_chat_id=0)
+        db.session.add(row)
+    lines = row.summary.splitlines() if row.summary else []
+    for chat in outside:
+        if chat.sender == 'user':
+            point = extract_point(chat.message)
+            if point:
+                lines.append(f'- {point}')
+    row.summary = _trim_lines(lines, current_app.config['AI_SUMMARY_MAX_CHARS'])
+    row.last_chat_timestamp, row.last_chat_id = outside[-1].timestamp, outside[-1].id
+    db.session.commit()
+    return len(outside)
+
+
+def reset_summary(user_id: int, timestamp: datetime, chat_id: int) -> bool:
+    """Drop the user's summary if its watermark is at or past (timestamp, chat_id).
+
+    Call when a message is edited or deleted, in the same transaction: a
+    summary line extracted from it would otherwise keep being sent to the
+    provider. Also call when importing messages older than the watermark,
+    which folding would otherwise never reach. Does not commit; returns
+    True if the summary was dropped, after which `update_summary` rebuilds
+    it from the remaining history.
+    """
+    deleted = (
+        ConversationSummary.query
+        .filter(
+            ConversationSummary.user_id == user_id,
+            or_(ConversationSummary.last_chat_timestamp > timestamp,
+                and_(ConversationSummary.last_chat_timestamp == timestamp,
+                     ConversationSummary.last_chat_id >= chat_id)),
+        )
+        .delete()
+    )
+    return deleted > 0
+
+
+def extract_point(message: str) -> str | None:
+    """The most informative sentence of a message, or None for small talk.
+
+    Sentences are scored by their number of content words (longer than
+    three letters); ties go to the earliest. Messages with fewer than three
+    words ("hi", "ok thanks") carry nothing worth keeping.
+    """
+    text = _WHITESPACE.sub(' ', message).strip()
+    if len(_WORD.findall(text)) < 3:
+        return None
+    sentences = _SENTENCE_END.split(text)
+    best = max(sentences, key=lambda s: sum(1 for w in _WORD.findall(s) if len(w) > 3))
+    if len(best) > SUMMARY_POINT_CHARS:
+        best = best[:SUMMARY_POINT_CHARS - 1].rstrip() + '…'
+    return best
+
+
+def _trim_lines(lines: list, max_chars: int) -> str:
+    """Join `lines`, dropping the oldest until the text fits `max_chars`."""
+    total = sum(len(line) + 1 for line in lines)
+    start = 0
+    while start < len(lines) and total > max_chars:
+        total -= len(lines[start]) + 1
+        start += 1
+    return '\n'.join(lines[start:])
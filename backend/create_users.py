@@ -1,10 +1,12 @@
 """
 Quick script to create test users for Aira
 Run: python create_users.py
+
+For whole cohorts use `flask --app app provision-users FILE` instead.
 """
 from app import create_app
-from models import db, User
-from auth_routes import bcrypt
+from models import db
+from provisioning import provision_users
 
 def create_test_users():
     app = create_app()
@@ -30,23 +32,10 @@ def create_test_users():
             {'name': 'Demo User', 'email': 'demo@aira.com', 'password': 'demo123'},
         ]
         
-        for user_data in test_users:
-            # Check if user already exists
-            existing = User.query.filter_by(email=user_data['email']).first()
-            if existing:
-                print(f"✓ User {user_data['email']} already exists")
-                continue
-            
-            # Create new user
-            user = User(
-                name=user_data['name'],
-                email=user_data['email'],
-                password_hash=bcrypt.generate_password_hash(user_data['password']).decode('utf-8')
-            )
-            db.session.add(user)
-            print(f"✓ Created user: {user_data['email']} (password: {user_data['password']})")
+        # Existing emails are skipped; all new users are hashed in parallel
+        counts = provision_users(test_users)
+        print(f"✓ Created {counts['created']} users ({counts['existing']} already existed)")
         
-        db.session.commit()
         print("\n=== All test users created successfully! ===")
         print("\nLogin credentials:")
         for user_data in test_users:
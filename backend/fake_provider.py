@@ -0,0 +1,91 @@
+"""
+Local fake AI provider for development and latency testing.
+
+Serves an OpenAI-compatible /v1/chat/completions endpoint (the format Groq
+uses), both plain and with `stream: true` Server-Sent Events, so the chat
+endpoints can be exercised without an API key or network access.
+
+Run:
+    python fake_provider.py --port 8001 --first-token-ms 300 --token-ms 40
+
+Then start the backend with:
+    GEMINI_PROVIDER=groq
+    GEMINI_API_KEY=fake
+    GEMINI_API_URL=http://127.0.0.1:8001/v1/chat/completions
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    first_token_delay = 0.3
+    token_delay = 0.04
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        messages = body.get('messages') or [{}]
+        prompt = messages[-1].get('content', '')
+        words = f"You said: {prompt}. I'm here for you.".split(' ')
+
+        if body.get('stream'):
+            self._stream(words)
+        else:
+            time.sleep(self.first_token_delay + self.token_delay * len(words))
+            self._send_json({'choices': [{'message': {'role': 'assistant', 'content': ' '.join(words)}}]})
+
+    def _send_json(self, data: dict):
+        out = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _stream(self, words: list):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        time.sleep(self.first_token_delay)
+        try:
+            for index, word in enumerate(words):
+                text = word if index == 0 else ' ' + word
+                self._write_chunk(f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}\n\n")
+                time.sleep(self.token_delay)
+            self._write_chunk('data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the stream (e.g. lost a hedged race)
+            self.close_connection = True
+
+    def _write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake AI provider')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--first-token-ms', type=float, default=300)
+    parser.add_argument('--token-ms', type=float, default=40)
+    args = parser.parse_args()
+
+    FakeProviderHandler.first_token_delay = args.first_token_ms / 1000
+    FakeProviderHandler.token_delay = args.token_ms / 1000
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeProviderHandler)
+    print(f'Fake AI provider on http://{args.host}:{args.port}/v1/chat/completions')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Gunicorn settings for the Procfile `web` process.
+
+The app is served by gevent workers (see `ai_client.py`): every request is
+a greenlet, so a request waiting on the AI provider costs a few KB rather
+than a worker thread. gevent's monkey-patching makes sockets, threads and
+locks cooperative, which covers the provider calls, the chat stage pool
+and the password hashing pool, but not psycopg2: it is a C driver that
+talks to Postgres on its own socket, and every query would block the
+whole worker. `post_fork` installs psycogreen's wait callback so psycopg2
+yields to the event loop while it waits on the server.
+
+Configuration (environment; gunicorn itself reads PORT and WEB_CONCURRENCY):
+- GUNICORN_WORKER_CLASS: 'gevent' (default) or e.g. 'gthread'
+- GUNICORN_THREADS: threads per worker for 'gthread' (default 8)
+- GUNICORN_WORKER_CONNECTIONS: concurrent greenlets per gevent worker (default 500)
+"""
+import os
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+threads = int(os.getenv('GUNICORN_THREADS') or 8)
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS') or 500)
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        # SQLite deployments have nothing to patch
+        return
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    server.log.info('psycopg2 patched for gevent (worker %s)', worker.pid)
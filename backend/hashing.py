@@ -0,0 +1,203 @@
+"""Password hashing off the request threads.
+
+bcrypt is CPU-bound by design; at cost 12 one hash takes a few hundred
+milliseconds, so a burst of logins would otherwise occupy every request
+worker with hashing. `password_hasher` runs bcrypt in a dedicated process
+pool: request threads wait on the result, but the CPU work is spread over
+PASSWORD_HASH_WORKERS processes, and once PASSWORD_HASH_MAX_PENDING hashes
+are queued or running further requests fail fast with `HasherBusy` (the
+routes answer 503 + Retry-After) instead of piling up.
+
+Hashes are compatible with Flask-Bcrypt (same BCRYPT_LOG_ROUNDS,
+BCRYPT_HASH_PREFIX and BCRYPT_HANDLE_LONG_PASSWORDS settings). Hashes
+made with another cost than BCRYPT_LOG_ROUNDS still verify;
+`needs_rehash` tells login to re-hash the password at the current cost.
+
+The pool starts its processes with 'spawn' (forking a multi-threaded
+server is unsafe), which re-imports the main module in each of them:
+scripts that hash passwords must keep their entry point under
+`if __name__ == '__main__':`.
+
+Configuration (app.config, defaults read from the environment):
+- BCRYPT_LOG_ROUNDS: bcrypt cost for new hashes (default 12)
+- PASSWORD_HASH_WORKERS: hashing processes (default: CPU count; 0 hashes
+  on the request thread)
+- PASSWORD_HASH_MAX_PENDING: hashes queued or running before new ones are
+  refused (default 8 per worker)
+- PASSWORD_HASH_TIMEOUT: seconds a request waits for its hash (default 10);
+  a hash that takes longer is cancelled if it has not started and the
+  request gets `HasherBusy` too
+
+A slot is held until the hash itself finishes, not just until the request
+stops waiting, so PASSWORD_HASH_MAX_PENDING bounds the real backlog. If a
+hashing process dies the pool is broken for good; it is then replaced and
+the hash retried once on the new pool.
+"""
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """Too many hashes pending; the caller should retry shortly."""
+
+
+def _password_bytes(password: str, handle_long: bool) -> bytes:
+    password = password.encode('utf-8')
+    if handle_long:
+        password = hashlib.sha256(password).hexdigest().encode('utf-8')
+    return password
+
+
+def _generate(password: str, rounds: int, prefix: str, handle_long: bool) -> str:
+    salt = bcrypt.gensalt(rounds=rounds, prefix=prefix.encode('utf-8'))
+    return bcrypt.hashpw(_password_bytes(password, handle_long), salt).decode('utf-8')
+
+
+def _check(pw_hash: str, password: str, handle_long: bool) -> bool:
+    pw_hash = pw_hash.encode('utf-8')
+    return hmac.compare_digest(bcrypt.hashpw(_password_bytes(password, handle_long), pw_hash), pw_hash)
+
+
+def hash_rounds(pw_hash: str) -> int | None:
+    """The cost factor of a '$2b$12$...' hash (None if unparseable)."""
+    try:
+        return int(pw_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """bcrypt in a bounded process pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._slots = None
+        self.rounds = 12
+        self.prefix = '2b'
+        self.handle_long = False
+        self.workers = 0
+        self.timeout = 10.0
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('BCRYPT_LOG_ROUNDS', int(os.getenv('BCRYPT_LOG_ROUNDS', '12')))
+        # Unset or empty: sized from the CPU count
+        app.config.setdefault('PASSWORD_HASH_WORKERS', int(
+            os.getenv('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+        ))
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', int(
+            os.getenv('PASSWORD_HASH_MAX_PENDING') or 8 * max(app.config['PASSWORD_HASH_WORKERS'], 1)
+        ))
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', float(os.getenv('PASSWORD_HASH_TIMEOUT', '10')))
+
+        self.shutdown()
+        with self._lock:
+            self.rounds = app.config['BCRYPT_LOG_ROUNDS']
+            self.prefix = app.config.get('BCRYPT_HASH_PREFIX', '2b')
+            self.handle_long = app.config.get('BCRYPT_HANDLE_LONG_PASSWORDS', False)
+            self.workers = max(app.config['PASSWORD_HASH_WORKERS'], 0)
+            self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+            self._slots = threading.BoundedSemaphore(max(app.config['PASSWORD_HASH_MAX_PENDING'], 1))
+
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password: str) -> str:
+        """bcrypt hash of `password` at the configured cost."""
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._call(_generate, password, self.rounds, self.prefix, self.handle_long)
+
+    def hash_many(self, passwords: list) -> list:
+        """Hashes of `passwords`, in order, spread over every worker.
+
+        For bulk jobs (user provisioning); not bounded by
+        PASSWORD_HASH_MAX_PENDING, so keep it off the request path.
+        """
+        if any(not password for password in passwords):
+            raise ValueError('Password must be non-empty.')
+        args = ([self.rounds] * len(passwords), [self.prefix] * len(passwords), [self.handle_long] * len(passwords))
+        if not self.workers:
+            return list(map(_generate, passwords, *args))
+        chunksize = max(len(passwords) // (self.workers * 4), 1)
+        pool = self._executor()
+        try:
+            return list(pool.map(_generate, passwords, *args, chunksize=chunksize))
+        except BrokenProcessPool:
+            # Replaced on next use; bulk callers can simply rerun
+            self._discard(pool)
+            raise
+
+    def check(self, pw_hash: str, password: str) -> bool:
+        """Constant-time check of `password` against a stored hash."""
+        return self._call(_check, pw_hash, password, self.handle_long)
+
+    def needs_rehash(self, pw_hash: str) -> bool:
+        return hash_rounds(pw_hash) != self.rounds
+
+    def _call(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        for attempt in range(2):
+            pool, future = self._submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                # Frees the slot now if the hash never started
+                future.cancel()
+                raise HasherBusy('Password hash timed out') from None
+            except BrokenProcessPool:
+                # A hashing process died; retry once on a fresh pool
+                self._discard(pool)
+                if attempt:
+                    raise
+
+    def _submit(self, fn, *args) -> tuple:
+        """(pool, future) for `fn(*args)`, holding a slot until the future is done."""
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HasherBusy('Too many password hashes pending')
+        try:
+            pool = self._executor()
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self._discard(pool)
+                pool = self._executor()
+                future = pool.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return pool, future
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next call starts a new one."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Process-wide singleton (configured in app factory)
+password_hasher = PasswordHasher()
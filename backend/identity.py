@@ -0,0 +1,154 @@
+"""Request identity: JWT verification and the authenticated user.
+
+Protected routes use `@identity_required` and read `current_user`, a
+compact `UserRecord` (id, name, is_active), instead of converting
+`get_jwt_identity()` to an int and querying `users` themselves.
+
+- The token verification key is prepared once per app rather than read
+  from config (and, for RS*/ES* keys, parsed from PEM) on every request.
+- User records are kept in a bounded per-process LRU, so a token is
+  resolved to its user without a database round-trip. Entries are
+  dropped when the User row is updated or deleted through the ORM
+  (SQLAlchemy mapper events) and expire after IDENTITY_CACHE_TTL seconds,
+  which bounds staleness for changes made by other processes or by bulk
+  UPDATEs; call `identity_cache.invalidate(user_id)` after the latter.
+- Tokens of deleted or deactivated users get a 401, so clients drop them.
+
+Configuration (app.config, defaults read from the environment):
+- IDENTITY_CACHE_SIZE: user records cached per process (default 1024)
+- IDENTITY_CACHE_TTL: seconds a cached record is trusted (default 60)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+import jwt as pyjwt
+from flask import current_app, jsonify
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import event
+
+from models import db, User
+
+UserRecord = namedtuple('UserRecord', ('id', 'name', 'is_active'))
+
+
+class IdentityCache:
+    """Bounded LRU of `UserRecord`s keyed by user id, with per-entry expiry."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = 1024
+        self.ttl = 60.0
+        self._hits = 0
+        self._misses = 0
+
+    def init_app(self, app, jwt) -> None:
+        """Configure the cache and register the lookup callbacks on `jwt`."""
+        app.config.setdefault('IDENTITY_CACHE_SIZE', int(os.getenv('IDENTITY_CACHE_SIZE', '1024')))
+        app.config.setdefault('IDENTITY_CACHE_TTL', float(os.getenv('IDENTITY_CACHE_TTL', '60')))
+
+        with self._lock:
+            self.max_entries = max(app.config['IDENTITY_CACHE_SIZE'], 0)
+            self.ttl = app.config['IDENTITY_CACHE_TTL']
+            self._entries.clear()
+            self._hits = self._misses = 0
+
+        app.extensions['identity_decode_key'] = _prepare_decode_key(app.config)
+        jwt.decode_key_loader(_decode_key)
+        jwt.user_lookup_loader(_lookup_user)
+        jwt.user_lookup_error_loader(_lookup_error)
+        app.extensions['identity_cache'] = self
+
+    def get(self, user_id: int) -> UserRecord | None:
+        """The user's record, from the cache or loaded (and cached) from the database."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        row = db.session.query(User.id, User.name, User.is_active).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        record = UserRecord(row.id, row.name, row.is_active)
+        if self.max_entries:
+            with self._lock:
+                self._entries[user_id] = (record, time.monotonic() + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return record
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else None,
+            }
+
+
+def _prepare_decode_key(config):
+    """The key tokens are verified with, in the form PyJWT uses directly."""
+    algorithm = config.get('JWT_ALGORITHM', 'HS256')
+    if algorithm.startswith('HS'):
+        key = config.get('JWT_SECRET_KEY') or config.get('SECRET_KEY')
+        return key.encode('utf-8') if isinstance(key, str) else key
+    # Parse the PEM public key once instead of on every request
+    return pyjwt.get_algorithm_by_name(algorithm).prepare_key(config['JWT_PUBLIC_KEY'])
+
+
+def _decode_key(jwt_header: dict, jwt_data: dict):
+    return current_app.extensions['identity_decode_key']
+
+
+def _lookup_user(jwt_header: dict, jwt_data: dict) -> UserRecord | None:
+    try:
+        user_id = int(jwt_data[current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')])
+    except (KeyError, TypeError, ValueError):
+        return None
+    record = identity_cache.get(user_id)
+    if record is None or not record.is_active:
+        return None
+    return record
+
+
+def _lookup_error(jwt_header: dict, jwt_data: dict):
+    return jsonify({'error': 'User not found or inactive'}), 401
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user(mapper, connection, target) -> None:
+    identity_cache.invalidate(target.id)
+
+
+def identity_required(fn):
+    """`jwt_required()` that also resolves `current_user`.
+
+    Routes with a `user_id` URL argument answer 403 unless it is the
+    authenticated user's own id.
+    """
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if 'user_id' in kwargs and kwargs['user_id'] != current_user.id:
+            return jsonify({'error': 'Forbidden'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+# Process-wide singleton (configured in app factory)
+identity_cache = IdentityCache()
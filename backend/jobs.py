@@ -0,0 +1,396 @@
+"""Background job queue for work that does not need to finish before the response.
+
+Tasks are plain functions registered with `@job_queue.task('name')`; a
+request calls `job_queue.enqueue('name', **kwargs)` and returns, and a
+worker thread runs the task later in its own app context (and DB
+session). A task that raises is retried with exponential backoff up to
+JOB_MAX_ATTEMPTS runs, then kept as 'failed' with its last error.
+
+Tasks currently registered:
+- update_summary (context.py): fold old turns into the rolling summary
+  once a turn pushes messages out of the context window (coalesced: at
+  most one waiting job per user)
+- backfill_sentiment (mood.py): `flask backfill-sentiment --enqueue`
+
+Brokers:
+- 'database' (default): the `jobs` table. Jobs survive restarts and can
+  be run by another process (`flask --app app run-jobs`); a job claimed
+  by a worker that died is run again once JOB_LEASE has passed, or marked
+  failed if that was its last attempt.
+- 'memory': in-process queue, a local stand-in for an external broker;
+  jobs are lost when the process exits.
+- 'inline': no queue, tasks run inside `enqueue` (tests, debugging).
+
+In-process workers start on the first enqueue; JOB_WORKERS=0 leaves the
+jobs to a separate `run-jobs` process.
+
+Configuration (app.config, defaults read from the environment):
+- JOB_QUEUE_BACKEND: 'database', 'memory' or 'inline'
+- JOB_WORKERS: worker threads per process (default 2)
+- JOB_MAX_ATTEMPTS: runs per job before giving up (default 3)
+- JOB_RETRY_DELAY: seconds before the first retry, doubled each time (default 5)
+- JOB_POLL_INTERVAL: seconds an idle worker waits between checks (default 1)
+- JOB_LEASE: seconds after which a running job is presumed abandoned (default 300)
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, update
+
+from models import db, Job
+
+STATUSES = ('queued', 'running', 'failed')
+
+
+class QueuedJob:
+    """A claimed job as handed to a worker."""
+
+    __slots__ = ('id', 'task', 'payload', 'attempts', 'max_attempts')
+
+    def __init__(self, id, task, payload, attempts, max_attempts):
+        self.id = id
+        self.task = task
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+
+class DatabaseBroker:
+    """Jobs stored in the `jobs` table; needs an app context."""
+
+    def __init__(self, lease: float):
+        self.lease = lease
+
+    def enqueue(self, task: str, payload: dict, max_attempts: int) -> int:
+        """Insert the job and commit the current session."""
+        job = Job(task=task, payload=_encode(payload), max_attempts=max_attempts, run_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+    def find_queued(self, task: str, payload: dict) -> int | None:
+        """Id of a job for `task(**payload)` still waiting to run, if any."""
+        job_id = db.session.query(Job.id).filter(
+            Job.status == 'queued', Job.task == task, Job.payload == _encode(payload)
+        ).limit(1).scalar()
+        db.session.commit()
+        return job_id
+
+    def claim(self) -> QueuedJob | None:
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(Job.status == 'queued', Job.run_at <= now),
+            and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=self.lease)),
+        )
+        while True:
+            job = Job.query.filter(claimable).order_by(Job.run_at, Job.id).first()
+            if job is None:
+                db.session.rollback()
+                return None
+            if job.status == 'running' and job.attempts >= job.max_attempts:
+                # Its worker died on the last attempt (possibly killed by the
+                # task itself); running it again could repeat that forever
+                db.session.execute(
+                    update(Job)
+                    .where(Job.id == job.id, Job.status == 'running', Job.attempts == job.attempts)
+                    .values(status='failed', locked_at=None,
+                            last_error=f'Worker lost after {job.attempts} attempts (lease expired)')
+                )
+                db.session.commit()
+                continue
+            # Guarded update: only one worker (in any process) wins the row
+            claimed = db.session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == job.status, Job.attempts == job.attempts)
+                .values(status='running', attempts=Job.attempts + 1, locked_at=now)
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return QueuedJob(job.id, job.task, json.loads(job.payload), job.attempts, job.max_attempts)
+
+    def complete(self, job: QueuedJob) -> None:
+        Job.query.filter_by(id=job.id).delete()
+        db.session.commit()
+
+    def retry(self, job: QueuedJob, error: str, delay: float) -> None:
+        self._update(job, status='queued', last_error=error, locked_at=None,
+                     run_at=datetime.utcnow() + timedelta(seconds=delay))
+
+    def fail(self, job: QueuedJob, error: str) -> None:
+        self._update(job, status='failed', last_error=error, locked_at=None)
+
+    def _update(self, job: QueuedJob, **values) -> None:
+        db.session.rollback()
+        db.session.execute(update(Job).where(Job.id == job.id).values(**values))
+        db.session.commit()
+
+    def depth(self) -> dict:
+        counts = dict(db.session.query(Job.status, func.count()).group_by(Job.status).all())
+        oldest = db.session.query(func.min(Job.run_at)).filter(Job.status == 'queued').scalar()
+        db.session.rollback()
+        depth = {status: counts.get(status, 0) for status in STATUSES}
+        depth['oldest_queued_age'] = _age(oldest)
+        return depth
+
+
+class MemoryBroker:
+    """In-process stand-in for an external broker (no persistence)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._queued = []  # heap of (run_at, id, job)
+        self._running = {}
+        # Failed jobs are logged by the worker; only their number is kept
+        self._failed = 0
+
+    def enqueue(self, task: str, payload: dict, max_attempts: int) -> int:
+        job = QueuedJob(next(self._ids), task, payload, 0, max_attempts)
+        with self._lock:
+            heapq.heappush(self._queued, (time.time(), job.id, job))
+        return job.id
+
+    def find_queued(self, task: str, payload: dict) -> int | None:
+        with self._lock:
+            for _, _, job in self._queued:
+                if job.task == task and job.payload == payload:
+                    return job.id
+        return None
+
+    def claim(self) -> QueuedJob | None:
+        with self._lock:
+            if not self._queued or self._queued[0][0] > time.time():
+                return None
+            _, _, job = heapq.heappop(self._queued)
+            job.attempts += 1
+            self._running[job.id] = job
+            return job
+
+    def complete(self, job: QueuedJob) -> None:
+        with self._lock:
+            self._running.pop(job.id, None)
+
+    def retry(self, job: QueuedJob, error: str, delay: float) -> None:
+        with self._lock:
+            self._running.pop(job.id, None)
+            heapq.heappush(self._queued, (time.time() + delay, job.id, job))
+
+    def fail(self, job: QueuedJob, error: str) -> None:
+        with self._lock:
+            self._running.pop(job.id, None)
+            self._failed += 1
+
+    def depth(self) -> dict:
+        with self._lock:
+            oldest = min((run_at for run_at, _, _ in self._queued), default=None)
+            return {
+                'queued': len(self._queued),
+                'running': len(self._running),
+                'failed': self._failed,
+                'oldest_queued_age': round(max(time.time() - oldest, 0.0), 3) if oldest else None,
+            }
+
+
+def _encode(payload: dict) -> str:
+    """Canonical JSON for a payload, so equal payloads compare equal as text."""
+    return json.dumps(payload, sort_keys=True)
+
+
+def _age(timestamp: datetime | None) -> float | None:
+    if timestamp is None:
+        return None
+    return round(max((datetime.utcnow() - timestamp).total_seconds(), 0.0), 3)
+
+
+class JobQueue:
+    """Task registry, broker and worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self.tasks = {}
+        self.app = None
+        self.backend = 'inline'
+        self.broker = None
+        self.workers = 0
+        self.max_attempts = 3
+        self.retry_delay = 5.0
+        self.poll_interval = 1.0
+        self._threads = []
+        self._stopping = False
+        self._counts = dict.fromkeys(('enqueued', 'coalesced', 'succeeded', 'retried', 'failed'), 0)
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('JOB_QUEUE_BACKEND', os.getenv('JOB_QUEUE_BACKEND', 'database').lower())
+        app.config.setdefault('JOB_WORKERS', int(os.getenv('JOB_WORKERS', '2')))
+        app.config.setdefault('JOB_MAX_ATTEMPTS', int(os.getenv('JOB_MAX_ATTEMPTS', '3')))
+        app.config.setdefault('JOB_RETRY_DELAY', float(os.getenv('JOB_RETRY_DELAY', '5')))
+        app.config.setdefault('JOB_POLL_INTERVAL', float(os.getenv('JOB_POLL_INTERVAL', '1')))
+        app.config.setdefault('JOB_LEASE', float(os.getenv('JOB_LEASE', '300')))
+
+        backend = app.config['JOB_QUEUE_BACKEND']
+        if backend == 'database':
+            broker = DatabaseBroker(app.config['JOB_LEASE'])
+        elif backend == 'memory':
+            broker = MemoryBroker()
+        else:
+            backend, broker = 'inline', None
+
+        self.stop()
+        with self._lock:
+            self.app = app
+            self.backend = backend
+            self.broker = broker
+            self.workers = max(app.config['JOB_WORKERS'], 0)
+            self.max_attempts = max(app.config['JOB_MAX_ATTEMPTS'], 1)
+            self.retry_delay = app.config['JOB_RETRY_DELAY']
+            self.poll_interval = app.config['JOB_POLL_INTERVAL']
+            self._counts = dict.fromkeys(self._counts, 0)
+
+        app.extensions['job_queue'] = self
+
+    def task(self, name: str):
+        """Decorator registering a function as the task `name`."""
+        def register(fn):
+            self.tasks[name] = fn
+            return fn
+        return register
+
+    def enqueue(self, task: str, **kwargs) -> int | None:
+        """Queue `task(**kwargs)`; kwargs must be JSON-serializable.
+
+        With the database broker this commits the current session. Returns
+        the job id (None for the inline backend).
+        """
+        if task not in self.tasks:
+            raise KeyError(f'Unknown task: {task}')
+        with self._lock:
+            self._counts['enqueued'] += 1
+        if self.broker is None:
+            self._run(QueuedJob(None, task, kwargs, 1, 1), inline=True)
+            return None
+
+        job_id = self.broker.enqueue(task, kwargs, self.max_attempts)
+        if self.workers:
+            self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def enqueue_once(self, task: str, **kwargs) -> int | None:
+        """`enqueue`, unless the same task and arguments are already waiting.
+
+        For tasks that read the current state when they run (a second copy
+        would find nothing left to do), this saves the insert, claim and
+        delete of a redundant job. Returns the waiting job's id if there
+        is one. A job already running does not count.
+        """
+        if task not in self.tasks:
+            raise KeyError(f'Unknown task: {task}')
+        if self.broker is not None:
+            job_id = self.broker.find_queued(task, kwargs)
+            if job_id is not None:
+                with self._lock:
+                    self._counts['coalesced'] += 1
+                return job_id
+        return self.enqueue(task, **kwargs)
+
+    def start(self, workers: int | None = None) -> None:
+        """Start the worker threads if they are not running (idempotent)."""
+        with self._lock:
+            if self.broker is None or self._threads:
+                return
+            self._stopping = False
+            for index in range(workers or self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Ask the workers to exit after their current job and wait for them."""
+        with self._wakeup:
+            self._stopping = True
+            threads, self._threads = self._threads, []
+            self._wakeup.notify_all()
+        for thread in threads:
+            thread.join(timeout)
+
+    def run_pending(self) -> int:
+        """Run every due job in the calling thread; returns how many ran."""
+        ran = 0
+        while True:
+            with self.app.app_context():
+                job = self.broker.claim()
+                if job is None:
+                    return ran
+                self._run(job)
+            ran += 1
+
+    def _work(self) -> None:
+        app = self.app
+        while not self._stopping:
+            try:
+                with app.app_context():
+                    job = self.broker.claim()
+                    if job is not None:
+                        self._run(job)
+                        continue
+            except Exception:
+                app.logger.exception('Job worker error')
+            with self._wakeup:
+                if not self._stopping:
+                    self._wakeup.wait(self.poll_interval)
+
+    def _run(self, job: QueuedJob, inline: bool = False) -> None:
+        """Run one claimed job and record its outcome with the broker."""
+        app = self.app
+        try:
+            self.tasks[job.task](**job.payload)
+        except Exception as exc:
+            db.session.rollback()
+            error = f'{type(exc).__name__}: {exc}'
+            if inline:
+                app.logger.exception('Job %s failed', job.task)
+                outcome = 'failed'
+            elif job.attempts < job.max_attempts:
+                app.logger.warning('Job %s #%s failed (attempt %s), retrying: %s',
+                                   job.task, job.id, job.attempts, error)
+                self.broker.retry(job, error, self.retry_delay * 2 ** (job.attempts - 1))
+                outcome = 'retried'
+            else:
+                app.logger.error('Job %s #%s failed after %s attempts: %s', job.task, job.id, job.attempts, error)
+                self.broker.fail(job, error)
+                outcome = 'failed'
+        else:
+            if not inline:
+                self.broker.complete(job)
+            outcome = 'succeeded'
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stats(self) -> dict:
+        """Queue depth by status plus outcome counters for this process."""
+        depth = None
+        if self.broker is not None:
+            if self.backend == 'database':
+                with self.app.app_context():
+                    depth = self.broker.depth()
+            else:
+                depth = self.broker.depth()
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'workers': sum(thread.is_alive() for thread in self._threads),
+                'tasks': sorted(self.tasks),
+                'depth': depth,
+                **self._counts,
+            }
+
+
+# Process-wide singleton (configured in app factory)
+job_queue = JobQueue()
@@ -0,0 +1,233 @@
+"""Login attempt limiting, checked before the user lookup and bcrypt.
+
+Every POST /auth/login costs a database read plus a full bcrypt check,
+so unlimited attempts make credential stuffing a cheap way to pin the
+CPU. `login_limiter` counts, per sliding window:
+
+- failed attempts per client IP, and
+- failed attempts per email (a successful login clears the count)
+
+and rejects a login with 429 + Retry-After as soon as either count
+reaches its limit, before anything expensive runs. Nothing is written to
+the database. Successful logins are not counted per IP, so a class
+logging in together from one campus NAT is never locked out; a
+credential-stuffing run, which mostly fails, still is.
+
+Behind a reverse proxy (Railway, Heroku, nginx) the socket address is the
+proxy's, so every client would share one IP counter: set LOGIN_PROXY_HOPS
+to the number of proxies. A request that carries X-Forwarded-For while
+LOGIN_PROXY_HOPS is 0 logs a warning (once per process) saying so.
+
+Windows are sliding-window counters: the current fixed window's count
+plus the previous window's, weighted by how much of it still overlaps
+the sliding window. That takes two integers per key instead of one
+timestamp per attempt.
+
+Backends:
+- 'memory': per-process counters, bounded to LOGIN_LIMIT_MAX_KEYS (default);
+  with WEB_CONCURRENCY worker processes every limit is effectively
+  multiplied by the worker count (a warning is logged at startup)
+- 'redis': shared across processes via LOGIN_LIMIT_REDIS_URL (needs the
+  optional `redis` package); 'local://' uses the in-process `LocalRedis`
+  stand-in from response_cache.py
+
+Configuration (app.config, defaults read from the environment):
+- LOGIN_IP_LIMIT / LOGIN_IP_WINDOW: failed attempts per IP per window
+  seconds (default 30 per 60; limit 0 disables)
+- LOGIN_EMAIL_LIMIT / LOGIN_EMAIL_WINDOW: failed attempts per email per
+  window seconds (default 5 per 900; limit 0 disables)
+- LOGIN_LIMIT_BACKEND: 'memory' or 'redis'
+- LOGIN_LIMIT_REDIS_URL: redis://... for the shared backend
+- LOGIN_LIMIT_MAX_KEYS: counters kept by the memory backend (default 100000)
+- LOGIN_PROXY_HOPS: reverse proxies in front of the app; the client IP is
+  taken from X-Forwarded-For that many hops from the end (default 0: the
+  socket address; 1 on Railway/Heroku)
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from response_cache import LocalRedis, worker_processes
+
+
+class MemoryWindowStore:
+    """Thread-safe per-process fixed-window counters: key -> [window, current, previous]."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max(max_keys, 1)
+        self._lock = threading.Lock()
+        self._counters = OrderedDict()
+
+    def _roll(self, key: str, window_index: int) -> list:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [window_index, 0, 0]
+        elif counter[0] != window_index:
+            previous = counter[1] if counter[0] == window_index - 1 else 0
+            counter[:] = [window_index, 0, previous]
+        self._counters.move_to_end(key)
+        return counter
+
+    def counts(self, key: str, window_index: int) -> tuple:
+        """(current, previous) window counts."""
+        with self._lock:
+            if key not in self._counters:
+                return 0, 0
+            _, current, previous = self._roll(key, window_index)
+            return current, previous
+
+    def add(self, key: str, window_index: int, window: float) -> None:
+        with self._lock:
+            self._roll(key, window_index)[1] += 1
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+
+    def reset(self, key: str, window_index: int) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+
+class RedisWindowStore:
+    """Shared counters over any client with redis-py's get/incr/expire/delete API."""
+
+    def __init__(self, client, prefix: str = 'aira:login:'):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str, window_index: int) -> str:
+        return f'{self.prefix}{key}:{window_index}'
+
+    def counts(self, key: str, window_index: int) -> tuple:
+        current = self.client.get(self._key(key, window_index))
+        previous = self.client.get(self._key(key, window_index - 1))
+        return int(current or 0), int(previous or 0)
+
+    def add(self, key: str, window_index: int, window: float) -> None:
+        name = self._key(key, window_index)
+        if self.client.incr(name) == 1:
+            # Kept through the next window, where it is the previous count
+            self.client.expire(name, math.ceil(window * 2))
+
+    def reset(self, key: str, window_index: int) -> None:
+        self.client.delete(self._key(key, window_index), self._key(key, window_index - 1))
+
+
+class LoginLimiter:
+    """Sliding-window limits on login attempts per IP and per email."""
+
+    def __init__(self):
+        self.store = None
+        self.rules = {}
+        self.proxy_hops = 0
+        self._lock = threading.Lock()
+        self._warned_proxy = False
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('LOGIN_IP_LIMIT', int(os.getenv('LOGIN_IP_LIMIT', '30')))
+        app.config.setdefault('LOGIN_IP_WINDOW', float(os.getenv('LOGIN_IP_WINDOW', '60')))
+        app.config.setdefault('LOGIN_EMAIL_LIMIT', int(os.getenv('LOGIN_EMAIL_LIMIT', '5')))
+        app.config.setdefault('LOGIN_EMAIL_WINDOW', float(os.getenv('LOGIN_EMAIL_WINDOW', '900')))
+        app.config.setdefault('LOGIN_LIMIT_BACKEND', os.getenv('LOGIN_LIMIT_BACKEND', 'memory').lower())
+        app.config.setdefault('LOGIN_LIMIT_REDIS_URL', os.getenv('LOGIN_LIMIT_REDIS_URL', ''))
+        app.config.setdefault('LOGIN_LIMIT_MAX_KEYS', int(os.getenv('LOGIN_LIMIT_MAX_KEYS', '100000')))
+        app.config.setdefault('LOGIN_PROXY_HOPS', int(os.getenv('LOGIN_PROXY_HOPS', '0')))
+
+        if app.config['LOGIN_LIMIT_BACKEND'] == 'redis':
+            url = app.config['LOGIN_LIMIT_REDIS_URL']
+            if url.startswith('local://'):
+                client = LocalRedis()
+            else:
+                # Optional dependency; only needed for the shared backend
+                import redis
+                client = redis.Redis.from_url(url)
+            store = RedisWindowStore(client)
+        else:
+            store = MemoryWindowStore(app.config['LOGIN_LIMIT_MAX_KEYS'])
+            workers = worker_processes()
+            if workers > 1:
+                app.logger.warning(
+                    'LOGIN_LIMIT_BACKEND is memory with %d worker processes: each keeps its own '
+                    'counters, so login limits are %d times looser. Set LOGIN_LIMIT_BACKEND=redis.',
+                    workers, workers
+                )
+
+        rules = {}
+        for scope in ('ip', 'email'):
+            limit = app.config[f'LOGIN_{scope.upper()}_LIMIT']
+            window = app.config[f'LOGIN_{scope.upper()}_WINDOW']
+            if limit > 0 and window > 0:
+                rules[scope] = (limit, window)
+
+        with self._lock:
+            self.store = store
+            self.rules = rules
+            self.proxy_hops = max(app.config['LOGIN_PROXY_HOPS'], 0)
+            self._warned_proxy = False
+
+        app.extensions['login_limiter'] = self
+
+    def client_ip(self, request) -> str:
+        """The client address, looking through LOGIN_PROXY_HOPS trusted proxies."""
+        route = request.access_route
+        forwarded = request.headers.get('X-Forwarded-For')
+        if self.proxy_hops and forwarded and len(route) >= self.proxy_hops:
+            return route[-self.proxy_hops]
+        if forwarded and not self.proxy_hops and not self._warned_proxy:
+            self._warned_proxy = True
+            current_app.logger.warning(
+                'Login request forwarded by a proxy but LOGIN_PROXY_HOPS is 0: every client shares '
+                'the IP limit of %s. Set LOGIN_PROXY_HOPS to the number of proxies.', request.remote_addr
+            )
+        return request.remote_addr or 'unknown'
+
+    def retry_after(self, ip: str, email: str) -> float | None:
+        """Seconds until a login for (ip, email) is allowed again; None if allowed now."""
+        waits = [self._wait(scope, value) for scope, value in (('ip', ip), ('email', email))]
+        waits = [wait for wait in waits if wait is not None]
+        return max(waits) if waits else None
+
+    def record_failure(self, ip: str, email: str) -> None:
+        self._add('ip', ip)
+        self._add('email', email)
+
+    def record_success(self, email: str) -> None:
+        rule = self.rules.get('email')
+        if rule is not None and email:
+            _, window = rule
+            self.store.reset(self._key('email', email, window), int(time.time() // window))
+
+    def _key(self, scope: str, value: str, window: float) -> str:
+        return f'{scope}:{int(window)}:{value}'
+
+    def _add(self, scope: str, value: str) -> None:
+        rule = self.rules.get(scope)
+        if rule is None or not value:
+            return
+        _, window = rule
+        self.store.add(self._key(scope, value, window), int(time.time() // window), window)
+
+    def _wait(self, scope: str, value: str) -> float | None:
+        rule = self.rules.get(scope)
+        if rule is None or not value:
+            return None
+        limit, window = rule
+        now = time.time()
+        index = int(now // window)
+        current, previous = self.store.counts(self._key(scope, value, window), index)
+        elapsed = now - index * window
+        if current + previous * (1 - elapsed / window) < limit:
+            return None
+        if current >= limit or previous == 0:
+            # Only the next window starts from zero
+            return index * window + window - now
+        # The previous window's weight decays until the estimate drops below the limit
+        clears_at = window * (1 - (limit - current) / previous)
+        return max(clears_at - elapsed, 0.0) + 0.001
+
+
+# Process-wide singleton (configured in app factory)
+login_limiter = LoginLimiter()
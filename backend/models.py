@@ -1,11 +1,13 @@
 """SQLAlchemy models and Marshmallow schemas for AIRA backend.
 
-This file defines the User and Chat models and corresponding simple
-Marshmallow schemas used to serialize/deserialize objects to JSON.
+This file defines the User, Chat, ConversationSummary, MoodRollup and Job
+models and corresponding simple Marshmallow schemas used to
+serialize/deserialize objects to JSON.
 
 Keep models and schema definitions here so other modules can import them
 without causing circular imports.
 """
+from contextlib import contextmanager
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
@@ -14,6 +16,9 @@ from flask_marshmallow import Marshmallow
 db = SQLAlchemy()
 ma = Marshmallow()
 
+# Postgres advisory lock id serializing concurrent `upgrade_schema` runs
+SCHEMA_LOCK_KEY = 0x41495241
+
 
 class User(db.Model):
     """User account model.
@@ -24,6 +29,10 @@ class User(db.Model):
     - email: unique email
     - password_hash: bcrypt hashed password
     - created_at: timestamp
+    - message_count: number of Chat rows owned by the user, maintained by
+      the chat routes in the same transaction as each insert/delete so
+      reading it never needs a COUNT(*) over chats
+    - is_active: false for disabled accounts; their tokens are rejected
     """
 
     __tablename__ = 'users'
@@ -33,6 +42,8 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default='1')
 
     chats = db.relationship('Chat', backref='user', lazy=True, cascade='all, delete-orphan')
 
@@ -55,15 +66,26 @@ class Chat(db.Model):
     - message: text content
     - sender: 'user' or 'aira'
     - timestamp: utc timestamp
+    - pending: user message saved ahead of the AI call whose reply has not
+      been stored yet (CHAT_WRITE_MODE=durable)
+    - sentiment: 'positive', 'neutral' or 'negative' for user messages;
+      NULL for Aira's replies and rows not yet backfilled
     """
 
     __tablename__ = 'chats'
+    __table_args__ = (
+        # Serves every per-user hot path: history pages ordered by
+        # (timestamp, id), per-user counts and per-user deletes.
+        db.Index('ix_chats_user_id_timestamp_id', 'user_id', 'timestamp', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     message = db.Column(db.Text, nullable=False)
     sender = db.Column(db.String(16), nullable=False)  # 'user' or 'aira'
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    pending = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    sentiment = db.Column(db.String(16), nullable=True)
 
     def to_dict(self):
         return {
@@ -72,9 +94,185 @@ class Chat(db.Model):
             'message': self.message,
             'sender': self.sender,
             'timestamp': self.timestamp.isoformat(),
+            'pending': self.pending,
+            'sentiment': self.sentiment,
+        }
+
+
+class ConversationSummary(db.Model):
+    """Rolling summary of a user's conversation beyond the context window.
+
+    Maintained incrementally by `context.update_summary`: messages are
+    folded in once they slide out of the recent-turns window, so the
+    summary never has to be rebuilt from the full history.
+
+    Fields:
+    - user_id: primary key, FK to users.id
+    - summary: extractive summary text (oldest points first)
+    - last_chat_timestamp / last_chat_id: (timestamp, id) of the newest
+      chat already folded into the summary, in the window's ordering
+    - updated_at: utc timestamp of the last fold
+    """
+
+    __tablename__ = 'conversation_summaries'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    summary = db.Column(db.Text, nullable=False, default='')
+    last_chat_id = db.Column(db.Integer, nullable=False, default=0)
+    last_chat_timestamp = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class MoodRollup(db.Model):
+    """Per-user sentiment counts per day or week.
+
+    Maintained incrementally by `mood.py` in the same transaction as the
+    chat rows they count, so mood trends never scan `chats`.
+
+    Fields:
+    - user_id: FK to users.id
+    - period: 'day' or 'week'
+    - period_start: first day of the period (weeks start on Monday, UTC)
+    - positive / neutral / negative: user message counts
+    """
+
+    __tablename__ = 'mood_rollups'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    period = db.Column(db.String(8), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    positive = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    neutral = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    negative = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def to_dict(self):
+        return {
+            'period_start': self.period_start.isoformat(),
+            'positive': self.positive,
+            'neutral': self.neutral,
+            'negative': self.negative,
+            'total': self.positive + self.neutral + self.negative,
         }
 
 
+class Job(db.Model):
+    """Deferred task in the background job queue (`jobs.py`).
+
+    Rows are deleted once their task succeeds, so the table only holds
+    work still to do plus jobs that used up their attempts.
+
+    Fields:
+    - id: primary key
+    - task: registered task name
+    - payload: JSON-encoded keyword arguments for the task
+    - status: 'queued', 'running' or 'failed'
+    - attempts: runs started so far
+    - max_attempts: runs allowed before the job is marked failed
+    - run_at: utc time the job is due (pushed back on each retry)
+    - locked_at: utc time a worker claimed it; claims older than the
+      lease are taken to be from a dead worker and run again
+    - last_error: error of the latest failed run
+    - created_at: utc timestamp
+    """
+
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Workers claim the oldest due job of a status
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def upgrade_schema() -> None:
+    """Bring an existing database up to date with the models.
+
+    `db.create_all()` only creates missing tables, so columns and indexes
+    added to a table that already exists (SQLite or Postgres), and the
+    full-text search index, are created here. Every step checks first,
+    keeping the call idempotent. Must run inside an app context.
+
+    Runs on every deploy (the Procfile `release` step), possibly from
+    several replicas at once; on Postgres an advisory lock makes them take
+    turns instead of racing on the same ALTER TABLE.
+    """
+    with _schema_lock():
+        _upgrade_schema()
+
+
+@contextmanager
+def _schema_lock():
+    """Hold a Postgres session advisory lock for the duration (no-op elsewhere)."""
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+    with db.engine.connect() as conn:
+        conn.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': SCHEMA_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': SCHEMA_LOCK_KEY})
+            conn.commit()
+
+
+def _upgrade_schema() -> None:
+    db.create_all()
+    added = _add_missing_columns()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+    # Full-text index over chat messages (FTS5 table / GIN index)
+    from search import create_search_index
+    create_search_index()
+
+    if ('users', 'message_count') in added:
+        # One-off backfill; from here on the routes keep the counter in sync
+        db.session.execute(db.text(
+            'UPDATE users SET message_count = '
+            '(SELECT COUNT(*) FROM chats WHERE chats.user_id = users.id)'
+        ))
+        db.session.commit()
+    if ('conversation_summaries', 'last_chat_timestamp') in added:
+        # Id-only watermarks may have skipped messages; rebuilt on the next fold
+        db.session.execute(db.text('DELETE FROM conversation_summaries'))
+        db.session.commit()
+
+
+def _add_missing_columns() -> set:
+    """ALTER TABLE ... ADD COLUMN for model columns absent from the database.
+
+    New columns must be nullable or carry a `server_default` so existing
+    rows stay valid. Returns the (table, column) pairs that were added.
+    """
+    inspector = db.inspect(db.engine)
+    added = set()
+    for table in db.metadata.sorted_tables:
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            if not column.nullable:
+                ddl += ' NOT NULL'
+            db.session.execute(db.text(ddl))
+            added.add((table.name, column.name))
+    db.session.commit()
+    return added
+
+
 # Marshmallow schemas for (de)serialization; these are simple and safe to
 # import from other modules.
 
@@ -98,6 +296,7 @@ class ChatSchema(ma.SQLAlchemySchema):
     message = ma.auto_field()
     sender = ma.auto_field()
     timestamp = ma.auto_field()
+    sentiment = ma.auto_field()
 
 
 # Export convenience instances
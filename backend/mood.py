@@ -0,0 +1,135 @@
+"""Mood trends: per-user sentiment rollups.
+
+Every user message stores its sentiment label on the `Chat` row, and the
+matching `MoodRollup` counters (one row per user, period and period start)
+are adjusted in the same transaction. Counters are bumped with a single
+dialect upsert (INSERT ... ON CONFLICT DO UPDATE on SQLite and Postgres),
+so concurrent turns never lose an increment and reading a trend is a
+short primary-key range scan instead of a GROUP BY over `chats`.
+
+Rows written before the sentiment column existed are scored by
+`backfill_sentiment` (`flask --app app backfill-sentiment`) in batches.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update
+
+from models import db, Chat, MoodRollup
+from jobs import job_queue
+from sentiment import sentiment_analyzer
+
+PERIODS = ('day', 'week')
+SENTIMENTS = ('positive', 'neutral', 'negative')
+BACKFILL_BATCH = 1000
+
+
+def period_start(timestamp: datetime, period: str) -> date:
+    """First day of the day/week containing `timestamp` (weeks start Monday)."""
+    day = timestamp.date()
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def record_mood(user_id: int, timestamp: datetime, sentiment: str | None, delta: int = 1) -> None:
+    """Count (or with delta=-1, uncount) one message in the user's rollups.
+
+    Joins the caller's transaction; the caller commits.
+    """
+    if sentiment in SENTIMENTS and timestamp is not None:
+        apply_rollups(Counter({(user_id, timestamp, sentiment): delta}))
+
+
+def apply_rollups(deltas: Counter) -> None:
+    """Apply {(user_id, timestamp, sentiment): delta} to every period's rollup."""
+    buckets = {}
+    for (user_id, timestamp, sentiment), delta in deltas.items():
+        if sentiment not in SENTIMENTS or timestamp is None or not delta:
+            continue
+        for period in PERIODS:
+            key = (int(user_id), period, period_start(timestamp, period))
+            counts = buckets.setdefault(key, dict.fromkeys(SENTIMENTS, 0))
+            counts[sentiment] += delta
+    if not buckets:
+        return
+
+    params = [
+        {'user_id': user_id, 'period': period, 'period_start': start, **counts}
+        for (user_id, period, start), counts in buckets.items()
+    ]
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        _apply_rollups_portable(params)
+        return
+
+    stmt = insert(MoodRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'period', 'period_start'],
+        set_={name: getattr(MoodRollup, name) + getattr(stmt.excluded, name) for name in SENTIMENTS},
+    )
+    db.session.execute(stmt, params)
+
+
+def _apply_rollups_portable(params: list) -> None:
+    """UPDATE, then INSERT when no row matched (dialects without upsert)."""
+    for row in params:
+        result = db.session.execute(
+            update(MoodRollup)
+            .where(MoodRollup.user_id == row['user_id'],
+                   MoodRollup.period == row['period'],
+                   MoodRollup.period_start == row['period_start'])
+            .values({name: getattr(MoodRollup, name) + row[name] for name in SENTIMENTS})
+        )
+        if result.rowcount == 0:
+            db.session.add(MoodRollup(**row))
+    db.session.flush()
+
+
+def mood_trend(user_id: int, period: str, limit: int) -> list:
+    """The user's latest `limit` rollups for `period`, oldest first."""
+    rows = (
+        MoodRollup.query.filter_by(user_id=user_id, period=period)
+        .order_by(MoodRollup.period_start.desc())
+        .limit(limit)
+        .all()
+    )
+    return [row.to_dict() for row in reversed(rows)]
+
+
+@job_queue.task('backfill_sentiment')
+def backfill_sentiment(batch_size: int = BACKFILL_BATCH, progress=None) -> int:
+    """Score user messages that have no sentiment yet and roll them up.
+
+    Walks `chats` by primary key in batches; each batch is scored with
+    `label_many`, written with one executemany UPDATE plus the rollup
+    upserts, and committed on its own, so the job can be interrupted and
+    rerun. Pending messages are skipped (their turn sets the sentiment).
+    Calls `progress(done)` after each batch; returns the number scored.
+    """
+    done = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(Chat.id, Chat.user_id, Chat.timestamp, Chat.message)
+            .filter(Chat.sender == 'user', Chat.sentiment.is_(None), Chat.pending.is_(False), Chat.id > last_id)
+            .order_by(Chat.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return done
+
+        labels = sentiment_analyzer.label_many(row.message for row in rows)
+        db.session.execute(update(Chat), [{'id': row.id, 'sentiment': label} for row, label in zip(rows, labels)])
+        apply_rollups(Counter((row.user_id, row.timestamp, label) for row, label in zip(rows, labels)))
+        db.session.commit()
+
+        last_id = rows[-1].id
+        done += len(rows)
+        if progress is not None:
+            progress(done)
@@ -0,0 +1,357 @@
+"""AI provider registry.
+
+Each supported API (Groq, Google Gemini, generic JSON endpoints) is a
+`Provider` subclass that knows its URL, headers and payload format. The
+active provider is resolved once in the app factory from configuration and
+stored on the app, with headers and payload templates prebuilt, so a chat
+request only has to drop the user's message into the template.
+
+Payload builders take an optional `history`: earlier messages as
+[{'role': 'system'|'user'|'assistant', 'content': str}], oldest first, as
+produced by `context.build_context`. Each provider maps it to its own
+multi-turn format.
+
+Configuration (app.config, defaults read from the environment):
+- GEMINI_API_KEY: API key (Groq starts with 'gsk_', Google with 'AIza')
+- GEMINI_PROVIDER: 'groq', 'google' or 'generic' (auto-detected from the key)
+- GEMINI_MODEL: model name (provider default if unset)
+- GEMINI_API_URL: optional endpoint override (auto-detected)
+- GEMINI_API_VERSION: Google API version (default 'v1beta')
+- GEMINI_TEMPERATURE / GEMINI_MAX_TOKENS: sampling settings
+- AI_FALLBACK_PROVIDERS: comma-separated providers tried after the primary
+  one, in order (e.g. 'google'); each reads <NAME>_API_KEY and optional
+  <NAME>_MODEL / <NAME>_API_URL, e.g. GOOGLE_API_KEY
+- AI_HEDGE_AFTER_MS: if the serving provider has produced no text after
+  this many milliseconds, also start the next one and keep whichever
+  answers first (default 0, disabled)
+
+To add a provider, subclass `Provider` and decorate it with
+`@register_provider`.
+"""
+import os
+
+from flask import current_app
+
+# System prompt to define Aira's personality and behavior
+SYSTEM_PROMPT = """You are Aira, a compassionate and empathetic mental health support AI designed specifically for Gen-Z students. Your purpose is to:
+
+1. Listen actively and provide emotional support
+2. Help users process their feelings and thoughts
+3. Offer coping strategies and mental wellness tips
+4. Be warm, understanding, and non-judgmental
+5. Use casual, friendly language that resonates with Gen-Z
+6. Recognize when someone needs professional help and suggest it appropriately
+
+When asked "who are you" or similar questions, introduce yourself as: "I'm Aira, your mental health companion. I'm here to listen, support, and help you navigate your feelings and challenges. Think of me as a friendly ear whenever you need someone to talk to."
+
+Always be supportive, never dismissive, and maintain a safe, confidential space for conversations."""
+
+PROVIDERS = {}
+
+
+def register_provider(cls):
+    """Class decorator adding a Provider subclass to the registry by name."""
+    PROVIDERS[cls.name] = cls
+    return cls
+
+
+class Provider:
+    """Base class: one configured AI endpoint.
+
+    Subclasses override the payload hooks; everything that does not depend
+    on the user's message is computed in `__init__`.
+    """
+
+    name = 'base'
+    default_model = 'llama-3.3-70b-versatile'
+
+    def __init__(self, api_key: str | None, api_url: str | None = None, model: str | None = None,
+                 temperature: float = 0.7, max_tokens: int = 512, api_version: str = 'v1beta'):
+        self.api_key = api_key
+        self.model = model or self.default_model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.api_version = api_version
+        self.api_url = api_url or self.default_url()
+        self.headers = self.build_headers()
+
+    def default_url(self) -> str | None:
+        return None
+
+    def build_headers(self) -> dict:
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+
+    def build_payload(self, user_message: str, history: list | None = None) -> dict:
+        raise NotImplementedError
+
+    def ping_payload(self) -> dict:
+        """Minimal request used by /debug/ai to check connectivity."""
+        raise NotImplementedError
+
+    def stream_request(self, user_message: str, history: list | None = None) -> tuple | None:
+        """(url, payload) for a streamed completion, or None if unsupported."""
+        return None
+
+    def parse_stream_chunk(self, chunk: dict) -> str | None:
+        return None
+
+    def parse_reply(self, data: dict) -> str | None:
+        """Extract the reply text, tolerating the common response shapes."""
+        reply = None
+
+        # Groq/OpenAI format: choices[0].message.content
+        if isinstance(data.get('choices'), list) and len(data['choices']) > 0:
+            message = data['choices'][0].get('message', {})
+            reply = message.get('content')
+
+        # Fallback to common keys
+        if not reply:
+            reply = data.get('reply') or data.get('output') or data.get('text')
+
+        # Google Gemini format: candidates[0].content.parts[0].text
+        if not reply:
+            if isinstance(data.get('candidates'), list) and len(data['candidates']) > 0:
+                content = data['candidates'][0].get('content')
+                if content:
+                    # Extract text from parts array
+                    if isinstance(content, dict) and 'parts' in content:
+                        parts = content.get('parts', [])
+                        if parts and isinstance(parts, list) and len(parts) > 0:
+                            reply = parts[0].get('text', '')
+                    else:
+                        reply = content
+                else:
+                    reply = data['candidates'][0]
+
+        return reply
+
+    def describe(self) -> dict:
+        return {'provider': self.name, 'model': self.model, 'api_url': self.api_url}
+
+
+@register_provider
+class GroqProvider(Provider):
+    """Groq's OpenAI-compatible chat completions API."""
+
+    name = 'groq'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._system_message = {'role': 'system', 'content': SYSTEM_PROMPT}
+        self._template = {
+            'model': self.model,
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens,
+        }
+
+    def default_url(self) -> str:
+        return 'https://api.groq.com/openai/v1/chat/completions'
+
+    def build_payload(self, user_message: str, history: list | None = None) -> dict:
+        return {
+            **self._template,
+            'messages': [self._system_message, *(history or ()), {'role': 'user', 'content': user_message}],
+        }
+
+    def ping_payload(self) -> dict:
+        return {
+            'model': self.model,
+            'messages': [{'role': 'user', 'content': 'ping'}],
+            'temperature': 0.0,
+            'max_tokens': 16,
+        }
+
+    def stream_request(self, user_message: str, history: list | None = None) -> tuple:
+        return self.api_url, {**self.build_payload(user_message, history), 'stream': True}
+
+    def parse_stream_chunk(self, chunk: dict) -> str | None:
+        choices = chunk.get('choices') or []
+        if not choices:
+            return None
+        return (choices[0].get('delta') or {}).get('content')
+
+
+@register_provider
+class GoogleProvider(Provider):
+    """Google Generative Language (Gemini) generateContent API."""
+
+    name = 'google'
+    default_model = 'gemini-2.0-flash'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._system_instruction = {'parts': [{'text': SYSTEM_PROMPT}]}
+        if ':generateContent' in self.api_url:
+            stream_url = self.api_url.replace(':generateContent', ':streamGenerateContent')
+            self._stream_url = stream_url + ('&' if '?' in stream_url else '?') + 'alt=sse'
+        else:
+            self._stream_url = None
+
+    def default_url(self) -> str:
+        return f'https://generativelanguage.googleapis.com/{self.api_version}/models/{self.model}:generateContent'
+
+    def build_headers(self) -> dict:
+        return {'X-goog-api-key': self.api_key, 'Content-Type': 'application/json'}
+
+    def build_payload(self, user_message: str, history: list | None = None) -> dict:
+        system_instruction = self._system_instruction
+        contents = []
+        for item in history or ():
+            if item['role'] == 'system':
+                system_instruction = {'parts': [*system_instruction['parts'], {'text': item['content']}]}
+            else:
+                role = 'model' if item['role'] == 'assistant' else 'user'
+                contents.append({'role': role, 'parts': [{'text': item['content']}]})
+        contents.append({'role': 'user', 'parts': [{'text': user_message}]})
+        return {'system_instruction': system_instruction, 'contents': contents}
+
+    def ping_payload(self) -> dict:
+        return {'contents': [{'parts': [{'text': 'ping'}]}]}
+
+    def stream_request(self, user_message: str, history: list | None = None) -> tuple | None:
+        if self._stream_url is None:
+            return None
+        return self._stream_url, self.build_payload(user_message, history)
+
+    def parse_stream_chunk(self, chunk: dict) -> str | None:
+        candidates = chunk.get('candidates') or []
+        if not candidates:
+            return None
+        parts = (candidates[0].get('content') or {}).get('parts') or []
+        return ''.join(part.get('text', '') for part in parts)
+
+
+@register_provider
+class GenericProvider(Provider):
+    """Any endpoint taking `{input, temperature, max_output_tokens}` with a Bearer token."""
+
+    name = 'generic'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._template = {'temperature': self.temperature, 'max_output_tokens': self.max_tokens}
+
+    def build_payload(self, user_message: str, history: list | None = None) -> dict:
+        if history:
+            # Single text input: send the context as a transcript
+            lines = [f"{item['role'].capitalize()}: {item['content']}" for item in history]
+            user_message = '\n'.join([*lines, f'User: {user_message}'])
+        return {'input': user_message, **self._template}
+
+    def ping_payload(self) -> dict:
+        return {'input': 'ping', 'temperature': 0.0, 'max_output_tokens': 16}
+
+
+def detect_provider_name(provider: str, api_key: str | None, api_url: str | None) -> str:
+    """Pick the registry entry for the configured provider/key/URL.
+
+    An explicit GEMINI_PROVIDER naming a registered provider wins, so a
+    self-hosted or proxied Groq/Google endpoint keeps its wire format. Then
+    the URL host decides when it points at a known API, then the API key
+    prefix; anything else is 'generic'.
+    """
+    provider = (provider or '').lower()
+    if provider in PROVIDERS:
+        return provider
+    if api_url:
+        if 'groq.com' in api_url:
+            return 'groq'
+        if 'generativelanguage.googleapis.com' in api_url:
+            return 'google'
+    if api_key:
+        if api_key.startswith('gsk_'):
+            return 'groq'
+        if api_key.startswith('AIza'):
+            return 'google'
+    return 'generic'
+
+
+def build_provider(name: str, api_key: str | None, **options) -> Provider:
+    return PROVIDERS[name](api_key, **options)
+
+
+def resolve_provider(config) -> Provider | None:
+    """Build the primary provider from GEMINI_* settings.
+
+    Returns None when neither an API key nor URL is configured; callers
+    then fall back to local echo (dev mode).
+    """
+    api_key = config.get('GEMINI_API_KEY') or None
+    api_url = config.get('GEMINI_API_URL') or None
+    if not api_key and not api_url:
+        return None
+
+    name = detect_provider_name(config.get('GEMINI_PROVIDER'), api_key, api_url)
+    return build_provider(
+        name,
+        api_key,
+        api_url=api_url,
+        model=config.get('GEMINI_MODEL') or None,
+        temperature=float(config.get('GEMINI_TEMPERATURE', 0.7)),
+        max_tokens=int(config.get('GEMINI_MAX_TOKENS', 512)),
+        api_version=config.get('GEMINI_API_VERSION') or 'v1beta',
+    )
+
+
+def resolve_provider_chain(config) -> list:
+    """The primary provider followed by any AI_FALLBACK_PROVIDERS.
+
+    Fallbacks without an API key are skipped; an empty list means local echo.
+    """
+    chain = []
+    primary = resolve_provider(config)
+    if primary is not None:
+        chain.append(primary)
+
+    for name in (config.get('AI_FALLBACK_PROVIDERS') or '').split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in PROVIDERS:
+            raise ValueError(f'Unknown AI provider in AI_FALLBACK_PROVIDERS: {name}')
+        prefix = name.upper()
+        api_key = config.get(f'{prefix}_API_KEY') or os.getenv(f'{prefix}_API_KEY')
+        if not api_key:
+            continue
+        chain.append(build_provider(
+            name,
+            api_key,
+            api_url=config.get(f'{prefix}_API_URL') or os.getenv(f'{prefix}_API_URL') or None,
+            model=config.get(f'{prefix}_MODEL') or os.getenv(f'{prefix}_MODEL') or None,
+            temperature=float(config.get('GEMINI_TEMPERATURE', 0.7)),
+            max_tokens=int(config.get('GEMINI_MAX_TOKENS', 512)),
+            api_version=config.get('GEMINI_API_VERSION') or 'v1beta',
+        ))
+    return chain
+
+
+def init_app(app) -> None:
+    """Read provider settings and resolve the provider chain once."""
+    for key, default in (
+        ('GEMINI_API_KEY', ''),
+        ('GEMINI_API_URL', ''),
+        ('GEMINI_PROVIDER', ''),
+        ('GEMINI_MODEL', ''),
+        ('GEMINI_API_VERSION', 'v1beta'),
+        ('GEMINI_TEMPERATURE', '0.7'),
+        ('GEMINI_MAX_TOKENS', '512'),
+        ('AI_FALLBACK_PROVIDERS', ''),
+    ):
+        app.config.setdefault(key, os.getenv(key, default).strip())
+    app.config.setdefault('AI_HEDGE_AFTER_MS', float(os.getenv('AI_HEDGE_AFTER_MS', '0')))
+
+    app.extensions['ai_providers'] = resolve_provider_chain(app.config)
+
+
+def get_provider_chain() -> list:
+    """Providers in failover order for the current app (empty means local echo)."""
+    return current_app.extensions.get('ai_providers', [])
+
+
+def get_provider() -> Provider | None:
+    """The primary provider for the current app (None means local echo)."""
+    chain = get_provider_chain()
+    return chain[0] if chain else None
@@ -0,0 +1,129 @@
+"""Bulk user provisioning (`flask --app app provision-users FILE`).
+
+Creates accounts for a whole cohort from a CSV or JSON file:
+
+- records are read as a stream (CSV with a header row; a JSON array or
+  newline-delimited JSON objects), with `name`, `email` and `password`
+  fields
+- the emails already registered are fetched once up front; existing
+  accounts and duplicates within the file are skipped, never re-hashed
+- each batch's passwords are hashed in parallel across the
+  `password_hasher` process pool, then inserted with one executemany
+  INSERT and committed on its own
+
+Because existing emails are skipped before hashing, re-running the same
+file after an interruption resumes where the last committed batch ended.
+"""
+import csv
+import json
+
+from sqlalchemy import insert, select
+
+from models import db, User
+from hashing import password_hasher
+
+PROVISION_BATCH = 1000
+
+
+def detect_format(path: str) -> str:
+    """'csv' or 'json' from a file name ('json' for .json/.jsonl/.ndjson)."""
+    return 'json' if path.lower().endswith(('.json', '.jsonl', '.ndjson')) else 'csv'
+
+
+def read_user_records(stream, fmt: str):
+    """Yield raw user records from a text stream in 'csv' or 'json' format.
+
+    NDJSON lines are yielded unparsed so a bad line only invalidates that
+    record (see `clean_record`).
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+
+    # A JSON array is parsed whole; NDJSON (one object per line) streams
+    head = stream.read(1)
+    while head and head.isspace():
+        head = stream.read(1)
+    if head == '[':
+        yield from json.loads(head + stream.read())
+        return
+    for line in _lines(head, stream):
+        if line.strip():
+            yield line
+
+
+def _lines(head: str, stream):
+    """The stream's lines, the first of which starts with the already-read `head`."""
+    yield head + stream.readline()
+    yield from stream
+
+
+def clean_record(record) -> dict:
+    """Validate one record (dict or JSON text) into User column values; raises ValueError."""
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f'invalid JSON: {exc.msg}') from None
+    if not isinstance(record, dict):
+        raise ValueError('record must be an object')
+    name = str(record.get('name') or '').strip()
+    email = str(record.get('email') or '').strip().lower()
+    password = str(record.get('password') or '')
+    if not name or not email or not password:
+        raise ValueError('name, email and password are required')
+    if '@' not in email:
+        raise ValueError(f'invalid email: {email}')
+    return {'name': name, 'email': email, 'password': password}
+
+
+def provision_users(records, batch_size: int = PROVISION_BATCH, progress=None) -> dict:
+    """Create users from an iterable of dicts; returns the counts.
+
+    Calls `progress(counts)` after each committed batch. Counts are
+    {'created', 'existing', 'duplicate', 'invalid', 'errors'}, where
+    'errors' holds up to 20 (record number, message) pairs.
+    """
+    known = set(db.session.scalars(select(User.email)))
+    db.session.commit()
+    counts = {'created': 0, 'existing': 0, 'duplicate': 0, 'invalid': 0, 'errors': []}
+    batch = []
+    seen = set()
+
+    for number, record in enumerate(records, start=1):
+        try:
+            row = clean_record(record)
+        except ValueError as exc:
+            counts['invalid'] += 1
+            if len(counts['errors']) < 20:
+                counts['errors'].append((number, str(exc)))
+            continue
+        if row['email'] in known:
+            counts['existing'] += 1
+            continue
+        if row['email'] in seen:
+            counts['duplicate'] += 1
+            continue
+        seen.add(row['email'])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _create_batch(batch, counts, progress)
+            known.update(row['email'] for row in batch)
+            seen.clear()
+            batch = []
+
+    if batch:
+        _create_batch(batch, counts, progress)
+    return counts
+
+
+def _create_batch(rows: list, counts: dict, progress) -> None:
+    hashes = password_hasher.hash_many([row['password'] for row in rows])
+    db.session.execute(insert(User), [
+        {'name': row['name'], 'email': row['email'], 'password_hash': pw_hash}
+        for row, pw_hash in zip(rows, hashes)
+    ])
+    db.session.commit()
+    counts['created'] += len(rows)
+    if progress is not None:
+        progress(counts)
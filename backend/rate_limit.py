@@ -0,0 +1,204 @@
+"""Client-side rate limiting for AI provider calls.
+
+Instead of every request thread sleeping through its own 429 backoff, all
+calls to the same provider/model share one token bucket. Requests queue on
+the bucket and are admitted at the configured rate; when the provider says
+it is throttled (HTTP 429 `Retry-After`, or Groq's `x-ratelimit-*` headers
+reporting nothing remaining) the whole bucket pauses until the reset time,
+so queued requests stop hitting the provider instead of piling on retries.
+
+The `rate_limiter` singleton is configured in the app factory via
+`init_app`. Buckets are per process; size AI_RATE_LIMIT_RPM as the
+provider's limit divided by the number of worker processes. The bucket is
+off by default, so deployments that never had a limit are not throttled;
+provider pauses (429 / rate-limit headers) are honoured either way.
+
+Configuration (app.config, defaults read from the environment):
+- AI_RATE_LIMIT_RPM: sustained requests per minute per provider/model in
+  this process (default 0: no bucket, only provider pauses)
+- AI_RATE_LIMIT_BURST: requests allowed back-to-back (default 5)
+- AI_RATE_LIMIT_MAX_WAIT: seconds a request may queue for admission (default 10)
+- AI_RATE_LIMIT_MAX_QUEUE: requests allowed to queue per bucket (default 200)
+"""
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+class RateLimitedError(Exception):
+    """The request could not be admitted within AI_RATE_LIMIT_MAX_WAIT."""
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def parse_reset_duration(value: str | None) -> float | None:
+    """Seconds from Groq's reset headers, e.g. '7.66s', '2m59.56s', '120ms'."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Thread-safe token bucket with a bounded admission queue."""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_wait: float, max_queue: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(max(burst, 1))
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._throttled = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Wait for a token; False if none is available within `timeout`."""
+        timeout = self.max_wait if timeout is None else timeout
+        with self._cond:
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                return False
+            deadline = time.monotonic() + timeout
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self._paused_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        self._admitted += 1
+                        return True
+                    if now >= self._paused_until and self.rate > 0:
+                        ready_at = now + (1 - self._tokens) / self.rate
+                    elif now >= self._paused_until:
+                        # Rate <= 0 disables the bucket; provider pauses still apply
+                        self._admitted += 1
+                        return True
+                    else:
+                        ready_at = self._paused_until
+                    if ready_at > deadline:
+                        self._rejected += 1
+                        return False
+                    self._cond.wait(ready_at - now)
+            finally:
+                self._waiting -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Stop admitting requests for `seconds` (provider reported throttling)."""
+        with self._cond:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+            self._throttled += 1
+            self._cond.notify_all()
+
+    def observe(self, status_code: int, headers) -> None:
+        """Update the bucket from a provider response."""
+        wait = parse_retry_after(headers.get('Retry-After'))
+        for kind in ('requests', 'tokens'):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            if remaining is not None and remaining.strip() == '0':
+                reset = parse_reset_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+                if reset is not None:
+                    wait = max(wait or 0.0, reset)
+        if status_code == 429 and wait is None:
+            # Throttled without a hint: back off for a couple of refill periods
+            wait = 2.0 / self.rate if self.rate else 2.0
+        if wait:
+            self.pause(wait)
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'tokens': round(self._tokens, 2),
+                'capacity': self.capacity,
+                'rate_per_minute': round(self.rate * 60, 2),
+                'paused_for': round(max(self._paused_until - now, 0.0), 2),
+                'waiting': self._waiting,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'throttled': self._throttled,
+            }
+
+
+class RateLimiter:
+    """Registry of token buckets keyed by (provider, model)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.rate_per_minute = 0.0
+        self.burst = 5
+        self.max_wait = 10.0
+        self.max_queue = 200
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('AI_RATE_LIMIT_RPM', float(os.getenv('AI_RATE_LIMIT_RPM', '0')))
+        app.config.setdefault('AI_RATE_LIMIT_BURST', int(os.getenv('AI_RATE_LIMIT_BURST', '5')))
+        app.config.setdefault('AI_RATE_LIMIT_MAX_WAIT', float(os.getenv('AI_RATE_LIMIT_MAX_WAIT', '10')))
+        app.config.setdefault('AI_RATE_LIMIT_MAX_QUEUE', int(os.getenv('AI_RATE_LIMIT_MAX_QUEUE', '200')))
+
+        with self._lock:
+            self.rate_per_minute = app.config['AI_RATE_LIMIT_RPM']
+            self.burst = app.config['AI_RATE_LIMIT_BURST']
+            self.max_wait = app.config['AI_RATE_LIMIT_MAX_WAIT']
+            self.max_queue = app.config['AI_RATE_LIMIT_MAX_QUEUE']
+            self._buckets = {}
+
+        app.extensions['rate_limiter'] = self
+
+    def bucket(self, provider: str, model: str) -> TokenBucket:
+        key = (provider, model)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = TokenBucket(self.rate_per_minute, self.burst, self.max_wait, self.max_queue)
+                    self._buckets[key] = bucket
+        return bucket
+
+    def stats(self) -> dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {f'{provider}/{model}': bucket.stats() for (provider, model), bucket in buckets.items()}
+
+
+# Process-wide singleton (configured in app factory)
+rate_limiter = RateLimiter()
@@ -0,0 +1,286 @@
+"""Opt-in cache of AI replies for repeated prompts.
+
+Many opening messages are near-identical ("hi", "who are you", "i feel
+anxious"). With AI_CACHE_ENABLED the reply to such a prompt is stored under
+a key built from the normalized prompt, the model and a hash of the system
+prompt, so a repeat skips the provider round-trip. Only context-free
+prompts may use the cache; anything carrying conversation history must
+bypass it.
+
+Backends:
+- 'memory': per-process LRU with TTL (default)
+- 'redis': shared across processes via AI_CACHE_REDIS_URL (needs the
+  optional `redis` package); AI_CACHE_REDIS_URL='local://' uses the
+  in-process `LocalRedis` stand-in instead, for tests and development
+
+Configuration (app.config, defaults read from the environment):
+- AI_CACHE_ENABLED: 'true' to turn the cache on (default off)
+- AI_CACHE_BACKEND: 'memory' or 'redis'
+- AI_CACHE_REDIS_URL: redis://... for the shared backend
+- AI_CACHE_TTL: seconds a cached reply stays valid (default 3600)
+- AI_CACHE_MAX_ENTRIES: LRU size of the memory backend (default 1000)
+- AI_CACHE_MAX_PROMPT_CHARS: longer prompts are never cached (default 200)
+
+The cache fails open: a backend error (Redis down, timeouts) is logged,
+counted in `stats()['errors']` and treated as a miss or a skipped store,
+so it never fails or replaces a reply.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from flask import current_app
+
+_NON_WORD = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+# Letters only: digits and underscores carry meaning ("1000 mg" vs "10 mg")
+_ELONGATED = re.compile(r'([^\W\d_])\1{2,}')
+
+# Chat shorthand expanded before keying, so "who r u" and "who are you" meet
+_SHORTHAND = {
+    'u': 'you', 'r': 'are', 'ur': 'your', 'im': 'i am', 'ya': 'you',
+    'pls': 'please', 'plz': 'please', 'thx': 'thanks', 'ty': 'thank you',
+}
+_GREETINGS = {'hi', 'hey', 'hello', 'hiya', 'heya', 'yo', 'hi there', 'hey there', 'hello there', 'halo', 'hai'}
+
+
+def normalize_prompt(text: str) -> str:
+    """Reduce a prompt to a canonical form for cache keys.
+
+    Case, punctuation, emoji, repeated letters ("heyyy") and common chat
+    shorthand are folded away; plain greetings all map to 'hi'.
+    """
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = _NON_WORD.sub(' ', text)
+    text = _ELONGATED.sub(r'\1', text)
+    words = [_SHORTHAND.get(word, word) for word in text.split()]
+    text = _WHITESPACE.sub(' ', ' '.join(words)).strip()
+    if text in _GREETINGS:
+        return 'hi'
+    return text
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(max_entries, 1)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisBackend:
+    """Shared backend over any client with redis-py's get/set(ex=) API."""
+
+    def __init__(self, client, prefix: str = 'aira:reply:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> str | None:
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.client.set(self.prefix + key, value, ex=max(int(ttl), 1))
+
+    def size(self) -> int | None:
+        return None
+
+
+def worker_processes() -> int:
+    """Server processes each holding their own memory backends (WEB_CONCURRENCY, default 1).
+
+    Used to warn when a per-process backend would be split across gunicorn
+    workers; gunicorn reads the same variable for its worker count.
+    """
+    try:
+        return max(int(os.getenv('WEB_CONCURRENCY') or 1), 1)
+    except ValueError:
+        return 1
+
+
+class LocalRedis:
+    """In-process stand-in for a redis client (get/set/incr/expire/delete).
+
+    Also used by the login limiter's shared backend (`login_limit.py`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value.encode('utf-8')
+
+    def set(self, key: str, value: str, ex: int | None = None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value, expires_at = self._data.get(key, ('0', None))
+            if expires_at is not None and expires_at <= time.monotonic():
+                value, expires_at = '0', None
+            value = str(int(value) + 1)
+            self._data[key] = (value, expires_at)
+            return int(value)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._data[key] = (self._data[key][0], time.monotonic() + seconds)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+class ResponseCache:
+    """Reply cache with hit-rate accounting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.backend = None
+        self.ttl = 3600.0
+        self.max_prompt_chars = 200
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._errors = 0
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('AI_CACHE_ENABLED', os.getenv('AI_CACHE_ENABLED', 'false').lower() == 'true')
+        app.config.setdefault('AI_CACHE_BACKEND', os.getenv('AI_CACHE_BACKEND', 'memory').lower())
+        app.config.setdefault('AI_CACHE_REDIS_URL', os.getenv('AI_CACHE_REDIS_URL', ''))
+        app.config.setdefault('AI_CACHE_TTL', float(os.getenv('AI_CACHE_TTL', '3600')))
+        app.config.setdefault('AI_CACHE_MAX_ENTRIES', int(os.getenv('AI_CACHE_MAX_ENTRIES', '1000')))
+        app.config.setdefault('AI_CACHE_MAX_PROMPT_CHARS', int(os.getenv('AI_CACHE_MAX_PROMPT_CHARS', '200')))
+
+        backend = None
+        if app.config['AI_CACHE_ENABLED']:
+            if app.config['AI_CACHE_BACKEND'] == 'redis':
+                url = app.config['AI_CACHE_REDIS_URL']
+                if url.startswith('local://'):
+                    client = LocalRedis()
+                else:
+                    # Optional dependency; only needed for the shared backend
+                    import redis
+                    client = redis.Redis.from_url(url)
+                backend = RedisBackend(client)
+            else:
+                backend = MemoryBackend(app.config['AI_CACHE_MAX_ENTRIES'])
+
+        with self._lock:
+            self.enabled = backend is not None
+            self.backend = backend
+            self.ttl = app.config['AI_CACHE_TTL']
+            self.max_prompt_chars = app.config['AI_CACHE_MAX_PROMPT_CHARS']
+            self._hits = self._misses = self._stores = self._errors = 0
+
+        app.extensions['response_cache'] = self
+
+    def key(self, prompt: str, model: str, system_prompt: str) -> str | None:
+        """Cache key for a prompt, or None if it should not be cached."""
+        if not self.enabled or len(prompt) > self.max_prompt_chars:
+            return None
+        normalized = normalize_prompt(prompt)
+        if not normalized:
+            return None
+        system_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+        raw = f'{model}\0{system_hash}\0{normalized}'
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str | None) -> str | None:
+        if key is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            self._failed('lookup')
+            value = None
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, key: str | None, reply: str) -> None:
+        if key is None or not reply:
+            return
+        try:
+            self.backend.set(key, reply, self.ttl)
+        except Exception:
+            self._failed('store')
+            return
+        with self._lock:
+            self._stores += 1
+
+    def _failed(self, operation: str) -> None:
+        with self._lock:
+            self._errors += 1
+        current_app.logger.warning('Response cache %s failed; continuing without the cache', operation,
+                                   exc_info=True)
+
+    def stats(self) -> dict:
+        try:
+            entries = self.backend.size() if self.backend else 0
+        except Exception:
+            entries = None
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'backend': type(self.backend).__name__ if self.backend else None,
+                'entries': entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stores': self._stores,
+                'errors': self._errors,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else None,
+            }
+
+
+# Process-wide singleton (configured in app factory)
+response_cache = ResponseCache()
@@ -0,0 +1,175 @@
+"""Refresh token rotation and revocation.
+
+Sessions use short-lived access tokens (JWT_ACCESS_MINUTES) plus a
+refresh token (JWT_EXP_DAYS) that POST /auth/refresh exchanges for a new
+pair. Both carry a `fam` claim, the session ("token family") id set at
+login, so renewals never touch bcrypt and, with a warm identity cache,
+not the database either.
+
+`revocation_list` is a compact TTL set of token ids; each entry lives
+only as long as the token it blocks could still be valid:
+
+- on refresh, the presented refresh token's `jti` is marked rotated
+- presenting a rotated refresh token again after JWT_REFRESH_REUSE_GRACE
+  seconds is treated as theft and revokes the whole family (the grace
+  lets two tabs racing to refresh the same token both succeed)
+- logout revokes the family, which also rejects its access tokens
+
+Backends:
+- 'memory': per-process (default); with several worker processes a
+  revocation is only seen by the process that made it, and a stolen
+  refresh token replayed to another worker passes. Use 'redis' whenever
+  WEB_CONCURRENCY > 1 (a warning is logged at startup otherwise)
+- 'redis': shared via JWT_REVOCATION_REDIS_URL (needs the optional `redis`
+  package); 'local://' uses the in-process `LocalRedis` stand-in
+
+Configuration (app.config, defaults read from the environment):
+- JWT_ACCESS_MINUTES / JWT_EXP_DAYS: token lifetimes, read in app.py
+- JWT_REFRESH_REUSE_GRACE: seconds a rotated refresh token stays usable (default 30)
+- JWT_REVOCATION_BACKEND: 'memory' or 'redis'
+- JWT_REVOCATION_REDIS_URL: redis://... for the shared backend
+"""
+import math
+import os
+import threading
+import time
+import uuid
+
+from flask import current_app, jsonify
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+from response_cache import LocalRedis, worker_processes
+
+REVOKED = 'revoked'
+PURGE_EVERY = 1000
+
+
+class MemoryRevocationStore:
+    """Thread-safe per-process TTL map: key -> (value, expires_at)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._writes = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (value, now + ttl)
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._entries = {k: entry for k, entry in self._entries.items() if entry[1] > now}
+
+
+class RedisRevocationStore:
+    """Shared store over any client with redis-py's get/set(ex=) API."""
+
+    def __init__(self, client, prefix: str = 'aira:revoked:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> str | None:
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.client.set(self.prefix + key, value, ex=max(math.ceil(ttl), 1))
+
+
+class RevocationList:
+    """Issues token pairs and tracks rotated/revoked token ids."""
+
+    def __init__(self):
+        self.store = None
+        self.reuse_grace = 30.0
+        self.refresh_ttl = 7 * 86400.0
+
+    def init_app(self, app, jwt) -> None:
+        app.config.setdefault('JWT_REFRESH_REUSE_GRACE', float(os.getenv('JWT_REFRESH_REUSE_GRACE', '30')))
+        app.config.setdefault('JWT_REVOCATION_BACKEND', os.getenv('JWT_REVOCATION_BACKEND', 'memory').lower())
+        app.config.setdefault('JWT_REVOCATION_REDIS_URL', os.getenv('JWT_REVOCATION_REDIS_URL', ''))
+
+        if app.config['JWT_REVOCATION_BACKEND'] == 'redis':
+            url = app.config['JWT_REVOCATION_REDIS_URL']
+            if url.startswith('local://'):
+                client = LocalRedis()
+            else:
+                # Optional dependency; only needed for the shared backend
+                import redis
+                client = redis.Redis.from_url(url)
+            self.store = RedisRevocationStore(client)
+        else:
+            self.store = MemoryRevocationStore()
+            workers = worker_processes()
+            if workers > 1:
+                app.logger.warning(
+                    'JWT_REVOCATION_BACKEND is memory with %d worker processes: logouts and refresh '
+                    'token reuse are only seen by the worker that handled them. Set '
+                    'JWT_REVOCATION_BACKEND=redis.', workers
+                )
+        self.reuse_grace = app.config['JWT_REFRESH_REUSE_GRACE']
+        self.refresh_ttl = app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds()
+
+        jwt.token_in_blocklist_loader(self._is_blocked)
+        jwt.revoked_token_loader(_revoked_response)
+        app.extensions['revocation_list'] = self
+
+    def issue(self, user_id: int, family: str | None = None) -> dict:
+        """A new access/refresh token pair; `family` defaults to a new session."""
+        claims = {'fam': family or uuid.uuid4().hex}
+        return {
+            'access_token': create_access_token(identity=str(user_id), additional_claims=claims),
+            'refresh_token': create_refresh_token(identity=str(user_id), additional_claims=claims),
+        }
+
+    def rotate(self, jwt_data: dict) -> None:
+        """Mark a refresh token as used; reuse past the grace period revokes its family."""
+        if self.store.get(jwt_data['jti']) is not None:
+            # Reused within the grace period; the grace still runs from the first use
+            return
+        self.store.set(jwt_data['jti'], f'rotated:{time.time():.3f}', _remaining(jwt_data))
+
+    def revoke_family(self, jwt_data: dict) -> None:
+        family = jwt_data.get('fam')
+        if family:
+            self.store.set(f'fam:{family}', REVOKED, self.refresh_ttl)
+
+    def _is_blocked(self, jwt_header: dict, jwt_data: dict) -> bool:
+        family = jwt_data.get('fam')
+        if family and self.store.get(f'fam:{family}') is not None:
+            return True
+        if jwt_data.get('type') != 'refresh':
+            return False
+        state = self.store.get(jwt_data['jti'])
+        if state is None:
+            return False
+        if state.startswith('rotated:') and time.time() - float(state.split(':', 1)[1]) <= self.reuse_grace:
+            return False
+        current_app.logger.warning('Refresh token reuse detected; revoking session %s', family)
+        self.revoke_family(jwt_data)
+        return True
+
+
+def _remaining(jwt_data: dict) -> float:
+    """Seconds until the token expires (at least 1)."""
+    return max(jwt_data.get('exp', 0) - time.time(), 1.0)
+
+
+def _revoked_response(jwt_header: dict, jwt_data: dict):
+    return jsonify({'error': 'Token has been revoked'}), 401
+
+
+# Process-wide singleton (configured in app factory)
+revocation_list = RevocationList()
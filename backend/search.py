@@ -0,0 +1,225 @@
+"""Full-text search over chat history.
+
+Backends, picked from the database dialect:
+- SQLite: an FTS5 table `chats_fts(message, owner)` whose rowid is the
+  chat id and whose `owner` column holds one token per user ('u42'). The
+  owner token is part of every MATCH, so FTS5 intersects it with the
+  search terms and only ranks the user's own rows, however many other
+  users match. The table is created and filled by `upgrade_schema()`, and
+  the chat routes keep it in sync on insert/update/delete via
+  `index_chats` and `unindex_chats`, in the same transaction as the chat
+  rows. Terms are stemmed (porter) and results ranked by bm25.
+- Postgres: a GIN expression index on to_tsvector('english', message);
+  queries use to_tsquery (every term required, the last one as a prefix),
+  ts_rank and ts_headline. Nothing needs syncing.
+- Anything else, or SQLite before `upgrade-db` has created the FTS table:
+  case-insensitive LIKE on every term, newest first.
+
+Snippets are HTML-escaped with matches wrapped in <mark>...</mark>, so
+clients can render them as-is.
+"""
+import html
+import re
+
+from sqlalchemy import func
+
+from models import db, Chat
+
+FTS_TABLE = 'chats_fts'
+SNIPPET_TOKENS = 12
+SNIPPET_CHARS = 160
+
+# Private-use markers around matches; replaced after escaping the snippet
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+# Databases known to have the FTS table; a missing table is re-checked on
+# every use, so a worker started before `upgrade-db` picks it up
+_fts_ready = set()
+
+
+def search_backend() -> str:
+    """'fts5', 'postgres' or 'like' for the current database."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return 'postgres'
+    if dialect == 'sqlite' and _has_fts_table():
+        return 'fts5'
+    return 'like'
+
+
+def _has_fts_table() -> bool:
+    key = str(db.engine.url)
+    if key in _fts_ready:
+        return True
+    # Checked on the session's connection, inside the caller's transaction
+    found = db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first()
+    if found is not None:
+        _fts_ready.add(key)
+    return found is not None
+
+
+def _owner(user_id) -> str:
+    """The FTS `owner` token for a user."""
+    return f'u{int(user_id)}'
+
+
+def create_search_index() -> None:
+    """Create (and on first creation, fill) the dialect's full-text index.
+
+    Called by `upgrade_schema()`; idempotent.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        columns = [row[1] for row in db.session.execute(db.text(f'PRAGMA table_info({FTS_TABLE})'))]
+        if 'owner' in columns:
+            return
+        if columns:
+            # Earlier layout with an UNINDEXED user_id column; rebuilt in the
+            # same transaction, so writers never see the table missing
+            db.session.execute(db.text(f'DROP TABLE {FTS_TABLE}'))
+        db.session.execute(db.text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "message, owner, tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+        ))
+        db.session.execute(db.text(
+            f"INSERT INTO {FTS_TABLE} (rowid, message, owner) SELECT id, message, 'u' || user_id FROM chats"
+        ))
+        db.session.commit()
+    elif dialect == 'postgresql':
+        db.session.execute(db.text(
+            'CREATE INDEX IF NOT EXISTS ix_chats_message_fts '
+            "ON chats USING gin (to_tsvector('english', message))"
+        ))
+        db.session.commit()
+
+
+def index_chats(chats) -> None:
+    """Add or refresh chats in the FTS table (SQLite); chats must be flushed."""
+    index_rows([{'id': chat.id, 'message': chat.message, 'user_id': chat.user_id} for chat in chats])
+
+
+def index_rows(rows: list) -> None:
+    """`index_chats` for plain {'id', 'message', 'user_id'} dicts (bulk inserts)."""
+    if not rows or search_backend() != 'fts5':
+        return
+    rows = [{'id': row['id'], 'message': row['message'], 'owner': _owner(row['user_id'])} for row in rows]
+    db.session.execute(
+        db.text(f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, message, owner) VALUES (:id, :message, :owner)'),
+        rows,
+    )
+
+
+def unindex_chats(chat_ids) -> None:
+    rows = [{'id': chat_id} for chat_id in chat_ids]
+    if not rows or search_backend() != 'fts5':
+        return
+    db.session.execute(db.text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :id'), rows)
+
+
+def query_terms(query: str) -> list:
+    return _TERM.findall(query.lower())
+
+
+def search_chats(user_id: int, query: str, limit: int, offset: int) -> tuple:
+    """(results, has_more) for the user's chats matching every term of `query`.
+
+    Each result is the chat's dict plus 'snippet' and 'rank' (higher is
+    more relevant; None for the LIKE fallback). The last term also matches
+    as a prefix on every backend, so partially typed words find results.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [], False
+
+    backend = search_backend()
+    if backend == 'fts5':
+        rows = _search_fts5(user_id, terms, limit + 1, offset)
+    elif backend == 'postgres':
+        rows = _search_postgres(user_id, terms, limit + 1, offset)
+    else:
+        rows = _search_like(user_id, terms, limit + 1, offset)
+
+    results = []
+    for chat, rank, snippet in rows[:limit]:
+        item = chat.to_dict()
+        item['snippet'] = _render_snippet(snippet)
+        item['rank'] = rank
+        results.append(item)
+    return results, len(rows) > limit
+
+
+def _search_fts5(user_id: int, terms: list, limit: int, offset: int) -> list:
+    phrases = ' '.join(f'"{term}"' for term in terms[:-1])
+    phrases = f'{phrases} "{terms[-1]}"*'.strip()
+    match = f'owner : {_owner(user_id)} AND message : ({phrases})'
+    # bm25 weights: the owner column never contributes to the rank
+    rows = db.session.execute(
+        db.text(
+            f"SELECT rowid, -bm25({FTS_TABLE}, 1.0, 0.0) AS rank, "
+            f"snippet({FTS_TABLE}, 0, :start, :end, '…', :tokens) AS snippet "
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match '
+            'ORDER BY rank DESC, rowid DESC LIMIT :limit OFFSET :offset'
+        ),
+        {'match': match, 'start': _MARK_START, 'end': _MARK_END,
+         'tokens': SNIPPET_TOKENS, 'limit': limit, 'offset': offset},
+    ).all()
+    chats = {chat.id: chat for chat in Chat.query.filter(Chat.id.in_([row.rowid for row in rows]))}
+    return [(chats[row.rowid], round(row.rank, 4), row.snippet) for row in rows if row.rowid in chats]
+
+
+def _search_postgres(user_id: int, terms: list, limit: int, offset: int) -> list:
+    vector = func.to_tsvector('english', Chat.message)
+    # Terms are \w+ only, so quoting them keeps to_tsquery operators out
+    tsquery = func.to_tsquery('english', ' & '.join([*(f"'{t}'" for t in terms[:-1]), f"'{terms[-1]}':*"]))
+    rank = func.ts_rank(vector, tsquery)
+    snippet = func.ts_headline(
+        'english', Chat.message, tsquery,
+        f'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=20, MinWords=5, MaxFragments=1',
+    )
+    rows = (
+        db.session.query(Chat, rank, snippet)
+        .filter(Chat.user_id == user_id, vector.op('@@')(tsquery))
+        .order_by(rank.desc(), Chat.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+    return [(chat, round(float(score), 4), text) for chat, score, text in rows]
+
+
+def _search_like(user_id: int, terms: list, limit: int, offset: int) -> list:
+    conditions = [Chat.message.ilike(f'%{_escape_like(term)}%', escape='\\') for term in terms]
+    chats = (
+        Chat.query.filter(Chat.user_id == user_id, *conditions)
+        .order_by(Chat.timestamp.desc(), Chat.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+    return [(chat, None, _mark_terms(chat.message, terms)) for chat in chats]
+
+
+def _escape_like(term: str) -> str:
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _mark_terms(message: str, terms: list) -> str:
+    """Snippet around the first match with every term marked (LIKE fallback)."""
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(message)
+    start = max((first.start() if first else 0) - SNIPPET_CHARS // 3, 0)
+    text = message[start:start + SNIPPET_CHARS]
+    text = pattern.sub(lambda m: f'{_MARK_START}{m.group(0)}{_MARK_END}', text)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + SNIPPET_CHARS < len(message) else ''
+    return f'{prefix}{text}{suffix}'
+
+
+def _render_snippet(snippet: str | None) -> str:
+    """Escape the snippet and turn the match markers into <mark> tags."""
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
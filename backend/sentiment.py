@@ -0,0 +1,209 @@
+"""Lexicon-based sentiment scoring for chat messages.
+
+Replaces the per-request `TextBlob(text).sentiment` call. TextBlob's
+default analyzer is a lookup in the Pattern adjective lexicon
+(`textblob/en/en-sentiment.xml`) plus a few rules; importing TextBlob to
+get it pulls in NLTK and costs seconds on the first chat of every worker.
+Here the same lexicon is parsed once at startup (located with
+`importlib.util.find_spec`, without importing textblob) and messages are
+scored with a compiled tokenizer and the same modifier/negation rules, so
+scores match TextBlob's at a fraction of the cost. The one deliberate
+difference: contractions ("don't", "can't") negate the following word,
+which TextBlob's tokenizer misses. Without textblob installed a small
+builtin lexicon is used instead.
+
+Scores are memoized per text (repeated "hi"/"thanks" messages are free),
+and `label_many` scores a batch, deduplicating texts first.
+
+Configuration (app.config, defaults read from the environment):
+- SENTIMENT_LEXICON_PATH: explicit path to a Pattern-format sentiment XML
+- SENTIMENT_CACHE_SIZE: memoized texts (default 4096)
+"""
+import importlib.util
+import os
+import re
+import threading
+import xml.etree.ElementTree as ElementTree
+from functools import lru_cache
+
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+# "don't" -> "do", "n't" so contractions negate; "!" boosts the previous word
+_TOKEN = re.compile(r"[a-z]+(?=n't)|n't|[a-z]+(?:'[a-z]+)?|!")
+NEGATIONS = frozenset({'no', 'not', "n't", 'never', 'dont', 'cant', 'didnt', 'isnt', 'wont'})
+
+# (polarity, intensity, is_modifier) for when the TextBlob lexicon is missing
+_BUILTIN_LEXICON = {
+    'good': (0.7, 1.0, False), 'great': (0.8, 1.0, False), 'happy': (0.8, 1.0, False),
+    'glad': (0.5, 1.0, False), 'nice': (0.6, 1.0, False), 'better': (0.5, 1.0, False),
+    'best': (1.0, 1.0, False), 'love': (0.5, 1.0, False), 'amazing': (0.6, 1.0, False),
+    'awesome': (1.0, 1.0, False), 'excited': (0.4, 1.0, False), 'calm': (0.3, 1.0, False),
+    'fine': (0.4, 1.0, False), 'okay': (0.5, 1.0, False), 'proud': (0.8, 1.0, False),
+    'grateful': (0.7, 1.0, False), 'thankful': (0.5, 1.0, False), 'hopeful': (0.4, 1.0, False),
+    'relaxed': (0.4, 1.0, False), 'wonderful': (1.0, 1.0, False), 'fun': (0.3, 1.0, False),
+    'bad': (-0.7, 1.0, False), 'sad': (-0.5, 1.0, False), 'terrible': (-1.0, 1.0, False),
+    'awful': (-1.0, 1.0, False), 'horrible': (-1.0, 1.0, False), 'worse': (-0.4, 1.0, False),
+    'worst': (-1.0, 1.0, False), 'angry': (-0.5, 1.0, False), 'anxious': (-0.3, 1.0, False),
+    'nervous': (-0.3, 1.0, False), 'worried': (-0.4, 1.0, False), 'stressed': (-0.5, 1.0, False),
+    'scared': (-0.5, 1.0, False), 'afraid': (-0.6, 1.0, False), 'lonely': (-0.5, 1.0, False),
+    'tired': (-0.4, 1.0, False), 'depressed': (-0.5, 1.0, False), 'hopeless': (-0.6, 1.0, False),
+    'upset': (-0.5, 1.0, False), 'hurt': (-0.5, 1.0, False), 'hard': (-0.3, 1.0, False),
+    'difficult': (-0.5, 1.0, False), 'miserable': (-1.0, 1.0, False), 'painful': (-0.7, 1.0, False),
+    'hate': (-0.8, 1.0, False), 'sick': (-0.7, 1.0, False), 'wrong': (-0.5, 1.0, False),
+    'very': (0.2, 1.3, True), 'really': (0.2, 1.2, True), 'so': (0.0, 1.2, True),
+    'extremely': (-0.1, 1.5, True), 'too': (0.0, 1.2, True), 'quite': (0.0, 1.1, True),
+    'pretty': (0.25, 1.1, True), 'super': (0.3, 1.3, True), 'totally': (0.0, 1.3, True),
+}
+
+
+def find_textblob_lexicon() -> str | None:
+    """Path of TextBlob's en-sentiment.xml if textblob is installed (not imported)."""
+    try:
+        spec = importlib.util.find_spec('textblob')
+    except (ImportError, ValueError):
+        return None
+    for location in (spec.submodule_search_locations or []) if spec else []:
+        path = os.path.join(location, 'en', 'en-sentiment.xml')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_lexicon(path: str) -> dict:
+    """Parse a Pattern sentiment XML into {word: (polarity, intensity, is_modifier)}.
+
+    Like TextBlob, senses are averaged per part of speech and then across
+    parts of speech, each adjective also yields its adverb ("terrible" ->
+    "terribly") with the adjective's scores, and adverbs (RB) modify the
+    word that follows them.
+    """
+    senses = {}
+    for node in ElementTree.parse(path).getroot().iter('word'):
+        form = node.get('form')
+        if not form:
+            continue
+        scores = (float(node.get('polarity', 0.0)), float(node.get('intensity', 1.0)))
+        senses.setdefault(form, {}).setdefault(node.get('pos'), []).append(scores)
+
+    lexicon = {}
+    adjectives = []
+    for form, by_pos in senses.items():
+        per_pos = {pos: tuple(sum(values) / len(values) for values in zip(*scores))
+                   for pos, scores in by_pos.items()}
+        polarity, intensity = (sum(values) / len(values) for values in zip(*per_pos.values()))
+        lexicon[form] = (polarity, intensity, 'RB' in per_pos)
+        if 'JJ' in per_pos:
+            adjectives.append((form, per_pos['JJ']))
+
+    for form, (polarity, intensity) in adjectives:
+        if form.endswith('y'):
+            form = form[:-1] + 'i'
+        if form.endswith('le'):
+            form = form[:-2]
+        lexicon[form + 'ly'] = (polarity, intensity, True)
+    return lexicon
+
+
+class SentimentAnalyzer:
+    """Memoized lexicon scorer; `init_app` loads the lexicon and warms up."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.lexicon = None
+        self.source = None
+        self._cached_polarity = None
+
+    def init_app(self, app) -> None:
+        app.config.setdefault('SENTIMENT_LEXICON_PATH', os.getenv('SENTIMENT_LEXICON_PATH', ''))
+        app.config.setdefault('SENTIMENT_CACHE_SIZE', int(os.getenv('SENTIMENT_CACHE_SIZE', '4096')))
+        self.load(app.config['SENTIMENT_LEXICON_PATH'] or None, app.config['SENTIMENT_CACHE_SIZE'])
+        self.label('warm up the scorer')
+        app.extensions['sentiment'] = self
+
+    def load(self, path: str | None = None, cache_size: int = 4096) -> None:
+        path = path or find_textblob_lexicon()
+        lexicon = load_lexicon(path) if path else dict(_BUILTIN_LEXICON)
+        with self._lock:
+            self.lexicon = lexicon
+            self.source = path or 'builtin'
+            self._cached_polarity = lru_cache(maxsize=cache_size)(self._score)
+
+    def polarity(self, text: str) -> float:
+        """Polarity in [-1.0, 1.0], as TextBlob's PatternAnalyzer computes it."""
+        if self._cached_polarity is None:
+            self.load()
+        return self._cached_polarity(text)
+
+    def label(self, text: str) -> str:
+        polarity = self.polarity(text)
+        if polarity > POSITIVE_THRESHOLD:
+            return 'positive'
+        if polarity < NEGATIVE_THRESHOLD:
+            return 'negative'
+        return 'neutral'
+
+    def label_many(self, texts) -> list:
+        """Labels for many texts; each distinct text is scored once."""
+        texts = list(texts)
+        labels = {text: self.label(text) for text in set(texts)}
+        return [labels[text] for text in texts]
+
+    def _score(self, text: str) -> float:
+        lexicon = self.lexicon
+        found = []       # [polarity, intensity, negated] per assessed word
+        modifier = None  # preceding known adverb ("very good")
+        negation = None  # preceding negation ("not good")
+        for word in _TOKEN.findall(text.lower()):
+            entry = lexicon.get(word)
+            if entry is not None:
+                polarity, intensity, is_modifier = entry
+                if modifier is None:
+                    found.append([polarity, intensity, False])
+                else:
+                    previous = found[-1]
+                    previous[0] = max(-1.0, min(polarity * previous[1], 1.0))
+                    previous[1] = intensity
+                if negation is not None:
+                    found[-1][1] = 1.0 / found[-1][1]
+                    found[-1][2] = True
+                modifier = word if is_modifier else None
+                negation = word if word in NEGATIONS else None
+                continue
+
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                # Negation carries across small words ("not a good")
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith('ly'):
+                # "really not good"
+                found[-1][2] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            if word == '!' and found:
+                found[-1][0] = max(-1.0, min(found[-1][0] * 1.25, 1.0))
+
+        if not found:
+            return 0.0
+        return sum(p * -0.5 if negated else p for p, _, negated in found) / len(found)
+
+    def stats(self) -> dict:
+        info = self._cached_polarity.cache_info() if self._cached_polarity else None
+        return {
+            'lexicon': self.source,
+            'words': len(self.lexicon or ()),
+            'cache_hits': info.hits if info else 0,
+            'cache_misses': info.misses if info else 0,
+            'cache_size': info.currsize if info else 0,
+        }
+
+
+# Process-wide singleton (configured in app factory)
+sentiment_analyzer = SentimentAnalyzer()
+
+
+def detect_sentiment(text: str) -> str:
+    """'positive', 'negative' or 'neutral' for a chat message."""
+    return sentiment_analyzer.label(text)
@@ -0,0 +1,81 @@
+"""Shared fixtures: the app on a scratch SQLite database and a signed-in client.
+
+Run from the backend directory:
+    python -m pytest -q
+
+Password hashing runs on the test thread at the cheapest bcrypt cost, jobs
+run inline, and no AI provider is configured unless a test sets one.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from models import db, upgrade_schema  # noqa: E402
+
+PASSWORD = 'test-password'
+
+# Environment the tests must not inherit from a developer's shell or .env
+_ISOLATED_ENV = (
+    'DATABASE_URL', 'GEMINI_API_URL', 'GEMINI_API_KEY', 'GEMINI_PROVIDER', 'GEMINI_MODEL',
+    'AI_FALLBACK_PROVIDERS', 'GOOGLE_API_KEY', 'GROQ_API_KEY', 'AI_CACHE_ENABLED', 'WEB_CONCURRENCY',
+)
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Factory for apps on a fresh database; keyword arguments override config."""
+    for key in _ISOLATED_ENV:
+        monkeypatch.delenv(key, raising=False)
+
+    def make(**config):
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'SECRET_KEY': 'test-secret-key-with-at-least-32-bytes',
+            'JWT_SECRET_KEY': 'test-jwt-secret-key-with-at-least-32-bytes',
+            'BCRYPT_LOG_ROUNDS': 4,
+            'PASSWORD_HASH_WORKERS': 0,
+            'JOB_QUEUE_BACKEND': 'inline',
+            **config,
+        })
+        with app.app_context():
+            upgrade_schema()
+        return app
+
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def sign_up(client, email: str = 'student@aira.test', password: str = PASSWORD) -> dict:
+    """Register and log in; the login response plus ready-made auth headers."""
+    response = client.post('/auth/register', json={'name': 'Student', 'email': email, 'password': password})
+    assert response.status_code == 201, response.get_json()
+    response = client.post('/auth/login', json={'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    session = response.get_json()
+    session['headers'] = {'Authorization': f"Bearer {session['access_token']}"}
+    return session
+
+
+@pytest.fixture
+def session(client):
+    return sign_up(client)
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield db
@@ -0,0 +1,37 @@
+"""DELETE /chat/clear/<user_id> in batched transactions."""
+from conftest import sign_up
+from models import db, User
+
+
+def test_clear_deletes_in_batches_and_keeps_counters_consistent(make_app):
+    app = make_app(CHAT_DELETE_BATCH=2)
+    client = app.test_client()
+    session = sign_up(client)
+    other = sign_up(client, 'other@aira.test')
+    for owner in (session, other):
+        for n in range(5):
+            response = client.post('/chat/create', json={'message': f'searchable note {n}', 'sender': 'user'},
+                                   headers=owner['headers'])
+            assert response.status_code == 201
+
+    user_id = session['user']['id']
+    response = client.delete(f'/chat/clear/{user_id}', headers=session['headers'])
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'cleared', 'deleted': 5, 'batches': 3}
+
+    history = client.get(f'/chat/{user_id}', headers=session['headers']).get_json()
+    assert history['length'] == 0
+    with app.app_context():
+        assert db.session.get(User, user_id).message_count == 0
+        assert db.session.get(User, other['user']['id']).message_count == 5
+    search = client.get('/chat/search', query_string={'q': 'searchable'}, headers=session['headers']).get_json()
+    assert search['results'] == []
+
+    # Nobody else's history is touched
+    search = client.get('/chat/search', query_string={'q': 'searchable'}, headers=other['headers']).get_json()
+    assert len(search['results']) == 5
+
+
+def test_clear_of_another_user_is_forbidden(client, session):
+    response = client.delete(f"/chat/clear/{session['user']['id'] + 1}", headers=session['headers'])
+    assert response.status_code == 403
@@ -0,0 +1,103 @@
+"""Keyset pagination of GET /chat/<user_id>."""
+import json
+from datetime import datetime, timedelta
+
+from models import db, Chat
+
+
+def _seed(app, user_id: int) -> list:
+    """Nine messages, three of them sharing one timestamp; ids in display order."""
+    start = datetime(2026, 1, 1, 12, 0)
+    stamps = [start + timedelta(minutes=n) for n in range(4)]
+    stamps += [start + timedelta(minutes=4)] * 3
+    stamps += [start + timedelta(minutes=5 + n) for n in range(2)]
+    with app.app_context():
+        chats = [Chat(user_id=user_id, message=f'message {n}', sender='user', timestamp=stamp)
+                 for n, stamp in enumerate(stamps)]
+        db.session.add_all(chats)
+        db.session.commit()
+        return [chat.id for chat in chats]
+
+
+def _page(client, session, **params):
+    response = client.get(f"/chat/{session['user']['id']}", query_string=params, headers=session['headers'])
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _ids(page: dict) -> list:
+    return [chat['id'] for chat in page['history']]
+
+
+def test_latest_page_is_newest_rows_in_ascending_order(app, client, session):
+    ids = _seed(app, session['user']['id'])
+    page = _page(client, session, limit=4)
+    assert _ids(page) == ids[-4:]
+    assert page['length'] == 4
+    assert page['has_more'] is True
+
+
+def test_paging_back_visits_every_row_once_across_timestamp_ties(app, client, session):
+    ids = _seed(app, session['user']['id'])
+    seen = []
+    page = _page(client, session, limit=2)
+    while True:
+        seen = _ids(page) + seen
+        if not page['has_more']:
+            break
+        page = _page(client, session, limit=2, before=page['cursors']['before'])
+    assert seen == ids
+
+
+def test_last_page_backwards_reports_no_more(app, client, session):
+    ids = _seed(app, session['user']['id'])
+    page = _page(client, session, limit=len(ids))
+    assert _ids(page) == ids
+    assert page['has_more'] is False
+
+    # A cursor at the oldest row leaves nothing before it; the cursor is kept
+    empty = _page(client, session, before=page['cursors']['before'])
+    assert empty['history'] == []
+    assert empty['has_more'] is False
+    assert empty['cursors']['before'] == page['cursors']['before']
+
+
+def test_after_cursor_returns_only_newer_rows(app, client, session):
+    ids = _seed(app, session['user']['id'])
+    latest = _page(client, session, limit=3)
+    assert _page(client, session, after=latest['cursors']['after'])['history'] == []
+
+    older = _page(client, session, limit=3, before=latest['cursors']['before'])
+    newer = _page(client, session, limit=2, after=older['cursors']['after'])
+    assert _ids(newer) == ids[-3:-1]
+    assert newer['has_more'] is True
+
+
+def test_limit_is_clamped(app, client, session):
+    ids = _seed(app, session['user']['id'])
+    assert _ids(_page(client, session, limit=0)) == ids[-1:]
+    assert _ids(_page(client, session, limit=10_000)) == ids
+
+
+def test_rejects_bad_parameters(app, client, session):
+    _seed(app, session['user']['id'])
+    url = f"/chat/{session['user']['id']}"
+    cursor = _page(client, session, limit=1)['cursors']['before']
+    for params in ({'before': cursor, 'after': cursor}, {'before': 'not-a-cursor'}, {'limit': 'ten'}):
+        response = client.get(url, query_string=params, headers=session['headers'])
+        assert response.status_code == 400, params
+
+
+def test_other_users_history_is_forbidden(client, session):
+    response = client.get(f"/chat/{session['user']['id'] + 1}", headers=session['headers'])
+    assert response.status_code == 403
+
+
+def test_ndjson_streams_the_requested_range(app, client, session):
+    ids = _seed(app, session['user']['id'])
+    cursor = _page(client, session, limit=3)['cursors']['before']
+    response = client.get(f"/chat/{session['user']['id']}", query_string={'format': 'ndjson', 'before': cursor},
+                          headers=session['headers'])
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == ids[:-3]
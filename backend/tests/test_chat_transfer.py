@@ -0,0 +1,150 @@
+"""NDJSON import/export: size caps, gzip handling and record validation."""
+import gzip
+import io
+import json
+
+import pytest
+
+import chat_routes
+import chat_transfer
+from chat_transfer import BodyTooLarge, gzip_stream, iter_lines, parse_chat_record
+from conftest import sign_up
+
+
+def _ndjson(count: int, start: int = 0) -> bytes:
+    return b''.join(
+        json.dumps({'message': f'message {n}', 'sender': 'user', 'timestamp': f'2026-01-01T12:00:{n % 60:02d}'}).encode()
+        + b'\n'
+        for n in range(start, start + count)
+    )
+
+
+def test_iter_lines_joins_lines_split_across_reads(monkeypatch):
+    monkeypatch.setattr(chat_transfer, 'READ_CHUNK', 3)
+    assert list(iter_lines(io.BytesIO(b'first\nsecond\n\nlast'))) == ['first', 'second', '', 'last']
+
+
+def test_iter_lines_decompresses_gzip():
+    body = gzip.compress('héllo\nwörld\n'.encode('utf-8'))
+    assert list(iter_lines(io.BytesIO(body), gzipped=True)) == ['héllo', 'wörld']
+
+
+def test_gzip_bomb_is_stopped_in_bounded_chunks():
+    bomb = gzip.compress(b'\n' * (8 * 1024 * 1024))
+    assert max(len(chunk) for chunk in chat_transfer._read_chunks(io.BytesIO(bomb), True)) <= chat_transfer.READ_CHUNK
+    with pytest.raises(BodyTooLarge, match='body larger'):
+        for _ in iter_lines(io.BytesIO(bomb), gzipped=True, max_bytes=1024 * 1024):
+            pass
+
+
+def test_line_cap_applies_before_the_newline_arrives():
+    lines = iter_lines(io.BytesIO(b'short\n' + b'x' * 100), max_line=50)
+    assert next(lines) == 'short'
+    with pytest.raises(BodyTooLarge, match='line longer'):
+        next(lines)
+
+
+def test_limits_are_inclusive():
+    body = b'x' * 10 + b'\n'
+    assert list(iter_lines(io.BytesIO(body), max_line=10, max_bytes=len(body))) == ['x' * 10]
+
+
+def test_gzip_stream_round_trips():
+    assert gzip.decompress(b''.join(gzip_stream(['a\n', '', 'b\n']))) == b'a\nb\n'
+
+
+def test_parse_chat_record_normalizes_and_validates():
+    record = parse_chat_record(json.dumps({
+        'message': 'hi', 'sender': 'user', 'timestamp': '2026-01-01T12:00:00+02:00', 'sentiment': 'positive',
+        'id': 7, 'user_id': 99,
+    }))
+    assert record == {'message': 'hi', 'sender': 'user', 'timestamp': record['timestamp'], 'sentiment': 'positive'}
+    assert record['timestamp'].isoformat() == '2026-01-01T10:00:00'
+    assert parse_chat_record('{"message": "hi", "sender": "aira", "sentiment": "positive"}')['sentiment'] is None
+
+    for line in ('not json', '[1]', '{"sender": "user"}', '{"message": "hi", "sender": "bot"}',
+                 '{"message": "hi", "sender": "user", "timestamp": "yesterday"}'):
+        with pytest.raises(ValueError):
+            parse_chat_record(line)
+
+
+def _import(client, session, body: bytes, **headers):
+    return client.post('/chat/import', data=body, headers={**session['headers'], **headers},
+                       content_type='application/x-ndjson')
+
+
+def test_import_skips_invalid_lines(client, session):
+    body = _ndjson(3) + b'{"message": ""}\n\n' + _ndjson(1, start=3)
+    response = _import(client, session, body)
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'imported': 4, 'skipped': 1, 'errors': [{'line': 4, 'error': 'message is required'}], 'history_length': 4,
+    }
+
+
+def test_import_accepts_a_gzip_body(client, session):
+    response = _import(client, session, gzip.compress(_ndjson(5)), **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 5
+
+
+def test_import_over_the_body_cap_keeps_committed_batches(make_app, monkeypatch):
+    monkeypatch.setattr(chat_routes, 'IMPORT_BATCH', 2)
+    monkeypatch.setattr(chat_transfer, 'READ_CHUNK', 64)
+    body = _ndjson(10)
+    client = make_app(CHAT_IMPORT_MAX_BYTES=len(body) // 2).test_client()
+    session = sign_up(client)
+    response = _import(client, session, gzip.compress(body), **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 413
+    imported = response.get_json()['imported']
+    assert 0 < imported < 10
+    history = client.get(f"/chat/{session['user']['id']}", headers=session['headers']).get_json()
+    assert history['length'] == imported
+
+
+def test_import_rejects_an_overlong_line(make_app):
+    client = make_app(CHAT_IMPORT_MAX_LINE=64).test_client()
+    session = sign_up(client)
+    line = json.dumps({'message': 'x' * 100, 'sender': 'user'}).encode()
+    response = _import(client, session, line + b'\n')
+    assert response.status_code == 413
+    assert response.get_json()['imported'] == 0
+
+
+def test_import_rejects_a_corrupt_gzip_body(client, session):
+    response = _import(client, session, b'definitely not gzip', **{'Content-Encoding': 'gzip'})
+    assert response.status_code == 400
+
+
+def _export(client, session, accept_encoding: str = '', **params):
+    return client.get('/chat/export', query_string=params,
+                      headers={**session['headers'], 'Accept-Encoding': accept_encoding})
+
+
+@pytest.mark.parametrize('accept, encoded', [('gzip, deflate', True), ('gzip;q=0, identity', False), ('', False)])
+def test_export_negotiates_content_encoding(client, session, accept, encoded):
+    _import(client, session, _ndjson(3))
+    response = _export(client, session, accept)
+    assert 'filename="aira-chats.ndjson"' in response.headers['Content-Disposition']
+    assert 'Accept-Encoding' in response.headers['Vary']
+    body = response.get_data()
+    if encoded:
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(body)
+    else:
+        assert 'Content-Encoding' not in response.headers
+    assert len(body.splitlines()) == 3
+
+
+def test_export_gzip_file_round_trips_through_import(make_app):
+    client = make_app().test_client()
+    first = sign_up(client, 'first@aira.test')
+    _import(client, first, _ndjson(4))
+    response = _export(client, first, compress='gzip')
+    assert response.mimetype == 'application/gzip'
+    assert 'Content-Encoding' not in response.headers
+    assert 'filename="aira-chats.ndjson.gz"' in response.headers['Content-Disposition']
+
+    second = sign_up(client, 'second@aira.test')
+    imported = _import(client, second, response.get_data(), **{'Content-Encoding': 'gzip'})
+    assert imported.get_json()['imported'] == 4
@@ -0,0 +1,115 @@
+"""CircuitBreaker state transitions."""
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, is_provider_failure
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, 'time', SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def _http_error(status: int) -> requests.exceptions.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_opens_after_consecutive_failures_only(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, half_open_probes=1)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.stats()['rejected'] == 2
+    assert breaker.stats()['trips'] == 1
+
+
+def test_half_opens_after_reset_timeout_and_limits_probes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, half_open_probes=2)
+    breaker.record_failure()
+    clock.now += 29.9
+    assert breaker.state == OPEN
+    assert breaker.stats()['retry_in'] == pytest.approx(0.1)
+
+    clock.now += 0.1
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, half_open_probes=1)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()['consecutive_failures'] == 0
+
+    # Back to needing the full threshold
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens_for_a_full_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, half_open_probes=1)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()['trips'] == 2
+
+    clock.now += 9
+    assert breaker.allow() is False
+    clock.now += 1
+    assert breaker.state == HALF_OPEN
+
+
+def test_non_provider_errors_only_free_the_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, half_open_probes=1)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow() is True
+    breaker.record_exception(_http_error(400))
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+    breaker.record_exception(_http_error(503))
+    assert breaker.state == OPEN
+
+
+@pytest.mark.parametrize('exc, expected', [
+    (requests.exceptions.ConnectionError(), True),
+    (requests.exceptions.ReadTimeout(), True),
+    (_http_error(502), True),
+    (_http_error(429), False),
+    (_http_error(404), False),
+    (ValueError('bad payload'), False),
+])
+def test_is_provider_failure(exc, expected):
+    assert is_provider_failure(exc) is expected
@@ -0,0 +1,103 @@
+"""Rolling conversation summary: folding order and resets."""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from context import build_context, reset_summary, update_summary
+from models import db, Chat, ConversationSummary, User
+
+START = datetime(2026, 3, 1, 9, 0)
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(AI_CONTEXT_TURNS=1)
+
+
+def _add(user_id: int, topics, start: datetime) -> None:
+    db.session.add_all([
+        Chat(user_id=user_id, message=f'{topic} was discussed today', sender='user',
+             timestamp=start + timedelta(minutes=n))
+        for n, topic in enumerate(topics)
+    ])
+    db.session.get(User, user_id).message_count += len(topics)
+    db.session.commit()
+
+
+def _summary(user_id: int) -> str:
+    row = db.session.get(ConversationSummary, user_id)
+    return row.summary if row is not None else ''
+
+
+def test_folds_everything_outside_the_window_once(app, session):
+    user_id = session['user']['id']
+    with app.app_context():
+        _add(user_id, [f'topic number {n}' for n in range(5)], START)
+        assert update_summary(user_id) == 3
+        assert update_summary(user_id) == 0
+        assert _summary(user_id).splitlines() == [f'- topic number {n} was discussed today' for n in range(3)]
+
+        context = build_context(user_id, 'next message')
+        assert context[0]['role'] == 'system'
+        assert [item['content'] for item in context[1:]] == [f'topic number {n} was discussed today' for n in (3, 4)]
+
+
+def test_older_rows_with_newer_ids_do_not_skip_live_messages(app, session):
+    user_id = session['user']['id']
+    with app.app_context():
+        _add(user_id, [f'live topic number {n}' for n in range(6)], START)
+        update_summary(user_id)
+        # High ids, timestamps before everything folded so far
+        _add(user_id, ['old topic one', 'old topic two'], START - timedelta(days=1))
+        update_summary(user_id)
+        _add(user_id, [f'live topic number {n}' for n in range(6, 10)], START + timedelta(hours=1))
+        update_summary(user_id)
+
+        summary = _summary(user_id)
+        for n in range(8):
+            assert f'live topic number {n} ' in summary
+
+
+def test_import_of_older_messages_rebuilds_the_summary(app, client, session):
+    user_id = session['user']['id']
+    with app.app_context():
+        _add(user_id, [f'live topic number {n}' for n in range(6)], START)
+        update_summary(user_id)
+
+    body = ''.join(json.dumps({'message': f'imported topic {n} was discussed', 'sender': 'user',
+                               'timestamp': (START - timedelta(days=1, minutes=-n)).isoformat()}) + '\n'
+                   for n in range(2))
+    response = client.post('/chat/import', data=body, headers=session['headers'])
+    assert response.status_code == 200
+
+    with app.app_context():
+        lines = _summary(user_id).splitlines()
+    assert lines[:2] == ['- imported topic 0 was discussed', '- imported topic 1 was discussed']
+    assert '- live topic number 3 was discussed today' in lines
+
+
+def test_reset_compares_the_full_watermark(app, session):
+    user_id = session['user']['id']
+    with app.app_context():
+        _add(user_id, [f'topic number {n}' for n in range(5)], START)
+        update_summary(user_id)
+        folded, live = Chat.query.order_by(Chat.timestamp, Chat.id).all()[2:4]
+
+        assert reset_summary(user_id, live.timestamp, live.id) is False
+        assert reset_summary(user_id, folded.timestamp, folded.id) is True
+        db.session.commit()
+        assert _summary(user_id) == ''
+
+
+def test_deleting_a_folded_message_drops_its_line(app, client, session):
+    user_id = session['user']['id']
+    with app.app_context():
+        _add(user_id, [f'topic number {n}' for n in range(5)], START)
+        update_summary(user_id)
+        first = Chat.query.order_by(Chat.timestamp, Chat.id).first().id
+
+    assert client.delete(f'/chat/delete/{first}', headers=session['headers']).status_code == 200
+    with app.app_context():
+        assert 'topic number 0 ' not in _summary(user_id)
+        assert 'topic number 1 ' in _summary(user_id)
@@ -0,0 +1,58 @@
+"""PasswordHasher's process pool: recovery, timeouts and the pending bound."""
+import os
+import signal
+import time
+
+import pytest
+from flask import Flask
+
+from hashing import HasherBusy, PasswordHasher
+
+
+@pytest.fixture
+def make_hasher():
+    hashers = []
+
+    def make(**config):
+        app = Flask(__name__)
+        app.config.update({'BCRYPT_LOG_ROUNDS': 4, 'PASSWORD_HASH_WORKERS': 1,
+                           'PASSWORD_HASH_MAX_PENDING': 2, 'PASSWORD_HASH_TIMEOUT': 30, **config})
+        hasher = PasswordHasher()
+        hasher.init_app(app)
+        hashers.append(hasher)
+        return hasher
+
+    yield make
+    for hasher in hashers:
+        hasher.shutdown()
+
+
+def test_hashes_verify_in_the_pool(make_hasher):
+    hasher = make_hasher()
+    pw_hash = hasher.hash('secret')
+    assert hasher.check(pw_hash, 'secret') is True
+    assert hasher.check(pw_hash, 'other') is False
+    assert hasher.needs_rehash(pw_hash) is False
+
+
+def test_pool_is_replaced_after_a_worker_dies(make_hasher):
+    hasher = make_hasher()
+    pw_hash = hasher.hash('secret')
+    broken = hasher._pool
+    for pid in list(broken._processes):
+        os.kill(pid, signal.SIGKILL)
+    time.sleep(0.5)
+
+    assert hasher.check(pw_hash, 'secret') is True
+    assert hasher._pool is not broken
+
+
+def test_timeout_is_busy_and_keeps_the_slot_until_the_hash_ends(make_hasher):
+    hasher = make_hasher(BCRYPT_LOG_ROUNDS=14, PASSWORD_HASH_TIMEOUT=0.05)
+    with pytest.raises(HasherBusy, match='timed out'):
+        hasher.hash('secret')
+    with pytest.raises(HasherBusy, match='timed out'):
+        hasher.hash('secret')
+    # Both hashes are still queued or running in the single process
+    with pytest.raises(HasherBusy, match='pending'):
+        hasher.hash('secret')
@@ -0,0 +1,172 @@
+"""Hedged AI requests (AI_HEDGE_AFTER_MS) racing the provider chain."""
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from ai_client import ai_client
+from chat_routes import AI_UNAVAILABLE_REPLY, get_gemini_response, stream_gemini_response
+
+PRIMARY_URL = 'http://primary.test/v1/chat/completions'
+FALLBACK_URL = 'http://fallback.test/v1beta/models/test:generateContent'
+HEDGE_AFTER_MS = 50
+
+
+class Response:
+    """A provider response: plain JSON, or SSE lines with a pause before each."""
+
+    def __init__(self, body: dict | None = None, lines: list | None = None, pause: float = 0.0):
+        self.status_code = 200
+        self.headers = {}
+        self.encoding = None
+        self.body = body
+        self.lines = lines or []
+        self.pause = pause
+        self.read = 0
+        self.closed = False
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, **kwargs):
+        for line in self.lines:
+            time.sleep(self.pause)
+            self.read += 1
+            yield line
+
+    def close(self):
+        self.closed = True
+
+
+class Providers:
+    """Stands in for `ai_client.post`: per-provider delay, then a reply or an error."""
+
+    def __init__(self):
+        self.delay = {'primary': 0.0, 'fallback': 0.0}
+        self.error = {'primary': None, 'fallback': None}
+        self.responses = []
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def post(self, url, stream=False, **kwargs):
+        name = 'primary' if url.startswith('http://primary.test') else 'fallback'
+        with self._lock:
+            self.calls.append(name)
+        time.sleep(self.delay[name])
+        if self.error[name] is not None:
+            raise self.error[name]
+        if name == 'primary':
+            chunk = lambda text: {'choices': [{'delta': {'content': text}}]}  # noqa: E731
+            body = {'choices': [{'message': {'content': 'from primary'}}]}
+        else:
+            chunk = lambda text: {'candidates': [{'content': {'parts': [{'text': text}]}}]}  # noqa: E731
+            body = {'candidates': [{'content': {'parts': [{'text': 'from fallback'}]}}]}
+        if not stream:
+            return Response(body)
+        response = Response(lines=[f'data: {json.dumps(chunk(word))}' for word in (f'from {name}', '.', '.')],
+                            pause=0.3 if name == 'fallback' else 0.0)
+        with self._lock:
+            self.responses.append((name, response))
+        return response
+
+
+@pytest.fixture
+def providers(make_app, monkeypatch):
+    app = make_app(
+        GEMINI_PROVIDER='groq', GEMINI_API_KEY='gsk_test', GEMINI_API_URL=PRIMARY_URL,
+        AI_FALLBACK_PROVIDERS='google', GOOGLE_API_KEY='AIza-test', GOOGLE_API_URL=FALLBACK_URL,
+        AI_HEDGE_AFTER_MS=HEDGE_AFTER_MS, AI_MAX_CONCURRENCY=2, AI_QUEUE_TIMEOUT=0.5,
+    )
+    fake = Providers()
+    monkeypatch.setattr(ai_client, 'post', fake.post)
+    with app.app_context():
+        yield fake
+        _wait_idle()
+
+
+def _wait_idle(timeout: float = 3.0) -> None:
+    """Wait for background provider calls (losing racers) to give back their slots."""
+    deadline = time.monotonic() + timeout
+    while ai_client.concurrency_stats()['in_flight'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert ai_client.concurrency_stats()['in_flight'] == 0
+
+
+def _timed(fn, *args):
+    began = time.monotonic()
+    result = fn(*args)
+    return result, time.monotonic() - began
+
+
+def test_fast_primary_never_launches_the_hedge(providers):
+    result, _ = _timed(get_gemini_response, 'hello')
+    assert result['reply'] == 'from primary'
+    assert providers.calls == ['primary']
+
+
+def test_slow_primary_is_beaten_by_the_hedge(providers):
+    providers.delay['primary'] = 0.6
+    result, elapsed = _timed(get_gemini_response, 'hello')
+    assert result['reply'] == 'from fallback'
+    assert result['meta'] == {'provider': 'google'}
+    assert elapsed < 0.4
+    assert providers.calls == ['primary', 'fallback']
+
+
+def test_primary_answering_first_after_the_hedge_started_wins(providers):
+    providers.delay['primary'] = 0.15
+    providers.delay['fallback'] = 0.6
+    result, elapsed = _timed(get_gemini_response, 'hello')
+    assert result['reply'] == 'from primary'
+    assert elapsed < 0.4
+    assert providers.calls == ['primary', 'fallback']
+
+
+def test_primary_stream_cancels_the_hedge_stream(providers):
+    # The hedge connects first but streams slowly; the primary's first chunk wins
+    providers.delay['primary'] = 0.1
+    text = ''.join(stream_gemini_response('hello'))
+    assert text == 'from primary..'
+    _wait_idle()
+    hedge = dict(providers.responses)['fallback']
+    assert hedge.closed
+    assert hedge.read < len(hedge.lines)
+
+
+def test_failing_hedge_leaves_the_primary_to_answer(providers):
+    providers.delay['primary'] = 0.2
+    providers.error['fallback'] = requests.exceptions.ConnectionError('refused')
+    result = get_gemini_response('hello')
+    assert result['reply'] == 'from primary'
+    assert result['meta'] == {'provider': 'groq'}
+
+
+def test_failing_primary_starts_the_next_provider_at_once(providers):
+    providers.error['primary'] = requests.exceptions.ConnectionError('refused')
+    result, elapsed = _timed(get_gemini_response, 'hello')
+    assert result['reply'] == 'from fallback'
+    assert elapsed < HEDGE_AFTER_MS / 1000
+
+
+def test_both_failing_returns_the_unavailable_reply(providers):
+    providers.delay['primary'] = 0.1
+    providers.error['primary'] = requests.exceptions.ReadTimeout('slow')
+    providers.error['fallback'] = requests.exceptions.ConnectionError('refused')
+    result = get_gemini_response('hello')
+    assert result['reply'] == AI_UNAVAILABLE_REPLY
+    assert providers.calls == ['primary', 'fallback']
+
+
+def test_slots_are_released_after_races(providers):
+    # Two slots: losing racers that kept theirs would starve the next round
+    providers.delay['primary'] = 0.15
+    providers.delay['fallback'] = 0.1
+    for _ in range(4):
+        assert get_gemini_response('hello')['reply'] in ('from primary', 'from fallback')
+        _wait_idle()
+    assert ai_client.concurrency_stats()['rejected'] == 0
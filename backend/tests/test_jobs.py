@@ -0,0 +1,21 @@
+"""In-process job broker."""
+from jobs import MemoryBroker
+
+
+def test_failed_jobs_are_counted_not_kept():
+    broker = MemoryBroker()
+    for n in range(3):
+        broker.enqueue('noop', {'n': n}, max_attempts=1)
+        broker.fail(broker.claim(), 'boom')
+    assert broker.depth()['failed'] == 3
+    assert broker.depth()['running'] == 0
+    assert broker._failed == 3
+
+
+def test_find_queued_coalesces_equal_payloads():
+    broker = MemoryBroker()
+    job_id = broker.enqueue('update_summary', {'user_id': 1}, max_attempts=3)
+    assert broker.find_queued('update_summary', {'user_id': 1}) == job_id
+    assert broker.find_queued('update_summary', {'user_id': 2}) is None
+    broker.complete(broker.claim())
+    assert broker.find_queued('update_summary', {'user_id': 1}) is None
@@ -0,0 +1,149 @@
+"""Sliding-window login limits and their Retry-After."""
+import logging
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask, request
+
+import login_limit
+from conftest import PASSWORD, sign_up
+from login_limit import LoginLimiter
+
+WINDOW = 60.0
+START = 100 * WINDOW  # the start of a fixed window
+
+
+class Clock:
+    def __init__(self):
+        self.now = START
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(login_limit, 'time', SimpleNamespace(time=clock))
+    return clock
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def make_limiter(request):
+    """LoginLimiter factory over both stores ('redis' uses the in-process stand-in)."""
+    def make(**config):
+        app = Flask(__name__)
+        app.config.update({
+            'LOGIN_IP_LIMIT': 4, 'LOGIN_IP_WINDOW': WINDOW, 'LOGIN_EMAIL_LIMIT': 0,
+            'LOGIN_LIMIT_BACKEND': request.param, 'LOGIN_LIMIT_REDIS_URL': 'local://', 'LOGIN_PROXY_HOPS': 0,
+            **config,
+        })
+        limiter = LoginLimiter()
+        limiter.init_app(app)
+        return limiter, app
+    return make
+
+
+def _fail(limiter, times: int, ip: str = '10.0.0.1', email: str = 'a@aira.test') -> None:
+    for _ in range(times):
+        limiter.record_failure(ip, email)
+
+
+def test_full_window_waits_for_the_next_one(clock, make_limiter):
+    limiter, _ = make_limiter()
+    _fail(limiter, 3)
+    assert limiter.retry_after('10.0.0.1', 'a@aira.test') is None
+    _fail(limiter, 1)
+    clock.now += 20
+    assert limiter.retry_after('10.0.0.1', 'a@aira.test') == pytest.approx(40)
+    assert limiter.retry_after('10.0.0.2', 'a@aira.test') is None
+
+
+def test_previous_window_weight_decays(clock, make_limiter):
+    limiter, _ = make_limiter()
+    _fail(limiter, 4)
+
+    # 6 s into the next window the previous 4 still weigh 4 * 0.9 = 3.6
+    clock.now = START + WINDOW + 6
+    assert limiter.retry_after('10.0.0.1', '') is None
+    _fail(limiter, 1)
+    # 1 + 4 * (1 - elapsed / 60) drops below 4 once elapsed passes 15 s
+    assert limiter.retry_after('10.0.0.1', '') == pytest.approx(9, abs=0.01)
+    clock.now = START + WINDOW + 15.01
+    assert limiter.retry_after('10.0.0.1', '') is None
+
+
+def test_counts_older_than_two_windows_are_forgotten(clock, make_limiter):
+    limiter, _ = make_limiter()
+    _fail(limiter, 4)
+    clock.now = START + 2 * WINDOW
+    assert limiter.retry_after('10.0.0.1', '') is None
+
+
+def test_success_clears_only_the_email_count(clock, make_limiter):
+    limiter, _ = make_limiter(LOGIN_IP_LIMIT=3, LOGIN_EMAIL_LIMIT=2, LOGIN_EMAIL_WINDOW=900)
+    _fail(limiter, 2)
+    # Full in the current fixed window: wait for the next one to start
+    assert limiter.retry_after('10.0.0.9', 'a@aira.test') == pytest.approx(900 - START % 900)
+    limiter.record_success('a@aira.test')
+    assert limiter.retry_after('10.0.0.9', 'a@aira.test') is None
+
+    _fail(limiter, 1, email='b@aira.test')
+    assert limiter.retry_after('10.0.0.1', 'c@aira.test') == pytest.approx(WINDOW)
+
+
+def test_zero_limit_disables_a_rule(clock, make_limiter):
+    limiter, _ = make_limiter(LOGIN_IP_LIMIT=0)
+    _fail(limiter, 50)
+    assert limiter.retry_after('10.0.0.1', 'a@aira.test') is None
+
+
+def test_client_ip_looks_through_trusted_proxies(make_limiter):
+    limiter, app = make_limiter(LOGIN_PROXY_HOPS=1)
+    with app.test_request_context(headers={'X-Forwarded-For': '6.6.6.6, 203.0.113.7'},
+                                  environ_base={'REMOTE_ADDR': '10.0.0.254'}):
+        assert limiter.client_ip(request) == '203.0.113.7'
+    with app.test_request_context(environ_base={'REMOTE_ADDR': '198.51.100.3'}):
+        assert limiter.client_ip(request) == '198.51.100.3'
+
+
+def test_forwarded_request_without_proxy_hops_warns_once(make_limiter, caplog):
+    limiter, app = make_limiter()
+    for _ in range(2):
+        with app.test_request_context(headers={'X-Forwarded-For': '203.0.113.7'},
+                                      environ_base={'REMOTE_ADDR': '10.0.0.254'}):
+            with caplog.at_level(logging.WARNING):
+                assert limiter.client_ip(request) == '10.0.0.254'
+    assert len([record for record in caplog.records if 'LOGIN_PROXY_HOPS' in record.message]) == 1
+
+
+def test_login_route_answers_429_with_retry_after(make_app):
+    client = make_app(LOGIN_IP_LIMIT=3, LOGIN_EMAIL_LIMIT=2, LOGIN_EMAIL_WINDOW=900).test_client()
+    sign_up(client)
+
+    # Successful logins never count against the IP
+    for _ in range(5):
+        assert client.post('/auth/login', json={'email': 'student@aira.test', 'password': PASSWORD}).status_code == 200
+
+    for _ in range(2):
+        assert client.post('/auth/login', json={'email': 'student@aira.test', 'password': 'wrong'}).status_code == 401
+    response = client.post('/auth/login', json={'email': 'student@aira.test', 'password': PASSWORD})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 900
+    assert response.get_json()['retry_after'] == int(response.headers['Retry-After'])
+
+    # One more failure elsewhere fills the IP's three
+    assert client.post('/auth/login', json={'email': 'other@aira.test', 'password': 'wrong'}).status_code == 401
+    response = client.post('/auth/login', json={'email': 'third@aira.test', 'password': 'wrong'})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 60
+
+
+@pytest.mark.parametrize('workers, warned', [('3', True), ('1', False)])
+def test_memory_store_with_several_workers_warns(monkeypatch, caplog, workers, warned):
+    monkeypatch.setenv('WEB_CONCURRENCY', workers)
+    app = Flask(__name__)
+    app.config.update(LOGIN_LIMIT_BACKEND='memory')
+    with caplog.at_level(logging.WARNING):
+        LoginLimiter().init_app(app)
+    assert any('LOGIN_LIMIT_BACKEND' in record.message for record in caplog.records) is warned
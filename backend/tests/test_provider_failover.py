@@ -0,0 +1,138 @@
+"""Failover along the AI provider chain."""
+import json
+
+import pytest
+import requests
+
+from ai_client import ai_client
+from chat_routes import AI_UNAVAILABLE_REPLY, _generate_reply, get_gemini_response
+from circuit_breaker import OPEN, circuit_breakers
+from providers import get_provider_chain, resolve_provider_chain
+
+PRIMARY_URL = 'http://primary.test/v1/chat/completions'
+FALLBACK_URL = 'http://fallback.test/generate'
+
+
+class FakeResponse:
+    def __init__(self, status: int = 200, body: dict | None = None, lines: list | None = None):
+        self.status_code = status
+        self.headers = {}
+        self.encoding = None
+        self._body = body or {}
+        self._lines = lines or []
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f'{self.status_code} error', response=self)
+
+    def iter_lines(self, **kwargs):
+        for line in self._lines:
+            if isinstance(line, Exception):
+                raise line
+            yield line
+
+    def close(self):
+        pass
+
+
+class FakeProviders:
+    """Stands in for `ai_client.post`: a queue of outcomes per URL, recording calls."""
+
+    def __init__(self):
+        self.outcomes = {PRIMARY_URL: [], FALLBACK_URL: []}
+        self.calls = []
+
+    def post(self, url, **kwargs):
+        self.calls.append(url)
+        outcome = self.outcomes[url].pop(0) if self.outcomes[url] else FakeResponse(200, _reply(url))
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _reply(url: str) -> dict:
+    if url == PRIMARY_URL:
+        return {'choices': [{'message': {'content': 'from primary'}}]}
+    return {'output': 'from fallback'}
+
+
+@pytest.fixture
+def fake(make_app, monkeypatch):
+    app = make_app(
+        GEMINI_PROVIDER='groq', GEMINI_API_KEY='gsk_test', GEMINI_API_URL=PRIMARY_URL,
+        AI_FALLBACK_PROVIDERS='generic', GENERIC_API_KEY='generic-test', GENERIC_API_URL=FALLBACK_URL,
+        AI_BREAKER_FAILURES=2,
+    )
+    providers = FakeProviders()
+    monkeypatch.setattr(ai_client, 'post', providers.post)
+    with app.app_context():
+        yield providers
+
+
+def test_primary_serves_when_healthy(fake):
+    result = get_gemini_response('hello')
+    assert result['reply'] == 'from primary'
+    assert result['meta'] == {'provider': 'groq'}
+    assert fake.calls == [PRIMARY_URL]
+
+
+@pytest.mark.parametrize('failure', [
+    requests.exceptions.ConnectionError('refused'),
+    requests.exceptions.ReadTimeout('slow'),
+    FakeResponse(503),
+])
+def test_falls_over_to_next_provider(fake, failure):
+    fake.outcomes[PRIMARY_URL].append(failure)
+    result = get_gemini_response('hello')
+    assert result['reply'] == 'from fallback'
+    assert result['meta'] == {'provider': 'generic'}
+    assert fake.calls == [PRIMARY_URL, FALLBACK_URL]
+
+
+def test_open_breaker_skips_the_primary(fake):
+    fake.outcomes[PRIMARY_URL] += [FakeResponse(500), FakeResponse(500)]
+    get_gemini_response('one')
+    get_gemini_response('two')
+    assert circuit_breakers.breaker('groq', get_provider_chain()[0].model).state == OPEN
+
+    fake.calls.clear()
+    assert get_gemini_response('three')['reply'] == 'from fallback'
+    assert fake.calls == [FALLBACK_URL]
+
+
+def test_every_provider_failing_returns_the_unavailable_reply(fake):
+    fake.outcomes[PRIMARY_URL].append(requests.exceptions.ConnectionError('down'))
+    fake.outcomes[FALLBACK_URL].append(FakeResponse(502))
+    result = get_gemini_response('hello')
+    assert result['reply'] == AI_UNAVAILABLE_REPLY
+    assert '502' in result['error']
+
+
+def test_stream_failing_after_first_text_does_not_switch_provider(fake):
+    chunk = json.dumps({'choices': [{'delta': {'content': 'partial'}}]})
+    fake.outcomes[PRIMARY_URL].append(FakeResponse(200, lines=[
+        f'data: {chunk}', requests.exceptions.ChunkedEncodingError('connection reset'),
+    ]))
+    served = {}
+    texts = []
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        for text in _generate_reply(get_provider_chain(), 'hello', stream=True, served=served):
+            texts.append(text)
+    assert texts == ['partial']
+    assert served == {'provider': 'groq'}
+    assert fake.calls == [PRIMARY_URL]
+
+
+def test_chain_skips_fallbacks_without_a_key(monkeypatch):
+    monkeypatch.delenv('GENERIC_API_KEY', raising=False)
+    monkeypatch.delenv('GOOGLE_API_KEY', raising=False)
+    chain = resolve_provider_chain({'GEMINI_API_KEY': 'gsk_test', 'AI_FALLBACK_PROVIDERS': 'generic, google'})
+    assert [provider.name for provider in chain] == ['groq']
+
+
+def test_chain_rejects_unknown_fallbacks():
+    with pytest.raises(ValueError):
+        resolve_provider_chain({'AI_FALLBACK_PROVIDERS': 'nonesuch'})
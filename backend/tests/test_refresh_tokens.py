@@ -0,0 +1,108 @@
+"""Refresh token rotation, reuse detection and logout."""
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import revocation
+from conftest import PASSWORD, sign_up
+
+
+class Clock:
+    """time.time() shifted by `offset` seconds."""
+
+    def __init__(self, real):
+        self.real = real
+        self.offset = 0.0
+
+    def __call__(self):
+        return self.real() + self.offset
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(time.time)
+    # Only revocation.py's clock; JWT expiry and everything else keep real time
+    monkeypatch.setattr(revocation, 'time', SimpleNamespace(time=clock))
+    return clock
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def client(request, make_app):
+    app = make_app(JWT_REVOCATION_BACKEND=request.param, JWT_REVOCATION_REDIS_URL='local://',
+                   JWT_REFRESH_REUSE_GRACE=30)
+    return app.test_client()
+
+
+def _bearer(token: str) -> dict:
+    return {'Authorization': f'Bearer {token}'}
+
+
+def _refresh(client, refresh_token: str):
+    return client.post('/auth/refresh', headers=_bearer(refresh_token))
+
+
+def _can_read_history(client, session: dict, access_token: str) -> bool:
+    response = client.get(f"/chat/{session['user']['id']}", headers=_bearer(access_token))
+    return response.status_code == 200
+
+
+def test_refresh_rotates_to_a_working_pair(client, session):
+    response = _refresh(client, session['refresh_token'])
+    assert response.status_code == 200
+    pair = response.get_json()
+    assert pair['refresh_token'] != session['refresh_token']
+    assert _can_read_history(client, session, pair['access_token'])
+    assert _refresh(client, pair['refresh_token']).status_code == 200
+
+
+def test_reuse_within_grace_is_allowed(client, session, clock):
+    assert _refresh(client, session['refresh_token']).status_code == 200
+    clock.offset = 29
+    assert _refresh(client, session['refresh_token']).status_code == 200
+
+
+def test_reuse_after_grace_revokes_the_whole_session(client, session, clock):
+    latest = _refresh(client, session['refresh_token']).get_json()
+    other = client.post('/auth/login', json={'email': 'student@aira.test', 'password': PASSWORD}).get_json()
+
+    clock.offset = 31
+    response = _refresh(client, session['refresh_token'])
+    assert response.status_code == 401
+    assert response.get_json() == {'error': 'Token has been revoked'}
+
+    # Every token of that session is now dead, including the newest pair
+    assert _refresh(client, latest['refresh_token']).status_code == 401
+    assert not _can_read_history(client, session, latest['access_token'])
+    assert not _can_read_history(client, session, session['access_token'])
+
+    # Another login of the same user is a separate session
+    assert _can_read_history(client, session, other['access_token'])
+    assert _refresh(client, other['refresh_token']).status_code == 200
+
+
+def test_logout_revokes_refresh_and_access_tokens(client, session):
+    assert client.post('/auth/logout', headers=_bearer(session['refresh_token'])).status_code == 200
+    assert _refresh(client, session['refresh_token']).status_code == 401
+    assert not _can_read_history(client, session, session['access_token'])
+
+
+def test_access_token_cannot_refresh(client, session):
+    assert _refresh(client, session['access_token']).status_code == 422
+
+
+def test_sessions_of_other_users_are_unaffected(client, session):
+    second = sign_up(client, 'second@aira.test')
+    client.post('/auth/logout', headers=_bearer(session['refresh_token']))
+    assert _refresh(client, second['refresh_token']).status_code == 200
+
+
+@pytest.mark.parametrize('backend, workers, warned', [
+    ('memory', '4', True), ('memory', '1', False), ('redis', '4', False),
+])
+def test_memory_store_with_several_workers_warns(make_app, monkeypatch, caplog, backend, workers, warned):
+    monkeypatch.setenv('WEB_CONCURRENCY', workers)
+    with caplog.at_level(logging.WARNING):
+        make_app(JWT_REVOCATION_BACKEND=backend, JWT_REVOCATION_REDIS_URL='local://')
+    assert any('JWT_REVOCATION_BACKEND' in record.message for record in caplog.records) is warned
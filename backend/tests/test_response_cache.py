@@ -0,0 +1,113 @@
+"""Reply cache: key normalization, failing open, and what gets cached."""
+import json
+
+import pytest
+import requests
+
+from ai_client import ai_client
+from chat_routes import get_gemini_response, stream_gemini_response
+from response_cache import normalize_prompt, response_cache
+
+PRIMARY_URL = 'http://primary.test/v1/chat/completions'
+FALLBACK_URL = 'http://fallback.test/generate'
+
+
+class BrokenBackend:
+    """A cache backend whose server is unreachable."""
+
+    def get(self, key):
+        raise ConnectionError('cache down')
+
+    def set(self, key, value, ttl):
+        raise ConnectionError('cache down')
+
+    def size(self):
+        raise ConnectionError('cache down')
+
+
+class Reply:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body: dict):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, **kwargs):
+        text = self.body['choices'][0]['message']['content']
+        yield 'data: ' + json.dumps({'choices': [{'delta': {'content': text}}]})
+        yield 'data: [DONE]'
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def calls(make_app, monkeypatch):
+    app = make_app(
+        AI_CACHE_ENABLED=True, GEMINI_PROVIDER='groq', GEMINI_API_KEY='gsk_test', GEMINI_API_URL=PRIMARY_URL,
+        AI_FALLBACK_PROVIDERS='generic', GENERIC_API_KEY='generic-test', GENERIC_API_URL=FALLBACK_URL,
+    )
+    calls = []
+
+    def post(url, **kwargs):
+        calls.append(url)
+        if url == PRIMARY_URL and 'fail primary' in str(kwargs.get('json')):
+            raise requests.exceptions.ConnectionError('refused')
+        if url == PRIMARY_URL:
+            return Reply({'choices': [{'message': {'content': 'from primary'}}]})
+        return Reply({'output': 'from fallback'})
+
+    monkeypatch.setattr(ai_client, 'post', post)
+    with app.app_context():
+        yield calls
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Heyyy!!', 'hello'),
+    ('who r u?', 'Who are you'),
+    ('I feel   ANXIOUS 😟', 'i feel anxious'),
+])
+def test_equivalent_prompts_share_a_key(a, b):
+    assert normalize_prompt(a) == normalize_prompt(b)
+
+
+def test_digits_are_not_folded():
+    assert normalize_prompt('I took 1000 mg') != normalize_prompt('I took 10 mg')
+
+
+def test_repeat_prompt_is_served_from_cache(calls):
+    assert get_gemini_response('hello')['reply'] == 'from primary'
+    assert get_gemini_response('hey!!')['meta'] == {'source': 'cache'}
+    assert calls == [PRIMARY_URL]
+
+
+def test_history_bypasses_the_cache(calls):
+    get_gemini_response('hello')
+    history = [{'role': 'user', 'content': 'earlier'}]
+    assert get_gemini_response('hello', history=history)['meta'] == {'provider': 'groq'}
+
+
+def test_fallback_replies_are_not_cached(calls):
+    assert get_gemini_response('fail primary')['reply'] == 'from fallback'
+    assert response_cache.stats()['stores'] == 0
+
+
+def test_broken_backend_fails_open(calls, monkeypatch):
+    monkeypatch.setattr(response_cache, 'backend', BrokenBackend())
+
+    result = get_gemini_response('hello')
+    assert result['reply'] == 'from primary'
+    assert result['meta'] == {'provider': 'groq'}
+    assert ''.join(stream_gemini_response('hello')) == 'from primary'
+
+    stats = response_cache.stats()
+    assert stats['errors'] == 4
+    assert stats['misses'] == 2
+    assert stats['stores'] == 0
+    assert stats['entries'] is None
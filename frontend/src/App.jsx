@@ -5,7 +5,8 @@ import Settings from "./pages/Settings";
 import Home from "./pages/Home";
 import LoadingScreen from "./components/LoadingScreen";
 import Login from "./pages/Login";
-import { isTokenExpired, clearAuthData } from "./utils/tokenUtils";
+import { hasValidSession, clearAuthData } from "./utils/tokenUtils";
+import { revokeSession } from "./api/axiosClient";
 import "./index.css";
 
 /**
@@ -82,12 +83,12 @@ function App() {
   // Validate token on app mount and periodically check expiration
   useEffect(() => {
     const checkTokenValidity = () => {
-      const token = localStorage.getItem("aira_token");
       const storedUser = localStorage.getItem("aira_user");
 
-      // If we have a user but no token, or token is expired, clear everything
-      if (storedUser && (!token || isTokenExpired(token))) {
-        console.log("Token expired or missing - logging out");
+      // If we have a user but the session can no longer be renewed (refresh
+      // token missing or expired), clear everything
+      if (storedUser && !hasValidSession()) {
+        console.log("Session expired or missing - logging out");
         clearAuthData();
         setUser(null);
       }
@@ -123,8 +124,7 @@ function App() {
 
   const handleLogout = () => {
     setUser(null);
-    localStorage.removeItem("aira_user");
-    localStorage.removeItem("aira_token");
+    revokeSession().finally(clearAuthData);
   };
 
   const handleUserUpdate = (updatedUser) => {
@@ -1,8 +1,17 @@
 import axios from "axios";
-import { isTokenExpired, clearAuthData } from "../utils/tokenUtils";
+import {
+  decodeToken,
+  isTokenExpired,
+  clearAuthData,
+  getRefreshToken,
+  setAuthTokens,
+} from "../utils/tokenUtils";
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE || "http://localhost:5000";
 
+// Renew the access token this many seconds before it expires
+const REFRESH_MARGIN_SECONDS = 30;
+
 const axiosClient = axios.create({
   baseURL: API_BASE_URL,
   headers: {
@@ -11,53 +20,120 @@ const axiosClient = axios.create({
   timeout: 15000,
 });
 
-// Attach Authorization header from localStorage if present
-// Also check if token is expired before making request
-axiosClient.interceptors.request.use((config) => {
-  try {
-    const token = localStorage.getItem("aira_token");
+const endSession = () => {
+  clearAuthData();
 
-    // Skip token validation for login/register endpoints (they don't need tokens)
-    const isAuthEndpoint =
-      config.url?.includes("/auth/login") ||
-      config.url?.includes("/auth/register");
+  // Redirect to login (trigger app reload)
+  window.location.href = "/";
+};
 
-    if (token && !isAuthEndpoint) {
-      // Check if token is expired (but only for non-auth endpoints)
-      if (isTokenExpired(token)) {
-        // Token expired - clear auth data and redirect to login
-        clearAuthData();
+const expiresSoon = (token) => {
+  const decoded = decodeToken(token);
+  if (!decoded || !decoded.exp) return true;
 
-        // Redirect to login (trigger app reload)
-        window.location.href = "/";
+  return decoded.exp * 1000 - Date.now() < REFRESH_MARGIN_SECONDS * 1000;
+};
 
-        // Reject the request
-        return Promise.reject(new Error("Token expired"));
-      }
+// In-flight refresh shared by concurrent requests, so a refresh token is
+// only ever presented once
+let refreshPromise = null;
+
+/**
+ * Exchange the refresh token for a new access/refresh token pair
+ * @returns {Promise<string>} The new access token
+ */
+export const refreshSession = () => {
+  if (!refreshPromise) {
+    const refreshToken = getRefreshToken();
+    const request =
+      refreshToken && !isTokenExpired(refreshToken)
+        ? axios.post(`${API_BASE_URL}/auth/refresh`, null, {
+            headers: { Authorization: `Bearer ${refreshToken}` },
+            timeout: 15000,
+          })
+        : Promise.reject(new Error("Session expired"));
+
+    refreshPromise = request
+      .then((res) => {
+        setAuthTokens(res.data);
+        return res.data.access_token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
+/**
+ * Revoke the session on the server (best effort) before logging out
+ */
+export const revokeSession = () => {
+  const refreshToken = getRefreshToken();
+  if (!refreshToken || isTokenExpired(refreshToken)) return Promise.resolve();
 
-      // Token is valid - attach to request
-      config.headers = config.headers || {};
-      config.headers.Authorization = `Bearer ${token}`;
-    } else if (token && isAuthEndpoint) {
-      // For auth endpoints, just clear expired token without redirecting
+  return axios
+    .post(`${API_BASE_URL}/auth/logout`, null, {
+      headers: { Authorization: `Bearer ${refreshToken}` },
+      timeout: 5000,
+    })
+    .catch(() => {});
+};
+
+// Attach Authorization header from localStorage if present, renewing the
+// access token first when it has expired or is about to
+axiosClient.interceptors.request.use(async (config) => {
+  // Skip token handling for login/register endpoints (they don't need tokens)
+  const isAuthEndpoint =
+    config.url?.includes("/auth/login") ||
+    config.url?.includes("/auth/register");
+
+  let token = localStorage.getItem("aira_token");
+  if (!token || isAuthEndpoint) {
+    return config;
+  }
+
+  if (expiresSoon(token)) {
+    try {
+      token = await refreshSession();
+    } catch (e) {
       if (isTokenExpired(token)) {
-        clearAuthData();
+        // Session over - clear auth data and redirect to login
+        endSession();
+        return Promise.reject(new Error("Token expired"));
       }
+      // Refresh failed but the current token is still usable
     }
-  } catch (e) {
-    console.error("Error in request interceptor:", e);
   }
+
+  config.headers = config.headers || {};
+  config.headers.Authorization = `Bearer ${token}`;
   return config;
 });
 
-// Handle 401 Unauthorized responses (expired or invalid token)
+// Handle 401 Unauthorized responses: renew the session once and retry,
+// otherwise log out
 axiosClient.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response && error.response.status === 401) {
-      // Token is invalid or expired on backend
-      clearAuthData();
-      window.location.href = "/";
+  async (error) => {
+    const original = error.config;
+    const isAuthEndpoint =
+      original?.url?.includes("/auth/login") ||
+      original?.url?.includes("/auth/register");
+
+    if (error.response && error.response.status === 401 && !isAuthEndpoint) {
+      if (original && !original._retried) {
+        original._retried = true;
+        try {
+          const token = await refreshSession();
+          original.headers.Authorization = `Bearer ${token}`;
+          return axiosClient(original);
+        } catch (e) {
+          // Fall through to logout
+        }
+      }
+      // Token is invalid, revoked or expired on backend
+      endSession();
     }
     return Promise.reject(error);
   }
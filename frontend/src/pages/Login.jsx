@@ -1,6 +1,7 @@
 import React, { useState } from "react";
 import toast from "react-hot-toast";
 import axiosClient from "../api/axiosClient";
+import { setAuthTokens } from "../utils/tokenUtils";
 import Avatar from "../components/Avatar";
 
 const Login = ({ onLogin, logoSrc, bgSrc, isDark, setIsDark }) => {
@@ -22,8 +23,8 @@ const Login = ({ onLogin, logoSrc, bgSrc, isDark, setIsDark }) => {
     setLoading(true);
     try {
       const res = await axiosClient.post("/auth/login", { email, password });
-      const { access_token, user } = res.data;
-      localStorage.setItem("aira_token", access_token);
+      const { user } = res.data;
+      setAuthTokens(res.data);
       localStorage.setItem("aira_user", JSON.stringify(user));
       toast.success(`Welcome back, ${user.name || user.email}!`);
       onLogin(user);
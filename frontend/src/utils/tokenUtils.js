@@ -58,6 +58,47 @@ export const getToken = () => {
   }
 };
 
+/**
+ * Get refresh token from localStorage
+ * @returns {string|null} Refresh token or null if not found
+ */
+export const getRefreshToken = () => {
+  try {
+    return localStorage.getItem("aira_refresh_token");
+  } catch (error) {
+    console.error("Error getting refresh token:", error);
+    return null;
+  }
+};
+
+/**
+ * Store the token pair returned by /auth/login and /auth/refresh
+ * @param {object} tokens - { access_token, refresh_token }
+ */
+export const setAuthTokens = ({ access_token, refresh_token }) => {
+  try {
+    localStorage.setItem("aira_token", access_token);
+    if (refresh_token) {
+      localStorage.setItem("aira_refresh_token", refresh_token);
+    }
+  } catch (error) {
+    console.error("Error storing tokens:", error);
+  }
+};
+
+/**
+ * Check if the session can still be used: the access token is valid, or
+ * it can be renewed with a valid refresh token
+ * @returns {boolean} True if the session is still valid
+ */
+export const hasValidSession = () => {
+  const refreshToken = getRefreshToken();
+  if (refreshToken) return !isTokenExpired(refreshToken);
+
+  const token = getToken();
+  return !!token && !isTokenExpired(token);
+};
+
 /**
  * Check if user is authenticated with valid token
  * @returns {boolean} True if authenticated with valid token
@@ -75,6 +116,7 @@ export const isAuthenticated = () => {
 export const clearAuthData = () => {
   try {
     localStorage.removeItem("aira_token");
+    localStorage.removeItem("aira_refresh_token");
     localStorage.removeItem("aira_user");
   } catch (error) {
     console.error("Error clearing auth data:", error);